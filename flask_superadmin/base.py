@@ -297,6 +297,8 @@ class Admin(object):
         self._menu = []
         self._menu_categories = dict()
         self._models = []
+        self._model_views = {}
+        self._resolved_model_views = {}
         self._model_backends = list()
 
         try:
@@ -362,8 +364,34 @@ class Admin(object):
         model_view = new_class(model, *args, **kwargs)
 
         self._models.append((model, model_view))
+        self._model_views.setdefault(model, model_view)
+        self._resolved_model_views.clear()
         self.add_view(model_view)
 
+    def get_model_view(self, model):
+        """
+            Return the view registered for the model class, or for the
+            closest of its base classes (so that subclasses and polymorphic
+            models resolve to the view of their registered parent). Returns
+            `None` if there is no such view.
+
+            `model`
+                Model class to look up.
+        """
+        try:
+            return self._resolved_model_views[model]
+        except KeyError:
+            pass
+
+        view = None
+        for cls in getattr(model, '__mro__', (model,)):
+            view = self._model_views.get(cls)
+            if view is not None:
+                break
+
+        self._resolved_model_views[model] = view
+        return view
+
     def add_view(self, view):
         """
             Add view to the collection.
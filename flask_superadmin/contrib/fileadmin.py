@@ -102,6 +102,12 @@ class FileAdmin(BaseView):
         Is file and directory renaming allowed.
     """
 
+    jobs = None
+    """
+        `flask_superadmin.jobs.JobRunner` used to delete directories in the
+        background. If not set, directories are deleted in the request.
+    """
+
     allowed_extensions = None
     """
         List of allowed extensions for uploads, in lower case.
@@ -224,6 +230,41 @@ class FileAdmin(BaseView):
         """
         file_data.save(path)
 
+    def delete_tree(self, full_path, job=None):
+        """
+            Recursively delete a directory, reporting the progress to the
+            background `job` if given.
+
+            `full_path`
+                Directory path
+            `job`
+                Optional `flask_superadmin.jobs.Job`
+        """
+        if job is None:
+            shutil.rmtree(full_path)
+            return
+
+        entries = list(os.walk(full_path, topdown=False))
+        total = sum(len(files) + 1 for _, _, files in entries)
+        done = 0
+        job.progress(done, total)
+
+        for dirpath, dirnames, filenames in entries:
+            for name in filenames:
+                os.remove(op.join(dirpath, name))
+            done += len(filenames)
+            # Symlinks to directories are listed but not walked into
+            for name in dirnames:
+                if op.islink(op.join(dirpath, name)):
+                    os.remove(op.join(dirpath, name))
+            os.rmdir(dirpath)
+            done += 1
+            job.progress(done, total)
+
+    def _run_delete_tree(self, job, full_path, path):
+        self.delete_tree(full_path, job)
+        return gettext('Directory "%s" was successfully deleted.' % path)
+
     def _get_dir_url(self, endpoint, path, **kwargs):
         """
             Return prettified URL
@@ -432,8 +473,14 @@ class FileAdmin(BaseView):
                 flash(gettext('Directory deletion is disabled.'))
                 return redirect(return_url)
 
+            if self.jobs is not None:
+                job_id = self.jobs.submit(
+                    gettext('Delete directory "%s"' % path),
+                    self._run_delete_tree, full_path, path)
+                return self.jobs.redirect(job_id, return_url)
+
             try:
-                shutil.rmtree(full_path)
+                self.delete_tree(full_path)
                 flash(
                     gettext('Directory "%s" was successfully deleted.' % path)
                 )
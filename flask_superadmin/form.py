@@ -3,6 +3,7 @@ import datetime
 
 from flask.ext import wtf
 from wtforms import fields, widgets
+from wtforms.validators import ValidationError
 
 from flask_superadmin.babel import gettext
 from flask import request
@@ -104,18 +105,184 @@ class ChosenSelectField(fields.SelectField):
     """
     widget = ChosenSelectWidget
 
+class AjaxSelectWidget(widgets.Select):
+    """
+        Select widget that only renders the selected options and searches
+        the other ones through the lookup endpoint of the model admin.
+
+        You must include form.js for searching to work.
+    """
+    def __call__(self, field, **kwargs):
+        kwargs['data-role'] = u'ajax-select'
+        kwargs['data-url'] = field.loader.get_url()
+        kwargs.setdefault('data-placeholder', gettext('Search'))
+        return super(AjaxSelectWidget, self).__call__(field, **kwargs)
+
+
+class AjaxSelectField(fields.SelectFieldBase):
+    """
+        Relation field whose choices are looked up with AJAX requests
+        instead of being loaded from the whole related table. The submitted
+        primary key is checked with a single query.
+
+        `loader`
+            `flask_superadmin.model.ajax.AjaxModelLoader` of the relation
+    """
+    widget = AjaxSelectWidget()
+
+    def __init__(self, loader, label=None, validators=None,
+                 allow_blank=False, blank_text=u'', **kwargs):
+        super(AjaxSelectField, self).__init__(label, validators, **kwargs)
+        self.loader = loader
+        self.allow_blank = allow_blank
+        self.blank_text = blank_text
+        self._formdata = None
+        self._invalid_formdata = False
+
+    def _get_data(self):
+        if self._formdata is not None:
+            objs = self.loader.get_many([self._formdata])
+            self._invalid_formdata = not objs
+            self._set_data(objs[0] if objs else None)
+        return self._data
+
+    def _set_data(self, data):
+        self._data = data
+        self._formdata = None
+
+    data = property(_get_data, _set_data)
+
+    def iter_choices(self):
+        if self.allow_blank:
+            yield (u'__None', self.blank_text, self.data is None)
+
+        if self.data is not None:
+            pk, label = self.loader.format(self.data)
+            yield (pk, label, True)
+
+    def process_formdata(self, valuelist):
+        if valuelist:
+            if self.allow_blank and valuelist[0] in (u'__None', u''):
+                self.data = None
+            else:
+                self._data = None
+                self._formdata = valuelist[0]
+
+    def pre_validate(self, form):
+        # Loading the data looks up the submitted primary keys
+        self._get_data()
+        if self._invalid_formdata:
+            raise ValidationError(self.gettext(u'Not a valid choice'))
+
+
+class AjaxSelectMultipleField(AjaxSelectField):
+    """
+        Multiple selection version of `AjaxSelectField`. All the submitted
+        primary keys are checked with a single `IN` query.
+    """
+    widget = AjaxSelectWidget(multiple=True)
+
+    def __init__(self, loader, label=None, validators=None, default=None,
+                 **kwargs):
+        if default is None:
+            default = []
+        super(AjaxSelectMultipleField, self).__init__(loader, label,
+                                                      validators,
+                                                      default=default,
+                                                      **kwargs)
+
+    def _get_data(self):
+        if self._formdata is not None:
+            pks = set(self._formdata)
+            objs = self.loader.get_many(list(pks)) if pks else []
+            self._invalid_formdata = len(objs) < len(pks)
+            self._set_data(objs)
+        return self._data
+
+    data = property(_get_data, AjaxSelectField._set_data)
+
+    def iter_choices(self):
+        for obj in self.data or ():
+            pk, label = self.loader.format(obj)
+            yield (pk, label, True)
+
+    def process_formdata(self, valuelist):
+        self._data = None
+        self._formdata = [v for v in valuelist if v]
+
+
+class CachedSelectField(AjaxSelectField):
+    """
+        Relation field listing all the choices of the related model from a
+        shared `flask_superadmin.model.cache.ChoicesCache`. Only the
+        submitted primary key is looked up.
+
+        `loader`
+            `flask_superadmin.model.ajax.AjaxModelLoader` of the relation
+        `cache`
+            `ChoicesCache` holding the choices
+    """
+    widget = ChosenSelectWidget()
+
+    def __init__(self, loader, cache, *args, **kwargs):
+        super(CachedSelectField, self).__init__(loader, *args, **kwargs)
+        self.cache = cache
+
+    def get_choices(self):
+        return self.cache.get(self.loader.model, self.loader.get_cache_key(),
+                              self.loader.get_choices)
+
+    def iter_choices(self):
+        if self.allow_blank:
+            yield (u'__None', self.blank_text, self.data is None)
+
+        selected = None
+        if self.data is not None:
+            selected = unicode(self.loader.get_pk(self.data))
+        for pk, label in self.get_choices():
+            yield (pk, label, pk == selected)
+
+
+class CachedSelectMultipleField(AjaxSelectMultipleField):
+    """
+        Multiple selection version of `CachedSelectField`.
+    """
+    widget = ChosenSelectWidget(multiple=True)
+
+    def __init__(self, loader, cache, *args, **kwargs):
+        super(CachedSelectMultipleField, self).__init__(loader, *args,
+                                                        **kwargs)
+        self.cache = cache
+
+    def get_choices(self):
+        return self.cache.get(self.loader.model, self.loader.get_cache_key(),
+                              self.loader.get_choices)
+
+    def iter_choices(self):
+        selected = set(unicode(self.loader.get_pk(obj))
+                       for obj in self.data or ())
+        for pk, label in self.get_choices():
+            yield (pk, label, pk in selected)
+
+
 class FileFieldWidget(object):
     # widget_file = widgets.FileInput()
     widget_checkbox = widgets.CheckboxInput()
     def __call__(self, field, **kwargs):
         from cgi import escape
         input_file = '<input %s>' % widgets.html_params(name=field.name, type='file')
-        return widgets.HTMLString('%s<br />Current: %s<br />%s <label for="%s">Clear file</label>'%(input_file, escape(field._value()), self.widget_checkbox(field._clear), field._clear.id))
+        current = escape(field._value())
+        url = field.get_download_url()
+        if url:
+            current = '<a href="%s">%s</a>' % (escape(url, True), current)
+        return widgets.HTMLString('%s<br />Current: %s<br />%s <label for="%s">Clear file</label>'%(input_file, current, self.widget_checkbox(field._clear), field._clear.id))
 
 class FileField(fields.FileField):
     widget = FileFieldWidget()
     def __init__(self,*args,**kwargs):
         self.clearable = kwargs.pop('clearable', True)
+        # Callable returning the URL the current file is downloaded from
+        self.download_url = kwargs.pop('download_url', None)
         super(FileField, self).__init__(*args, **kwargs)
         self._prefix = kwargs.get('_prefix', '')
         self.clear_field = fields.BooleanField(default=False)
@@ -134,6 +301,11 @@ class FileField(fields.FileField):
     def clear(self):
         return (not self.clearable) or self._clear.data
 
+    def get_download_url(self):
+        if self.download_url is None or not self.object_data:
+            return None
+        return self.download_url(self.object_data)
+
     @property
     def data(self):
         data = self._data
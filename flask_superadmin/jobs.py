@@ -0,0 +1,346 @@
+import errno
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from Queue import Queue
+
+from flask import (Response, abort, current_app, flash, jsonify, redirect,
+                   url_for)
+
+from flask_superadmin.babel import gettext, lazy_gettext
+from flask_superadmin.base import BaseView, expose
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+FINISHED_STATES = (DONE, FAILED)
+
+JOB_FIELDS = ('id', 'name', 'state', 'done', 'total', 'message', 'created',
+              'updated')
+
+
+def process_exists(pid):
+    # Signal 0 only checks the process, but means CTRL_C_EVENT on Windows
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except OSError, ex:
+        return ex.errno == errno.EPERM
+    return True
+
+
+class JobStore(object):
+    """
+        Keeps the state of the jobs in a sqlite database, so that it is
+        shared between the worker threads (and the processes of the
+        application) and survives restarts. Every job records the process
+        running it: when the store is opened, the unfinished jobs of
+        processes of this host that no longer exist are marked as failed.
+
+        `path`
+            Location of the database file, which should be specific to the
+            application. Use ':memory:' for a store that only lives as long
+            as the process.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.owner = '%s:%s' % (socket.gethostname(), os.getpid())
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, name TEXT, state TEXT, '
+                'done INTEGER, total INTEGER, message TEXT, '
+                'created REAL, updated REAL, owner TEXT)')
+            columns = [row[1] for row in
+                       self._conn.execute('PRAGMA table_info(jobs)')]
+            if 'owner' not in columns:
+                self._conn.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+            self._conn.commit()
+        self.fail_interrupted()
+
+    def fail_interrupted(self):
+        """
+            Mark the queued and running jobs of the processes of this host
+            that are gone as failed. Jobs of other hosts are left alone.
+        """
+        host = socket.gethostname()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, owner FROM jobs WHERE state IN (?, ?)',
+                (QUEUED, RUNNING)).fetchall()
+            interrupted = []
+            for job_id, owner in rows:
+                owner_host, _, pid = (owner or '').rpartition(':')
+                if owner_host == host and not process_exists(int(pid)):
+                    interrupted.append(job_id)
+            for job_id in interrupted:
+                self._conn.execute(
+                    'UPDATE jobs SET state = ?, message = ?, updated = ? '
+                    'WHERE id = ?',
+                    (FAILED, u'Interrupted by a restart', time.time(),
+                     job_id))
+            self._conn.commit()
+
+    def create(self, name):
+        """
+            Add a queued job and return its id.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, name, state, done, created, updated, '
+                'owner) VALUES (?, ?, ?, 0, ?, ?, ?)',
+                (job_id, unicode(name), QUEUED, now, now, self.owner))
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id, **fields):
+        """
+            Change the given fields of the job.
+        """
+        fields['updated'] = time.time()
+        names = sorted(fields)
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET %s WHERE id = ?' %
+                ', '.join('%s = ?' % name for name in names),
+                [fields[name] for name in names] + [job_id])
+            self._conn.commit()
+
+    def get(self, job_id):
+        """
+            Return the job as a dictionary, or None if it doesn't exist.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT %s FROM jobs WHERE id = ?' % ', '.join(JOB_FIELDS),
+                (job_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(JOB_FIELDS, row))
+
+    def list(self, limit=50):
+        """
+            Return the most recent jobs, newest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT %s FROM jobs ORDER BY created DESC LIMIT ?' %
+                ', '.join(JOB_FIELDS), (limit,)).fetchall()
+        return [dict(zip(JOB_FIELDS, row)) for row in rows]
+
+
+class Job(object):
+    """
+        Handle passed to the job function to report its progress.
+    """
+    def __init__(self, runner, job_id):
+        self.runner = runner
+        self.id = job_id
+
+    def progress(self, done, total=None, message=None):
+        """
+            Report progress.
+
+            `done`
+                Number of processed items
+            `total`
+                Total number of items, if known
+            `message`
+                Optional status message
+        """
+        fields = {'done': done}
+        if total is not None:
+            fields['total'] = total
+        if message is not None:
+            fields['message'] = unicode(message)
+        self.runner.store.update(self.id, **fields)
+
+
+class JobRunner(object):
+    """
+        Runs long admin operations (mass deletes, recursive directory
+        deletes, ...) on a bounded pool of worker threads instead of the
+        request thread.
+
+        Sample usage::
+
+            jobs = JobRunner(JobStore('/var/lib/myapp/jobs.db'))
+            admin.add_view(JobsView(jobs))
+            admin.register(User, session=db.session, jobs=jobs)
+
+        `store`
+            `JobStore` keeping the state of the jobs. Defaults to a store
+            in memory, which only lists the jobs of the process.
+        `workers`
+            Number of worker threads
+    """
+    def __init__(self, store=None, workers=2):
+        self.store = store or JobStore(':memory:')
+        self.workers = workers
+
+        # Set by the JobsView the runner is registered with
+        self.view = None
+
+        self._queue = Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _start_workers(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job_id, app, func, args, kwargs = self._queue.get()
+            try:
+                self.run(job_id, app, func, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    def run(self, job_id, app, func, args, kwargs):
+        """
+            Run the job function in the application context of the request
+            that submitted it and record its outcome.
+        """
+        self.store.update(job_id, state=RUNNING)
+        try:
+            if app is not None:
+                with app.app_context():
+                    result = func(Job(self, job_id), *args, **kwargs)
+            else:
+                result = func(Job(self, job_id), *args, **kwargs)
+        except Exception, ex:
+            traceback.print_exc()
+            self.store.update(job_id, state=FAILED, message=unicode(ex))
+        else:
+            fields = {'state': DONE}
+            if result is not None:
+                fields['message'] = unicode(result)
+            self.store.update(job_id, **fields)
+
+    def submit(self, name, func, *args, **kwargs):
+        """
+            Queue `func(job, *args, **kwargs)` and return the job id. The
+            function reports its progress through `job.progress` and its
+            return value becomes the final status message.
+
+            `name`
+                Description of the job shown in the jobs view
+        """
+        job_id = self.store.create(name)
+        try:
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = None
+
+        self._start_workers()
+        self._queue.put((job_id, app, func, args, kwargs))
+        return job_id
+
+    def join(self):
+        """
+            Block until all the queued jobs are finished.
+        """
+        self._queue.join()
+
+    def get_url(self, job_id):
+        """
+            Return the URL of the job's status page, or None if the runner
+            isn't exposed by a `JobsView`.
+        """
+        if self.view is None or self.view.blueprint is None:
+            return None
+        return url_for('%s.job' % self.view.endpoint, job_id=job_id)
+
+    def redirect(self, job_id, return_url):
+        """
+            Redirect to the status page of a submitted job (or to
+            `return_url` if there isn't one).
+        """
+        url = self.get_url(job_id)
+        flash(gettext('The operation is running in the background.'))
+        return redirect(url or return_url)
+
+
+class JobsView(BaseView):
+    """
+        Lists the jobs of a `JobRunner` and reports their progress, either
+        by polling the JSON status or over server-sent events.
+
+        `runner`
+            `JobRunner` to expose
+    """
+    list_template = 'admin/jobs/list.html'
+    job_template = 'admin/jobs/job.html'
+
+    # Seconds between two progress checks of the event stream
+    poll_interval = 1
+
+    def __init__(self, runner, name=None, category=None, endpoint=None,
+                 url=None):
+        super(JobsView, self).__init__(name or lazy_gettext('Jobs'),
+                                       category, endpoint or 'jobs', url)
+        self.runner = runner
+        runner.view = self
+
+    def get_job(self, job_id):
+        job = self.runner.store.get(job_id)
+        if job is None:
+            abort(404)
+        return job
+
+    @expose('/')
+    def index(self):
+        return self.render(self.list_template,
+                           jobs=self.runner.store.list())
+
+    @expose('/<job_id>/')
+    def job(self, job_id):
+        return self.render(self.job_template, job=self.get_job(job_id))
+
+    @expose('/<job_id>/status/')
+    def status(self, job_id):
+        return jsonify(self.get_job(job_id))
+
+    @expose('/<job_id>/events/')
+    def events(self, job_id):
+        job = self.get_job(job_id)
+        store = self.runner.store
+        interval = self.poll_interval
+
+        def stream(job):
+            while True:
+                yield 'data: %s\n\n' % json.dumps(job)
+                if job['state'] in FINISHED_STATES:
+                    break
+
+                # Only send updates when something changed
+                updated = job['updated']
+                while job is not None and job['updated'] == updated:
+                    time.sleep(interval)
+                    job = store.get(job_id)
+                if job is None:
+                    # Removed from the store while being watched
+                    break
+
+        return Response(stream(job), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache'})
@@ -0,0 +1,71 @@
+from flask import url_for
+
+
+# Number of objects returned per lookup request
+DEFAULT_PAGE_SIZE = 10
+
+
+class AjaxModelLoader(object):
+    """ Looks up the objects of a related model for an AJAX relation picker
+    (see `BaseModelAdmin.ajax_refs`). Backends implement `get_pk`,
+    `get_many` and `get_list`.
+    """
+    def __init__(self, view, name, options):
+        self.view = view
+        self.name = name
+        self.options = options
+        self.fields = options.get('fields', ())
+        self.page_size = options.get('page_size', DEFAULT_PAGE_SIZE)
+
+    def get_url(self):
+        return url_for('%s.lookup' % self.view.endpoint, name=self.name)
+
+    def format(self, obj):
+        """ Returns the (primary key, label) option of the object. """
+        return unicode(self.get_pk(obj)), unicode(obj)
+
+    def get_pk(self, obj):
+        raise NotImplemented()
+
+    def get_cache_key(self):
+        """ Returns the key of the `get_choices` query in a
+        `flask_superadmin.model.cache.ChoicesCache` (which also keys the
+        entries by model). Loaders with other queries must return other
+        keys.
+        """
+        return (type(self), tuple(self.fields))
+
+    def get_choices(self):
+        """ Returns the (primary key, label) options of all the objects.
+        """
+        return [self.format(obj) for obj in self.get_list(u'')]
+
+    def coerce_pk(self, pk):
+        """ Converts a submitted primary key to the type of the related
+        model's primary key. Raises ValueError if it isn't valid.
+        """
+        return pk
+
+    def coerce_pks(self, pks):
+        """ Returns the valid primary keys among the submitted ones,
+        converted by `coerce_pk`.
+        """
+        valid = []
+        for pk in pks:
+            try:
+                valid.append(self.coerce_pk(pk))
+            except ValueError:
+                pass
+        return valid
+
+    def get_many(self, pks):
+        """ Returns the objects with the given (submitted) primary keys,
+        using a single query. Invalid primary keys match no object.
+        """
+        raise NotImplemented()
+
+    def get_list(self, term, offset=0, limit=None):
+        """ Returns the objects one of whose `fields` contains `term` (all
+        of them if `term` is empty).
+        """
+        raise NotImplemented()
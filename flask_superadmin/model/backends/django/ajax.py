@@ -0,0 +1,41 @@
+import operator
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from flask_superadmin.model.ajax import AjaxModelLoader
+
+
+class QuerySetAjaxModelLoader(AjaxModelLoader):
+    """ AJAX loader for the related model of a Django foreign key. """
+    def __init__(self, view, name, options):
+        super(QuerySetAjaxModelLoader, self).__init__(view, name, options)
+
+        field = view.model._meta.get_field_by_name(name)[0]
+        self.model = field.rel.to
+
+    def get_pk(self, obj):
+        return obj.pk
+
+    def coerce_pk(self, pk):
+        try:
+            return self.model._meta.pk.to_python(pk)
+        except ValidationError, ex:
+            raise ValueError(ex)
+
+    def get_many(self, pks):
+        pks = self.coerce_pks(pks)
+        if not pks:
+            return []
+        return list(self.model.objects.filter(pk__in=pks))
+
+    def get_list(self, term, offset=0, limit=None):
+        qs = self.model.objects.all()
+        if term:
+            qs = qs.filter(reduce(operator.or_,
+                                  [Q(**{'%s__icontains' % field: term})
+                                   for field in self.fields]))
+        qs = qs.order_by('pk')
+        if limit is not None:
+            return list(qs[offset:offset + limit])
+        return list(qs[offset:])
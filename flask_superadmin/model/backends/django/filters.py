@@ -0,0 +1,189 @@
+from flask_superadmin.babel import gettext
+
+from flask_superadmin.model import filters
+
+
+class BaseDjangoFilter(filters.BaseFilter):
+    """
+        Base Django filter.
+    """
+    def __init__(self, column, name, options=None, data_type=None):
+        """
+            Constructor.
+
+            `column`
+                Model field name
+            `name`
+                Display name
+            `options`
+                Fixed set of options
+            `data_type`
+                Client data type
+        """
+        super(BaseDjangoFilter, self).__init__(name, options, data_type)
+
+        self.column = column
+
+
+# Common filters
+class FilterEqual(BaseDjangoFilter):
+    def apply(self, query, value):
+        return query.filter(**{self.column: value})
+
+    def operation(self):
+        return gettext('equals')
+
+
+class FilterNotEqual(BaseDjangoFilter):
+    def apply(self, query, value):
+        return query.exclude(**{self.column: value})
+
+    def operation(self):
+        return gettext('not equal')
+
+
+class FilterLike(BaseDjangoFilter):
+    def apply(self, query, value):
+        return query.filter(**{'%s__icontains' % self.column: value})
+
+    def operation(self):
+        return gettext('contains')
+
+
+class FilterNotLike(BaseDjangoFilter):
+    def apply(self, query, value):
+        return query.exclude(**{'%s__icontains' % self.column: value})
+
+    def operation(self):
+        return gettext('not contains')
+
+
+class FilterGreater(BaseDjangoFilter):
+    def apply(self, query, value):
+        return query.filter(**{'%s__gt' % self.column: value})
+
+    def operation(self):
+        return gettext('greater than')
+
+
+class FilterSmaller(BaseDjangoFilter):
+    def apply(self, query, value):
+        return query.filter(**{'%s__lt' % self.column: value})
+
+    def operation(self):
+        return gettext('smaller than')
+
+
+# Customized type filters
+class BooleanEqualFilter(FilterEqual, filters.BaseBooleanFilter):
+    pass
+
+
+class BooleanNotEqualFilter(FilterNotEqual, filters.BaseBooleanFilter):
+    pass
+
+
+class IntEqualFilter(FilterEqual, filters.BaseIntFilter):
+    pass
+
+
+class IntNotEqualFilter(FilterNotEqual, filters.BaseIntFilter):
+    pass
+
+
+class IntGreaterFilter(FilterGreater, filters.BaseIntFilter):
+    pass
+
+
+class IntSmallerFilter(FilterSmaller, filters.BaseIntFilter):
+    pass
+
+
+class FloatEqualFilter(FilterEqual, filters.BaseFloatFilter):
+    pass
+
+
+class FloatNotEqualFilter(FilterNotEqual, filters.BaseFloatFilter):
+    pass
+
+
+class FloatGreaterFilter(FilterGreater, filters.BaseFloatFilter):
+    pass
+
+
+class FloatSmallerFilter(FilterSmaller, filters.BaseFloatFilter):
+    pass
+
+
+class DateEqualFilter(FilterEqual, filters.BaseDateFilter):
+    pass
+
+
+class DateNotEqualFilter(FilterNotEqual, filters.BaseDateFilter):
+    pass
+
+
+class DateGreaterFilter(FilterGreater, filters.BaseDateFilter):
+    pass
+
+
+class DateSmallerFilter(FilterSmaller, filters.BaseDateFilter):
+    pass
+
+
+class DateTimeEqualFilter(FilterEqual, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeNotEqualFilter(FilterNotEqual, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeGreaterFilter(FilterGreater, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeSmallerFilter(FilterSmaller, filters.BaseDateTimeFilter):
+    pass
+
+
+# Base Django filter field converter
+class FilterConverter(filters.BaseFilterConverter):
+    strings = (FilterEqual, FilterNotEqual, FilterLike, FilterNotLike)
+    integers = (IntEqualFilter, IntNotEqualFilter, IntGreaterFilter,
+                IntSmallerFilter)
+    floats = (FloatEqualFilter, FloatNotEqualFilter, FloatGreaterFilter,
+              FloatSmallerFilter)
+    dates = (DateEqualFilter, DateNotEqualFilter, DateGreaterFilter,
+             DateSmallerFilter)
+    datetimes = (DateTimeEqualFilter, DateTimeNotEqualFilter,
+                 DateTimeGreaterFilter, DateTimeSmallerFilter)
+
+    @filters.convert('CharField', 'TextField', 'SlugField', 'EmailField',
+                     'URLField')
+    def conv_string(self, column, name):
+        return [f(column, name) for f in self.strings]
+
+    @filters.convert('BooleanField', 'NullBooleanField')
+    def conv_bool(self, column, name):
+        return [BooleanEqualFilter(column, name),
+                BooleanNotEqualFilter(column, name)]
+
+    @filters.convert('AutoField', 'IntegerField', 'SmallIntegerField',
+                     'BigIntegerField', 'PositiveIntegerField',
+                     'PositiveSmallIntegerField')
+    def conv_int(self, column, name):
+        return [f(column, name) for f in self.integers]
+
+    @filters.convert('FloatField', 'DecimalField')
+    def conv_float(self, column, name):
+        return [f(column, name) for f in self.floats]
+
+    @filters.convert('DateField')
+    def conv_date(self, column, name):
+        return [f(column, name, data_type='datepicker') for f in self.dates]
+
+    @filters.convert('DateTimeField')
+    def conv_datetime(self, column, name):
+        return [f(column, name, data_type='datetimepicker')
+                for f in self.datetimes]
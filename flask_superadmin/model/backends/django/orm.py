@@ -57,7 +57,9 @@ class AdminModelConverter(ModelConverterBase):
         f.TextAreaField: ['TextField', 'XMLField'],
     }
 
-    def __init__(self, extra_converters=None, simple_conversions=None):
+    def __init__(self, extra_converters=None, simple_conversions=None,
+                 view=None):
+        self.view = view
         converters = {}
         if simple_conversions is None:
             simple_conversions = self.DEFAULT_SIMPLE_CONVERSIONS
@@ -76,6 +78,11 @@ class AdminModelConverter(ModelConverterBase):
         return _converter
 
     def conv_ForeignKey(self, model, field, kwargs):
+        if self.view is not None and model is self.view.model:
+            form_field = self.view.get_relation_field(
+                field.name, allow_blank=field.null, **kwargs)
+            if form_field is not None:
+                return form_field
         return ModelSelectField(widget=form.ChosenSelectWidget(),
                                 model=field.rel.to, **kwargs)
 
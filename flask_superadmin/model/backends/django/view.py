@@ -1,11 +1,50 @@
-from flask_superadmin.model.base import BaseModelAdmin
+from flask_superadmin.model.base import BaseModelAdmin, DATE_LEVELS, chunked
 
+from ajax import QuerySetAjaxModelLoader
+from filters import FilterConverter
 from orm import model_form, AdminModelConverter
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import signals
+from django.db.models import Count
+from django.db.models.fields import FieldDoesNotExist
+from django.conf import settings
+from django.utils import timezone
 
+import datetime
 import operator
 
+# Internal types of the fields exported with a type in the columnar formats
+EXPORT_TYPES = {
+    'CharField': 'string',
+    'TextField': 'string',
+    'SlugField': 'string',
+    'EmailField': 'string',
+    'URLField': 'string',
+    'AutoField': 'int',
+    'IntegerField': 'int',
+    'BigIntegerField': 'int',
+    'SmallIntegerField': 'int',
+    'PositiveIntegerField': 'int',
+    'PositiveSmallIntegerField': 'int',
+    'FloatField': 'float',
+    'DecimalField': 'float',
+    'BooleanField': 'bool',
+    'NullBooleanField': 'bool',
+    'DateField': 'date',
+    'DateTimeField': 'datetime',
+}
+
+def has_receivers(signal, sender):
+    if hasattr(signal, 'has_listeners'):
+        return signal.has_listeners(sender)
+    # Django < 1.5
+    from django.dispatch.dispatcher import _make_id
+    return bool(signal._live_receivers(_make_id(sender)))
+
+
 class ModelAdmin(BaseModelAdmin):
+    filter_converter = FilterConverter()
+
     @staticmethod
     def model_detect(model):
         return issubclass(model, models.Model)
@@ -17,11 +56,105 @@ class ModelAdmin(BaseModelAdmin):
         return model_form
 
     def get_converter(self):
-        return AdminModelConverter
+        return AdminModelConverter(view=self)
+
+    def create_ajax_loader(self, name, options):
+        return QuerySetAjaxModelLoader(self, name, options)
+
+    def scaffold_filters(self, name):
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        return self.filter_converter.convert(field.get_internal_type(), name,
+                                             self.field_name(name))
 
     def get_queryset(self):
         return self.model.objects
 
+    def count_queryset(self, qs):
+        return qs.count()
+
+    def count_facets(self, qs, fields):
+        # One GROUP BY over all the facet fields, the count of every field's
+        # values is summed up from the combinations
+        rows = (qs.order_by().values(*fields)
+                .annotate(_facet_count=Count('pk')))
+
+        counts = dict((name, {}) for name in fields)
+        for row in rows:
+            for name in fields:
+                value = row[name]
+                counts[name][value] = (counts[name].get(value, 0) +
+                                       row['_facet_count'])
+        return counts
+
+    def apply_date_range(self, qs, start, end):
+        return qs.filter(**{'%s__gte' % self.date_hierarchy: start,
+                            '%s__lt' % self.date_hierarchy: end})
+
+    def count_date_buckets(self, qs, level):
+        connection = connections[router.db_for_read(self.model)]
+        opts = self.model._meta
+        quote_name = connection.ops.quote_name
+        field = opts.get_field(self.date_hierarchy)
+        column = '%s.%s' % (quote_name(opts.db_table), quote_name(field.column))
+        params = []
+        if (isinstance(field, models.DateTimeField) and
+                hasattr(connection.ops, 'datetime_trunc_sql')):
+            # Truncated in the current time zone (like `QuerySet.datetimes`)
+            # so that the buckets match the ranges they filter on
+            tzname = (timezone.get_current_timezone_name()
+                      if settings.USE_TZ else None)
+            bucket_sql, params = connection.ops.datetime_trunc_sql(
+                level, column, tzname)
+        else:
+            bucket_sql = connection.ops.date_trunc_sql(level, column)
+
+        # The same truncation as `QuerySet.dates`, grouped and counted
+        rows = (qs.order_by().extra(select={'_bucket': bucket_sql},
+                                    select_params=params)
+                .values('_bucket').annotate(_count=Count('pk')))
+
+        size = DATE_LEVELS.index(level) + 1
+        buckets = []
+        for row in rows:
+            bucket = row['_bucket']
+            if bucket is None:
+                continue
+            # SQLite returns the truncated date as a string
+            if isinstance(bucket, basestring):
+                bucket = datetime.datetime.strptime(bucket[:10], '%Y-%m-%d')
+            parts = (bucket.year, bucket.month, bucket.day)[:size]
+            buckets.append((parts, row['_count']))
+        return sorted(buckets)
+
+    def estimate_count(self):
+        # The statistics cover the whole table, not a custom queryset
+        if (type(self).get_queryset.im_func is not
+                ModelAdmin.get_queryset.im_func):
+            return None
+
+        connection = connections[router.db_for_read(self.model)]
+        table = self.model._meta.db_table
+
+        if connection.vendor == 'postgresql':
+            sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+        elif connection.vendor == 'mysql':
+            sql = ('SELECT table_rows FROM information_schema.tables '
+                   'WHERE table_schema = DATABASE() AND table_name = %s')
+        else:
+            return None
+
+        cursor = connection.cursor()
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+
+        # Tables that were never analyzed report a negative estimate
+        if row is None or row[0] is None or row[0] < 0:
+            return None
+        return int(row[0])
+
     def get_objects(self, *pks):
         return self.get_queryset().filter(pk__in=pks)
 
@@ -34,12 +167,81 @@ class ModelAdmin(BaseModelAdmin):
     def save_model(self, instance, form, adding=False):
         form.populate_obj(instance)
         instance.save()
+        self.get_choices_cache().invalidate(self.model)
         return instance
 
-    def delete_models(self, *pks):
-        self.get_objects(*pks).delete()
+    def save_models(self, instances, forms):
+        if type(self).save_model.im_func is not ModelAdmin.save_model.im_func:
+            return super(ModelAdmin, self).save_models(instances, forms)
+
+        # `atomic` replaced `commit_on_success` in Django 1.6
+        atomic = getattr(transaction, 'atomic', None)
+        if atomic is None:
+            atomic = transaction.commit_on_success
+        with atomic(using=router.db_for_write(self.model)):
+            for instance, form in zip(instances, forms):
+                form.populate_obj(instance)
+                instance.save()
+        self.get_choices_cache().invalidate(self.model)
+
+    def insert_models(self, instances):
+        # `bulk_create` runs in a transaction but doesn't set generated
+        # primary keys
+        self.model.objects.bulk_create(instances)
+        self.get_choices_cache().invalidate(self.model)
+        return [instance for instance in instances if instance.pk is not None]
+
+    def can_bulk_insert(self):
+        """ Returns whether objects can be saved with `bulk_create` (or
+        `QuerySet.update`), i.e. neither `save_model` nor the model's `save`
+        are overridden and no save signal handlers are connected.
+        """
+        if type(self).save_model.im_func is not ModelAdmin.save_model.im_func:
+            return False
+        if self.model.save.im_func is not models.Model.save.im_func:
+            return False
+        if (has_receivers(signals.pre_save, self.model) or
+                has_receivers(signals.post_save, self.model)):
+            return False
         return True
 
+    def can_bulk_update(self, names):
+        """ Returns whether the fields can be changed with
+        `QuerySet.update` (see `can_bulk_insert`) and are concrete (not
+        many-to-many).
+        """
+        if not self.can_bulk_insert():
+            return False
+        for name in names:
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return False
+            if isinstance(field, models.ManyToManyField):
+                return False
+        return True
+
+    def update_models(self, pks, values):
+        count = self.get_objects(*pks).update(**values)
+        self.get_choices_cache().invalidate(self.model)
+        return count
+
+    def delete_models(self, *pks):
+        # QuerySet.delete issues a single DELETE per batch and only collects
+        # the objects itself when cascades or delete signals require it
+        count = 0
+        for batch in chunked(pks, self.delete_batch_size):
+            qs = self.get_objects(*batch)
+            count += qs.count()
+            qs.delete()
+        self.get_choices_cache().invalidate(self.model)
+        return count
+
+    def get_pk_batch(self, qs, after=None, limit=None):
+        if after is not None:
+            qs = qs.filter(pk__gt=after)
+        return list(qs.order_by('pk').values_list('pk', flat=True)[:limit])
+
     def construct_search(self, field_name):
         if field_name.startswith('^'):
             return "%s__istartswith" % field_name[1:]
@@ -48,29 +250,187 @@ class ModelAdmin(BaseModelAdmin):
         else:
             return "%s__icontains" % field_name
 
-    def get_list(self, page=0, sort=None, sort_desc=None, execute=False, search_query=None):
-        qs = self.get_queryset()
+    def apply_search(self, qs, search_query):
+        orm_lookups = [self.construct_search(str(search_field))
+                       for search_field in self.search_fields]
+        for bit in search_query.split():
+            or_queries = [models.Q(**{orm_lookup: bit})
+                          for orm_lookup in orm_lookups]
+            qs = qs.filter(reduce(operator.or_, or_queries))
+        return qs
 
-        # Filter by search query
-        if search_query and self.search_fields:
-            orm_lookups = [self.construct_search(str(search_field))
-                           for search_field in self.search_fields]
-            for bit in search_query.split():
-                or_queries = [models.Q(**{orm_lookup: bit})
-                              for orm_lookup in orm_lookups]
-                qs = qs.filter(reduce(operator.or_, or_queries))
+    def filter_pks(self, qs, pks):
+        return qs.filter(pk__in=pks)
 
-        #Calculate number of rows
-        count = qs.count()
+    def get_search_indexes(self):
+        opts = self.model._meta
+        indexes = {}
+        for field in opts.fields:
+            if field.primary_key:
+                indexes[field.name] = 'primary key'
+            elif field.unique:
+                indexes[field.name] = 'unique'
+            elif field.db_index:
+                indexes[field.name] = 'index'
+
+        # Only the leading field of a composite index can be searched with it
+        for names in opts.unique_together:
+            indexes.setdefault(names[0], 'unique together')
+        for index in getattr(opts, 'indexes', ()):
+            indexes.setdefault(index.fields[0].lstrip('-'),
+                               index.name or 'index')
+        return indexes
+
+    def construct_lookup(self, field_name, operator):
+        if operator == 'exact':
+            return field_name
+        elif operator == 'prefix':
+            # Case sensitive, so that the index can be used
+            return "%s__startswith" % field_name
+        else:
+            return "%s__icontains" % field_name
+
+    def get_query_text(self, qs):
+        return unicode(qs.query)
+
+    def apply_lookups(self, qs, terms):
+        for lookups in terms:
+            or_queries = [models.Q(**{self.construct_lookup(field, op): word})
+                          for field, op, word in lookups]
+            qs = qs.filter(reduce(operator.or_, or_queries))
+        return qs
+
+    def apply_keyset(self, qs, sort=None, sort_desc=None, after=None,
+                     before=None):
+        """ Orders the queryset by the sort field and the primary key and
+        seeks past the row identified by the `after` or `before` cursor.
+        """
+        # Rows before the cursor are fetched in reverse order
+        descending = bool(sort_desc) != (before is not None)
+        op = 'lt' if descending else 'gt'
+
+        cursor = after if after is not None else before
+        if cursor is not None:
+            try:
+                boundary = self.get_object(cursor)
+            except (self.model.DoesNotExist, ValueError):
+                boundary = None
+            if boundary is not None:
+                seek = models.Q(**{'pk__%s' % op: boundary.pk})
+                if sort:
+                    value = getattr(boundary, sort)
+                    seek = (models.Q(**{'%s__%s' % (sort, op): value}) |
+                            (models.Q(**{sort: value}) & seek))
+                qs = qs.filter(seek)
+
+        order = ['pk'] if not sort else [sort, 'pk']
+        if descending:
+            order = ['-%s' % f for f in order]
+        return qs.order_by(*order)
 
-        #Order queryset
+    def is_loadable(self, name):
+        return name in [f.name for f in self.model._meta.fields]
+
+    def apply_projection(self, qs):
+        """ Restricts the fields loaded for the list view to the ones
+        returned by `get_list_load_fields`.
+        """
+        names = self.get_list_load_fields()
+        if names is None:
+            return qs
+        return qs.only(*names)
+
+    def apply_eager_loading(self, qs):
+        """ Loads the relations used by the list view: foreign keys are
+        joined with `select_related` ('select'), many-to-many and reverse
+        relations are fetched with `prefetch_related` ('prefetch').
+        """
+        relations = self.get_list_relations()
+        select, prefetch = [], []
+        for path in sorted(relations):
+            model = self.model
+            lookup = []
+            strategy = relations[path]
+            for part in path.split('.'):
+                try:
+                    field, _, direct, m2m = model._meta.get_field_by_name(part)
+                except models.FieldDoesNotExist:
+                    lookup = None
+                    break
+
+                if direct and not m2m and getattr(field, 'rel', None):
+                    model = field.rel.to
+                elif m2m or not direct:
+                    strategy = strategy or 'prefetch'
+                    model = (field.rel.to if direct else field.model)
+                else:
+                    lookup = None
+                    break
+                lookup.append(part)
+
+            if lookup:
+                if (strategy or 'select') == 'select':
+                    select.append('__'.join(lookup))
+                else:
+                    prefetch.append('__'.join(lookup))
+
+        if select:
+            qs = qs.select_related(*select)
+        if prefetch:
+            qs = qs.prefetch_related(*prefetch)
+        return qs
+
+    def get_export_queryset(self, search_query=None, filters=None,
+                            date_bucket=None, sort=None, sort_desc=None):
+        qs = self.get_filtered_queryset(search_query, filters, date_bucket)
+        qs = self.apply_projection(qs)
+        qs = self.apply_eager_loading(qs)
         if sort:
             qs = qs.order_by('%s%s' % ('-' if sort_desc else '', sort))
+        # `iterator` doesn't cache the rows (nor runs prefetch_related)
+        return qs.iterator()
+
+    def get_export_type(self, name):
+        model = self.model
+        parts = name.split('.')
+        for part in parts:
+            if hasattr(self, part) and callable(getattr(self, part)):
+                return None
+        try:
+            for part in parts[:-1]:
+                field = model._meta.get_field(part)
+                if not isinstance(field, models.ForeignKey):
+                    return None
+                model = field.rel.to
+            field = model._meta.get_field(parts[-1])
+        except FieldDoesNotExist:
+            return None
+        if isinstance(field, models.ForeignKey):
+            return None
+        return EXPORT_TYPES.get(field.get_internal_type())
+
+    def get_list(self, page=0, sort=None, sort_desc=None, execute=False,
+                 search_query=None, filters=None, date_bucket=None,
+                 after=None, before=None):
+        qs = self.get_filtered_queryset(search_query, filters, date_bucket)
+
+        #Calculate number of rows
+        count = self.get_count(qs, search_query, filters, date_bucket)
+
+        qs = self.apply_projection(qs)
+        qs = self.apply_eager_loading(qs)
+
+        if self.pagination == 'keyset':
+            qs = self.apply_keyset(qs, sort, sort_desc, after, before)
+        else:
+            #Order queryset
+            if sort:
+                qs = qs.order_by('%s%s' % ('-' if sort_desc else '', sort))
 
-        # Pagination
-        if page is not None:
-            qs = qs.all()[page * self.list_per_page:]
-        qs = qs[:self.list_per_page]
+            # Pagination
+            if page is not None:
+                qs = qs.all()[page * self.list_per_page:]
+        qs = qs[:self.list_fetch_size]
 
         if execute:
             qs = list(qs)
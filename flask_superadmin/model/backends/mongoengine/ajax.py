@@ -0,0 +1,49 @@
+import operator
+
+from mongoengine import ListField, ReferenceField, ValidationError
+from mongoengine.queryset import Q
+
+from flask_superadmin.model.ajax import AjaxModelLoader
+
+
+class QuerySetAjaxModelLoader(AjaxModelLoader):
+    """ AJAX loader for the documents referenced by a `ReferenceField` (or
+    a `ListField` of them).
+    """
+    def __init__(self, view, name, options):
+        super(QuerySetAjaxModelLoader, self).__init__(view, name, options)
+
+        field = view.model._fields[name]
+        if isinstance(field, ListField):
+            field = field.field
+        if not isinstance(field, ReferenceField):
+            raise Exception('AJAX lookup of %r needs a reference field' % name)
+        self.model = field.document_type
+
+    def get_pk(self, obj):
+        return obj.pk
+
+    def coerce_pk(self, pk):
+        field = self.model._fields[self.model._meta['id_field']]
+        try:
+            field.validate(pk)
+        except ValidationError, ex:
+            raise ValueError(ex)
+        return field.to_python(pk)
+
+    def get_many(self, pks):
+        pks = self.coerce_pks(pks)
+        if not pks:
+            return []
+        return list(self.model.objects(pk__in=pks))
+
+    def get_list(self, term, offset=0, limit=None):
+        qs = self.model.objects
+        if term:
+            qs = qs.filter(reduce(operator.or_,
+                                  [Q(**{'%s__icontains' % field: term})
+                                   for field in self.fields]))
+        qs = qs.order_by('id').skip(offset)
+        if limit is not None:
+            qs = qs.limit(limit)
+        return list(qs)
@@ -0,0 +1,164 @@
+from flask_superadmin.babel import gettext
+
+from flask_superadmin.model import filters
+
+
+class BaseMongoEngineFilter(filters.BaseFilter):
+    """
+        Base MongoEngine filter.
+    """
+    def __init__(self, column, name, options=None, data_type=None):
+        """
+            Constructor.
+
+            `column`
+                Document field name
+            `name`
+                Display name
+            `options`
+                Fixed set of options
+            `data_type`
+                Client data type
+        """
+        super(BaseMongoEngineFilter, self).__init__(name, options, data_type)
+
+        self.column = column
+
+
+# Common filters
+class FilterEqual(BaseMongoEngineFilter):
+    def apply(self, query, value):
+        return query.filter(**{self.column: value})
+
+    def operation(self):
+        return gettext('equals')
+
+
+class FilterNotEqual(BaseMongoEngineFilter):
+    def apply(self, query, value):
+        return query.filter(**{'%s__ne' % self.column: value})
+
+    def operation(self):
+        return gettext('not equal')
+
+
+class FilterLike(BaseMongoEngineFilter):
+    def apply(self, query, value):
+        return query.filter(**{'%s__icontains' % self.column: value})
+
+    def operation(self):
+        return gettext('contains')
+
+
+class FilterNotLike(BaseMongoEngineFilter):
+    def apply(self, query, value):
+        return query.filter(**{'%s__not__icontains' % self.column: value})
+
+    def operation(self):
+        return gettext('not contains')
+
+
+class FilterGreater(BaseMongoEngineFilter):
+    def apply(self, query, value):
+        return query.filter(**{'%s__gt' % self.column: value})
+
+    def operation(self):
+        return gettext('greater than')
+
+
+class FilterSmaller(BaseMongoEngineFilter):
+    def apply(self, query, value):
+        return query.filter(**{'%s__lt' % self.column: value})
+
+    def operation(self):
+        return gettext('smaller than')
+
+
+# Customized type filters
+class BooleanEqualFilter(FilterEqual, filters.BaseBooleanFilter):
+    pass
+
+
+class BooleanNotEqualFilter(FilterNotEqual, filters.BaseBooleanFilter):
+    pass
+
+
+class IntEqualFilter(FilterEqual, filters.BaseIntFilter):
+    pass
+
+
+class IntNotEqualFilter(FilterNotEqual, filters.BaseIntFilter):
+    pass
+
+
+class IntGreaterFilter(FilterGreater, filters.BaseIntFilter):
+    pass
+
+
+class IntSmallerFilter(FilterSmaller, filters.BaseIntFilter):
+    pass
+
+
+class FloatEqualFilter(FilterEqual, filters.BaseFloatFilter):
+    pass
+
+
+class FloatNotEqualFilter(FilterNotEqual, filters.BaseFloatFilter):
+    pass
+
+
+class FloatGreaterFilter(FilterGreater, filters.BaseFloatFilter):
+    pass
+
+
+class FloatSmallerFilter(FilterSmaller, filters.BaseFloatFilter):
+    pass
+
+
+class DateTimeEqualFilter(FilterEqual, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeNotEqualFilter(FilterNotEqual, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeGreaterFilter(FilterGreater, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeSmallerFilter(FilterSmaller, filters.BaseDateTimeFilter):
+    pass
+
+
+# Base MongoEngine filter field converter
+class FilterConverter(filters.BaseFilterConverter):
+    strings = (FilterEqual, FilterNotEqual, FilterLike, FilterNotLike)
+    integers = (IntEqualFilter, IntNotEqualFilter, IntGreaterFilter,
+                IntSmallerFilter)
+    floats = (FloatEqualFilter, FloatNotEqualFilter, FloatGreaterFilter,
+              FloatSmallerFilter)
+    datetimes = (DateTimeEqualFilter, DateTimeNotEqualFilter,
+                 DateTimeGreaterFilter, DateTimeSmallerFilter)
+
+    @filters.convert('StringField', 'EmailField', 'URLField')
+    def conv_string(self, column, name):
+        return [f(column, name) for f in self.strings]
+
+    @filters.convert('BooleanField')
+    def conv_bool(self, column, name):
+        return [BooleanEqualFilter(column, name),
+                BooleanNotEqualFilter(column, name)]
+
+    @filters.convert('IntField', 'LongField')
+    def conv_int(self, column, name):
+        return [f(column, name) for f in self.integers]
+
+    @filters.convert('FloatField', 'DecimalField')
+    def conv_float(self, column, name):
+        return [f(column, name) for f in self.floats]
+
+    @filters.convert('DateTimeField', 'ComplexDateTimeField')
+    def conv_datetime(self, column, name):
+        return [f(column, name, data_type='datetimepicker')
+                for f in self.datetimes]
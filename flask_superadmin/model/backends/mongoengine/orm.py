@@ -27,7 +27,8 @@ def converts(*args):
 class ModelConverter(object):
     """ Manages the way MongoEngine fields are converted into WTForms fields
     """
-    def __init__(self, converters=None):
+    def __init__(self, converters=None, view=None):
+        self.view = view
 
         if not converters:
             converters = {}
@@ -40,6 +41,12 @@ class ModelConverter(object):
 
         self.converters = converters
 
+    def get_relation_field(self, model, field, multiple, kwargs):
+        # Only the view's own document (not embedded ones) is configured
+        if self.view is None or model is not self.view.model:
+            return None
+        return self.view.get_relation_field(field.name, multiple, **kwargs)
+
     def convert(self, model, field, field_args, multiple=False):
         kwargs = {
             'label': unicode(field.verbose_name or field.name or ''),
@@ -165,6 +172,9 @@ class ModelConverter(object):
         if field.field.choices:
             return self.convert(model, field.field, None, multiple=True)
         if isinstance(field.field, ReferenceField):
+            form_field = self.get_relation_field(model, field, True, kwargs)
+            if form_field is not None:
+                return form_field
             return ModelSelectMultipleField(model=field.field.document_type, **kwargs)
         unbound_field = self.convert(model, field.field, {})
         return ListField(unbound_field, min_entries=0, **kwargs)
@@ -196,6 +206,9 @@ class ModelConverter(object):
     @converts('ReferenceField')
     def conv_Reference(self, model, field, kwargs):
         kwargs['allow_blank'] = not field.required
+        form_field = self.get_relation_field(model, field, False, kwargs)
+        if form_field is not None:
+            return form_field
         return ModelSelectField(model=field.document_type, **kwargs)
 
     @converts('GenericReferenceField')
@@ -239,17 +252,37 @@ def model_fields(model, fields=None, readonly_fields=None, exclude=None,
 
 import mongoengine.fields as fields
 
+from bson.dbref import DBRef
+from bson.objectid import ObjectId
+from gridfs.grid_file import DEFAULT_CHUNK_SIZE
+
 _unset_value = object()
 _remove_file_value = object()
 
-def data_to_field(field, data):
+def write_file(gfs, stream, chunk_size=None, **kwargs):
+    """
+    Store the uploaded stream in GridFS (which reads and writes it a chunk
+    of `chunk_size` bytes at a time). If the upload fails, the partially
+    written file is removed instead of being kept truncated.
+    """
+    file_id = ObjectId()
+    try:
+        gfs.put(stream, _id=file_id,
+                chunkSize=chunk_size or DEFAULT_CHUNK_SIZE, **kwargs)
+    except Exception:
+        gfs.fs.delete(file_id)
+        raise
+    return gfs
+
+
+def data_to_field(field, data, chunk_size=None):
     if isinstance(field, fields.EmbeddedDocumentField):
-        return data_to_document(field.document_type_obj, data)
+        return data_to_document(field.document_type_obj, data, chunk_size)
     elif isinstance(field, (fields.ListField, fields.SequenceField,
                     fields.SortedListField)):
         l = []
         for d in data:
-            l.append(data_to_field(field.field, d))
+            l.append(data_to_field(field.field, d, chunk_size))
         return l
     elif isinstance(field, (fields.FileField)):
         if data.filename:
@@ -258,29 +291,74 @@ def data_to_field(field, data):
                         collection_name=field.collection_name,
                         instance=field.owner_document(),
                         key=field.name)
-            gfs.put(data.stream, filename=secure_filename(data.filename), content_type=data.mimetype)
-            return gfs
+            kwargs = dict(filename=secure_filename(data.filename),
+                          content_type=data.mimetype)
+            if isinstance(field, fields.ImageField):
+                # Images are resized and thumbnailed as a whole
+                gfs.put(data.stream, **kwargs)
+                return gfs
+            return write_file(gfs, data.stream, chunk_size, **kwargs)
         elif data.clear:
             return _remove_file_value
         return _unset_value
     elif isinstance(field, (fields.ReferenceField, fields.ObjectIdField)) and \
                     isinstance(data, basestring):
-        from bson.objectid import ObjectId
         return ObjectId(data)
     else:
         return data
 
 
-def data_to_document(document, data):
+def reference_id(value):
+    if isinstance(value, DBRef):
+        return value.id
+    return getattr(value, 'pk', value)
+
+
+def is_reference(field):
+    return (isinstance(field, fields.ReferenceField) or
+            (isinstance(field, fields.ListField) and
+             isinstance(field.field, fields.ReferenceField)))
+
+
+def reference_ids(field, value):
+    if isinstance(field, fields.ListField):
+        return [reference_id(v) for v in value or ()]
+    return reference_id(value)
+
+
+def data_to_document(document, data, chunk_size=None):
+    """
+    Populate the document with the form data. Only the fields whose values
+    differ are assigned (and embedded documents are updated field by field),
+    so that saving an existing document only `$set`s/`$unset`s what
+    actually changed. Uploaded files are written to GridFS in chunks of
+    `chunk_size` bytes.
+    """
     from inspect import isclass
     new = document() if isclass(document) else document
     for name, value in data.iteritems():
         field = getattr(new.__class__, name)
-        field_value = data_to_field(field, value)
+        if is_reference(field):
+            # Compared by ids, without dereferencing the current value(s)
+            current = new._data.get(name)
+            field_value = data_to_field(field, value, chunk_size)
+            if (reference_ids(field, current) !=
+                    reference_ids(field, field_value)):
+                setattr(new, name, field_value)
+            continue
+
+        current = getattr(new, name)
+        if (isinstance(field, fields.EmbeddedDocumentField) and
+                isinstance(current, field.document_type_obj) and
+                value is not None):
+            data_to_document(current, value, chunk_size)
+            continue
+
+        field_value = data_to_field(field, value, chunk_size)
         if field_value != _unset_value:
             if field_value == _remove_file_value:
-                getattr(new, name).delete()
-            else:
+                current.delete()
+            elif current != field_value:
                 setattr(new, name, field_value)
     return new
 
@@ -315,9 +393,12 @@ def model_form(model, base_class=Form, fields=None, readonly_fields=None,
     field_dict = model_fields(model, fields, readonly_fields, exclude,
                               field_args, converter)
     field_dict['model_class'] = model
+    # Size of the GridFS chunks uploaded files are written in
+    field_dict['gridfs_chunk_size'] = getattr(getattr(converter, 'view', None),
+                                              'gridfs_chunk_size', None)
 
     def populate_obj(self, obj):
-        return data_to_document(obj, self.data)
+        return data_to_document(obj, self.data, self.gridfs_chunk_size)
 
     field_dict['populate_obj'] = populate_obj
 
@@ -325,5 +406,17 @@ def model_form(model, base_class=Form, fields=None, readonly_fields=None,
 
 
 class AdminModelConverter(AdminModelConverter_, ModelConverter):
-    pass
+    def __init__(self, view=None):
+        super(AdminModelConverter, self).__init__(view=view)
+
+    @converts('FileField')
+    def conv_File(self, model, field, kwargs):
+        # Files of the view's own document link to its download endpoint
+        if self.view is not None and model is self.view.model:
+            kwargs['download_url'] = self.view.get_file_url
+        return f.FileField(**kwargs)
+
+    @converts('ImageField')
+    def conv_Image(self, model, field, kwargs):
+        return self.conv_File(model, field, kwargs)
 
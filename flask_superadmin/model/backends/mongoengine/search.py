@@ -0,0 +1,31 @@
+import operator
+
+from mongoengine.queryset import Q
+
+from flask_superadmin.model.search import SearchEngine, parse_query
+
+
+class TextSearch(SearchEngine):
+    """ Searches plain words with the collection's text index (`$text`),
+    e.g. declared as ``meta = {'indexes': [{'fields': ['$title', '$body']}]}``.
+    All the words must match. '^' and '=' words keep using (anchored)
+    lookups on the `search_fields`.
+    """
+    def apply(self, view, qs, search_query):
+        words = []
+        for op, word in parse_query(search_query):
+            if op is None:
+                words.append(word)
+                continue
+
+            lookups = [view.construct_search(op + str(field))
+                       for field in view.search_fields]
+            qs = qs.filter(reduce(operator.or_,
+                                  [Q(**{lookup: word}) for lookup in lookups]))
+
+        if words:
+            # Quoted words are all required by $text
+            search = u' '.join(u'"%s"' % word.replace(u'"', u'')
+                               for word in words)
+            qs = qs.filter(__raw__={'$text': {'$search': search}})
+        return qs
@@ -1,12 +1,42 @@
-from flask_superadmin.model.base import BaseModelAdmin
+from flask import request, url_for, abort, current_app
+from werkzeug.wsgi import wrap_file
 
+from flask_superadmin.base import expose
+from flask_superadmin.model.base import BaseModelAdmin, DATE_LEVELS, chunked
+
+from ajax import QuerySetAjaxModelLoader
+from filters import FilterConverter
 from orm import model_form, AdminModelConverter
+from search import TextSearch
 
 import operator
 import mongoengine
 
+from mongoengine import signals
+
 from bson.objectid import ObjectId
 
+# Aggregation operators extracting the levels of the date hierarchy
+DATE_OPERATORS = {
+    'year': '$year',
+    'month': '$month',
+    'day': '$dayOfMonth',
+}
+
+# Field classes (matched by class, then by their base classes) of the fields
+# exported with a type in the columnar formats
+EXPORT_TYPES = {
+    'StringField': 'string',
+    'IntField': 'int',
+    'LongField': 'int',
+    'FloatField': 'float',
+    'DecimalField': 'float',
+    'BooleanField': 'bool',
+    'DateField': 'date',
+    'DateTimeField': 'datetime',
+    'ComplexDateTimeField': 'datetime',
+}
+
 SORTABLE_FIELDS = (
     mongoengine.BooleanField,
     mongoengine.DateTimeField,
@@ -17,8 +47,29 @@ SORTABLE_FIELDS = (
     mongoengine.ReferenceField
 )
 
+# Fields whose form data can be stored by `QuerySet.update` as it is;
+# embedded documents, lists and files have to go through the document
+BULK_UPDATE_FIELDS = (
+    mongoengine.BooleanField,
+    mongoengine.DateTimeField,
+    mongoengine.DecimalField,
+    mongoengine.FloatField,
+    mongoengine.IntField,
+    mongoengine.LongField,
+    mongoengine.ObjectIdField,
+    mongoengine.StringField,
+    mongoengine.ReferenceField
+)
+
 
 class ModelAdmin(BaseModelAdmin):
+    search_engines = dict(BaseModelAdmin.search_engines, text=TextSearch)
+
+    filter_converter = FilterConverter()
+
+    # Size of the GridFS chunks uploaded files are written and served in
+    gridfs_chunk_size = 255 * 1024
+
     @staticmethod
     def model_detect(model):
         return issubclass(model, mongoengine.Document)
@@ -34,11 +85,86 @@ class ModelAdmin(BaseModelAdmin):
         return model_form
 
     def get_converter(self):
-        return AdminModelConverter
+        return AdminModelConverter(self)
+
+    def create_ajax_loader(self, name, options):
+        return QuerySetAjaxModelLoader(self, name, options)
+
+    def scaffold_filters(self, name):
+        field = self.model._fields.get(name)
+        if field is None:
+            return None
+
+        # Fields are matched by class, then by their base classes
+        for field_class in type(field).__mro__:
+            filters = self.filter_converter.convert(field_class.__name__,
+                                                    name,
+                                                    self.field_name(name))
+            if filters:
+                return filters
+        return None
 
     def get_queryset(self):
         return self.model.objects
 
+    def count_queryset(self, qs):
+        return qs.count()
+
+    def count_facets(self, qs, fields):
+        # A single aggregation with one $group per field in a $facet stage,
+        # after the $match of the queryset
+        facets = {}
+        for name in fields:
+            db_field = self.model._fields[name].db_field
+            facets[name] = [{'$group': {'_id': '$%s' % db_field,
+                                        'count': {'$sum': 1}}}]
+        pipeline = [{'$match': qs._query}, {'$facet': facets}]
+        result = self.model._get_collection().aggregate(pipeline)
+        # Older pymongo versions return the whole command response
+        if isinstance(result, dict):
+            result = result['result']
+
+        counts = dict((name, {}) for name in fields)
+        for document in result:
+            for name in fields:
+                for group in document.get(name, ()):
+                    counts[name][group['_id']] = group['count']
+        return counts
+
+    def apply_date_range(self, qs, start, end):
+        return qs.filter(**{'%s__gte' % self.date_hierarchy: start,
+                            '%s__lt' % self.date_hierarchy: end})
+
+    def count_date_buckets(self, qs, level):
+        db_field = '$%s' % self.model._fields[self.date_hierarchy].db_field
+        levels = DATE_LEVELS[:DATE_LEVELS.index(level) + 1]
+        group = dict((name, {DATE_OPERATORS[name]: db_field})
+                     for name in levels)
+        pipeline = [{'$match': qs._query},
+                    {'$match': {db_field[1:]: {'$type': 9}}},
+                    {'$group': {'_id': group, 'count': {'$sum': 1}}}]
+        result = self.model._get_collection().aggregate(pipeline)
+        # Older pymongo versions return the whole command response
+        if isinstance(result, dict):
+            result = result['result']
+
+        return sorted((tuple(document['_id'][name] for name in levels),
+                       document['count'])
+                      for document in result)
+
+    def estimate_count(self):
+        # The metadata covers the whole collection, not a custom queryset
+        if (type(self).get_queryset.im_func is not
+                ModelAdmin.get_queryset.im_func):
+            return None
+
+        # Counting a whole collection is answered from its metadata
+        collection = self.model._get_collection()
+        estimate = getattr(collection, 'estimated_document_count', None)
+        if estimate is not None:
+            return estimate()
+        return collection.count()
+
     def get_objects(self, *pks):
         return self.get_queryset().filter(pk__in=pks)
 
@@ -48,16 +174,152 @@ class ModelAdmin(BaseModelAdmin):
     def get_pk(self, instance):
         return str(instance.id)
 
+    def get_file_url(self, proxy):
+        """ Returns the URL of the download endpoint for the GridFS file of
+        a document of the view, or None.
+        """
+        if not proxy or not isinstance(proxy.instance, self.model):
+            return None
+        if proxy.instance.pk is None:
+            return None
+        return url_for('.download_file', pk=self.get_pk(proxy.instance),
+                       name=proxy.key)
+
+    @expose('/<pk>/file/<name>/')
+    def download_file(self, pk, name):
+        """ Streams the GridFS file stored in the `name` field of a
+        document, a chunk at a time. Range requests are answered with the
+        requested part only and the md5 of the file serves as its ETag.
+        """
+        field = self.model._fields.get(name)
+        if not isinstance(field, mongoengine.FileField):
+            abort(404)
+        try:
+            instance = self.get_object(pk)
+        except (self.model.DoesNotExist, mongoengine.ValidationError):
+            abort(404)
+
+        grid_out = getattr(instance, name).get()
+        if grid_out is None:
+            abort(404)
+
+        # GridOut seeks to the start of a range without reading the chunks
+        # before it
+        data = wrap_file(request.environ, grid_out, self.gridfs_chunk_size)
+        response = current_app.response_class(
+            data, mimetype=grid_out.content_type or 'application/octet-stream',
+            direct_passthrough=True)
+        response.content_length = grid_out.length
+        response.last_modified = grid_out.upload_date
+        response.set_etag(grid_out.md5 or str(grid_out._id))
+        if grid_out.filename:
+            response.headers.set('Content-Disposition', 'inline',
+                                 filename=grid_out.filename)
+        return response.make_conditional(request, accept_ranges=True,
+                                         complete_length=grid_out.length)
+
     def save_model(self, instance, form, adding=False):
         form.populate_obj(instance)
         instance.save()
+        self.get_choices_cache().invalidate(self.model)
         return instance
 
+    def insert_models(self, instances):
+        # Ids are generated here, so that the documents a failing insert
+        # wrote before the error can be removed again
+        id_field = self.model._fields[self.model._meta['id_field']]
+        ids = []
+        for document in instances:
+            document.validate()
+            if document.pk is None and isinstance(id_field,
+                                                  mongoengine.ObjectIdField):
+                document.pk = ObjectId()
+                ids.append(document.pk)
+
+        try:
+            self.model.objects.insert(instances, load_bulk=False)
+        except Exception:
+            if ids:
+                self.model.objects(pk__in=ids).delete()
+            raise
+
+        # Saved like `Document.save` leaves them
+        for document in instances:
+            document._created = False
+            document._clear_changed_fields()
+        self.get_choices_cache().invalidate(self.model)
+        return instances
+
+    def can_bulk_delete(self):
+        """ Returns whether documents can be removed with
+        `QuerySet.delete`, i.e. the document doesn't override `delete` and
+        no delete signal handlers are connected. Delete rules are applied by
+        the queryset as well.
+        """
+        delete = getattr(self.model.delete, 'im_func', self.model.delete)
+        if delete is not mongoengine.Document.delete.im_func:
+            return False
+        if signals.signals_available and (
+                signals.pre_delete.has_receivers_for(self.model) or
+                signals.post_delete.has_receivers_for(self.model)):
+            return False
+        return True
+
     def delete_models(self, *pks):
-        for obj in self.get_objects(*pks):
-            obj.delete()
+        bulk = self.can_bulk_delete()
+        count = 0
+        for batch in chunked(pks, self.delete_batch_size):
+            qs = self.get_objects(*batch)
+            if bulk:
+                count += qs.count()
+                qs.delete()
+            else:
+                for obj in qs:
+                    obj.delete()
+                    count += 1
+        self.get_choices_cache().invalidate(self.model)
+        return count
+
+    def can_bulk_insert(self):
+        """ Returns whether documents can be saved with `QuerySet.insert`
+        (or `QuerySet.update`), i.e. neither `save_model` nor the
+        document's `save` are overridden and no save signal handlers are
+        connected.
+        """
+        if type(self).save_model.im_func is not ModelAdmin.save_model.im_func:
+            return False
+        save = getattr(self.model.save, 'im_func', self.model.save)
+        if save is not mongoengine.Document.save.im_func:
+            return False
+        if signals.signals_available and (
+                signals.pre_save.has_receivers_for(self.model) or
+                signals.post_save.has_receivers_for(self.model)):
+            return False
         return True
 
+    def can_bulk_update(self, names):
+        """ Returns whether the fields can be changed with
+        `QuerySet.update` (see `can_bulk_insert`) and are all scalar or
+        reference fields.
+        """
+        if not self.can_bulk_insert():
+            return False
+        return all(isinstance(self.model._fields.get(name), BULK_UPDATE_FIELDS)
+                   for name in names)
+
+    def update_models(self, pks, values):
+        count = self.get_objects(*pks).update(
+            **dict(('set__%s' % name, value)
+                   for name, value in values.iteritems()))
+        self.get_choices_cache().invalidate(self.model)
+        return count
+
+    def get_pk_batch(self, qs, after=None, limit=None):
+        id_field = self.model._meta['id_field']
+        if after is not None:
+            qs = qs.filter(pk__gt=after)
+        return list(qs.order_by(id_field).limit(limit).scalar(id_field))
+
     def construct_search(self, field_name):
         if field_name.startswith('^'):
             return "%s__istartswith" % field_name[1:]
@@ -66,32 +328,206 @@ class ModelAdmin(BaseModelAdmin):
         else:
             return "%s__icontains" % field_name
 
-    def get_list(self, page=0, sort=None, sort_desc=None, execute=False, search_query=None):
-        qs = self.get_queryset()
+    def apply_search(self, qs, search_query):
+        orm_lookups = [self.construct_search(str(search_field))
+                       for search_field in self.search_fields]
+        for bit in search_query.split():
+            or_queries = [mongoengine.queryset.Q(**{orm_lookup: bit})
+                          for orm_lookup in orm_lookups]
+            qs = qs.filter(reduce(operator.or_, or_queries))
+        return qs
 
-        # Filter by search query
-        if search_query and self.search_fields:
-            orm_lookups = [self.construct_search(str(search_field))
-                           for search_field in self.search_fields]
-            for bit in search_query.split():
-                or_queries = [mongoengine.queryset.Q(**{orm_lookup: bit})
-                              for orm_lookup in orm_lookups]
-                qs = qs.filter(reduce(operator.or_, or_queries))
+    def filter_pks(self, qs, pks):
+        return qs.filter(pk__in=pks)
 
-        #Calculate number of documents
-        count = qs.count()
+    def get_search_indexes(self):
+        try:
+            information = self.model._get_collection().index_information()
+            specs = information.items()
+        except Exception:
+            # Without a database connection, use the declared indexes
+            specs = [('index', {'key': spec['fields'],
+                                'unique': spec.get('unique', False)})
+                     for spec in self.model._meta.get('index_specs', ())]
+
+        id_field = self.model._meta['id_field']
+        names = dict((field.db_field, name)
+                     for name, field in self.model._fields.iteritems())
+        names['_id'] = id_field
+
+        indexes = {}
+        for index_name, spec in specs:
+            db_field, direction = spec['key'][0]
+            # Text, geo and hashed indexes can't serve prefix lookups
+            if direction not in (1, -1):
+                continue
+            name = names.get(db_field, db_field)
+            if name == id_field:
+                description = 'primary key'
+            elif spec.get('unique'):
+                description = '%s (unique)' % index_name
+            else:
+                description = index_name
+            indexes.setdefault(name, description)
+        return indexes
+
+    def construct_lookup(self, field_name, operator):
+        if operator == 'exact':
+            return field_name
+        elif operator == 'prefix':
+            # Case sensitive, so that the index can be used
+            return "%s__startswith" % field_name
+        else:
+            return "%s__icontains" % field_name
+
+    def get_query_text(self, qs):
+        return unicode(qs._query)
+
+    def apply_lookups(self, qs, terms):
+        for lookups in terms:
+            or_queries = [
+                mongoengine.queryset.Q(**{self.construct_lookup(field, op):
+                                          word})
+                for field, op, word in lookups]
+            qs = qs.filter(reduce(operator.or_, or_queries))
+        return qs
+
+    def apply_keyset(self, qs, sort=None, sort_desc=None, after=None,
+                     before=None):
+        """ Orders the queryset by the sort field and the primary key and
+        seeks past the document identified by the `after` or `before` cursor.
+        """
+        # Documents before the cursor are fetched in reverse order
+        descending = bool(sort_desc) != (before is not None)
+        op = 'lt' if descending else 'gt'
 
-        #Order queryset
+        cursor = after if after is not None else before
+        if cursor is not None:
+            try:
+                boundary = self.get_object(cursor)
+            except (self.model.DoesNotExist, mongoengine.ValidationError):
+                boundary = None
+            if boundary is not None:
+                seek = mongoengine.queryset.Q(**{'pk__%s' % op: boundary.pk})
+                if sort:
+                    value = getattr(boundary, sort)
+                    seek = (mongoengine.queryset.Q(**{'%s__%s' % (sort, op):
+                                                      value}) |
+                            (mongoengine.queryset.Q(**{sort: value}) & seek))
+                qs = qs.filter(seek)
+
+        order = ['pk'] if not sort else [sort, 'pk']
+        if descending:
+            order = ['-%s' % f for f in order]
+        return qs.order_by(*order)
+
+    def is_loadable(self, name):
+        return name in self.model._fields
+
+    def apply_projection(self, qs):
+        """ Restricts the fields loaded for the list view to the ones
+        returned by `get_list_load_fields`.
+        """
+        names = self.get_list_load_fields()
+        if names is None:
+            return qs
+        return qs.only(*names)
+
+    def get_reference_depth(self):
+        """ Returns how many levels of references the list view follows,
+        i.e. the deepest relation path in `get_list_relations`.
+        """
+        depth = 0
+        for path in self.get_list_relations():
+            document = self.model
+            level = 0
+            for part in path.split('.'):
+                field = getattr(document, '_fields', {}).get(part)
+                if isinstance(field, mongoengine.ListField):
+                    field = field.field
+                if isinstance(field, mongoengine.ReferenceField):
+                    document = field.document_type
+                    level += 1
+                elif isinstance(field, mongoengine.GenericReferenceField):
+                    level += 1
+                    break
+                elif isinstance(field, mongoengine.EmbeddedDocumentField):
+                    document = field.document_type
+                else:
+                    break
+            depth = max(depth, level)
+        return depth
+
+    def apply_eager_loading(self, qs):
+        """ Dereferences the references used by the list view with one
+        query per referenced collection. Note that this evaluates the
+        queryset and returns a list of documents.
+        """
+        depth = self.get_reference_depth()
+        if depth:
+            return qs.select_related(max_depth=depth)
+        return qs
+
+    def get_export_queryset(self, search_query=None, filters=None,
+                            date_bucket=None, sort=None, sort_desc=None):
+        qs = self.get_filtered_queryset(search_query, filters, date_bucket)
         if sort:
             qs = qs.order_by('%s%s' % ('-' if sort_desc else '', sort))
+        qs = self.apply_projection(qs)
+        # References are dereferenced per document: `select_related` would
+        # load the whole result at once. The documents aren't cached by the
+        # queryset and the cursor doesn't time out during long exports.
+        qs = qs.no_cache().timeout(False)
+        # `batch_size` only exists in newer MongoEngine versions
+        if hasattr(qs, 'batch_size'):
+            qs = qs.batch_size(self.export_batch_size)
+        return qs
+
+    def get_export_type(self, name):
+        document = self.model
+        parts = name.split('.')
+        for part in parts:
+            if hasattr(self, part) and callable(getattr(self, part)):
+                return None
+        for part in parts[:-1]:
+            field = document._fields.get(part)
+            if not isinstance(field, (mongoengine.ReferenceField,
+                                      mongoengine.EmbeddedDocumentField)):
+                return None
+            document = field.document_type
+
+        field = document._fields.get(parts[-1])
+        if field is None:
+            return None
+        for field_class in type(field).__mro__:
+            if field_class.__name__ in EXPORT_TYPES:
+                return EXPORT_TYPES[field_class.__name__]
+        return None
 
-        # Pagination
-        if page is not None:
-            qs = qs.skip(page * self.list_per_page)
-        qs = qs.limit(self.list_per_page)
+    def get_list(self, page=0, sort=None, sort_desc=None, execute=False,
+                 search_query=None, filters=None, date_bucket=None,
+                 after=None, before=None):
+        qs = self.get_filtered_queryset(search_query, filters, date_bucket)
+
+        #Calculate number of documents
+        count = self.get_count(qs, search_query, filters, date_bucket)
+
+        if self.pagination == 'keyset':
+            qs = self.apply_keyset(qs, sort, sort_desc, after, before)
+        else:
+            #Order queryset
+            if sort:
+                qs = qs.order_by('%s%s' % ('-' if sort_desc else '', sort))
+
+            # Pagination
+            if page is not None:
+                qs = qs.skip(page * self.list_per_page)
+        qs = qs.limit(self.list_fetch_size)
+        qs = self.apply_projection(qs)
 
         if execute:
             qs = qs.all()
 
-        return count, qs
+        qs = self.apply_eager_loading(qs)
 
+        return count, qs
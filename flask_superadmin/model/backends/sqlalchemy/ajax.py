@@ -0,0 +1,45 @@
+from sqlalchemy import or_
+
+from flask_superadmin.model.ajax import AjaxModelLoader
+
+from tools import coerce_value
+
+
+class QueryAjaxModelLoader(AjaxModelLoader):
+    """ AJAX loader for the related model of a SQLAlchemy relationship. """
+    def __init__(self, view, name, options):
+        super(QueryAjaxModelLoader, self).__init__(view, name, options)
+
+        mapper = view.model._sa_class_manager.mapper
+        self.model = mapper.get_property(name).mapper.class_
+
+        remote_mapper = self.model._sa_class_manager.mapper
+        self.pk_column = remote_mapper.primary_key[0]
+        self.pk_key = remote_mapper.get_property_by_column(
+            self.pk_column).key
+
+    @property
+    def session(self):
+        return self.view.session
+
+    def get_pk(self, obj):
+        return getattr(obj, self.pk_key)
+
+    def coerce_pk(self, pk):
+        return coerce_value(self.pk_column, pk)
+
+    def get_many(self, pks):
+        pks = self.coerce_pks(pks)
+        if not pks:
+            return []
+        pk = getattr(self.model, self.pk_key)
+        return self.session.query(self.model).filter(pk.in_(pks)).all()
+
+    def get_list(self, term, offset=0, limit=None):
+        qs = self.session.query(self.model)
+        if term:
+            pattern = u'%%%s%%' % term
+            qs = qs.filter(or_(*[getattr(self.model, field).ilike(pattern)
+                                 for field in self.fields]))
+        qs = qs.order_by(getattr(self.model, self.pk_key))
+        return qs.offset(offset).limit(limit).all()
@@ -1,7 +1,8 @@
 from flask_superadmin.babel import gettext
 
 from flask_superadmin.model import filters
-from flask_superadmin.contrib.sqlamodel import tools
+
+import tools
 
 
 class BaseSQLAFilter(filters.BaseFilter):
@@ -86,18 +87,83 @@ class BooleanNotEqualFilter(FilterNotEqual, filters.BaseBooleanFilter):
     pass
 
 
-# Base SQLA filter field converter
-class FilterConverter(filters.BaseFilterConverter):
-    strings = (FilterEqual, FilterNotEqual, FilterLike, FilterNotLike)
-    numeric = (FilterEqual, FilterNotEqual, FilterGreater, FilterSmaller)
+class IntEqualFilter(FilterEqual, filters.BaseIntFilter):
+    pass
+
+
+class IntNotEqualFilter(FilterNotEqual, filters.BaseIntFilter):
+    pass
+
+
+class IntGreaterFilter(FilterGreater, filters.BaseIntFilter):
+    pass
+
+
+class IntSmallerFilter(FilterSmaller, filters.BaseIntFilter):
+    pass
 
-    def convert(self, type_name, column, name):
-        if type_name in self.converters:
-            return self.converters[type_name](column, name)
 
-        return None
+class FloatEqualFilter(FilterEqual, filters.BaseFloatFilter):
+    pass
+
+
+class FloatNotEqualFilter(FilterNotEqual, filters.BaseFloatFilter):
+    pass
+
+
+class FloatGreaterFilter(FilterGreater, filters.BaseFloatFilter):
+    pass
+
+
+class FloatSmallerFilter(FilterSmaller, filters.BaseFloatFilter):
+    pass
+
+
+class DateEqualFilter(FilterEqual, filters.BaseDateFilter):
+    pass
 
-    @filters.convert('String', 'Unicode', 'Text', 'UnicodeText')
+
+class DateNotEqualFilter(FilterNotEqual, filters.BaseDateFilter):
+    pass
+
+
+class DateGreaterFilter(FilterGreater, filters.BaseDateFilter):
+    pass
+
+
+class DateSmallerFilter(FilterSmaller, filters.BaseDateFilter):
+    pass
+
+
+class DateTimeEqualFilter(FilterEqual, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeNotEqualFilter(FilterNotEqual, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeGreaterFilter(FilterGreater, filters.BaseDateTimeFilter):
+    pass
+
+
+class DateTimeSmallerFilter(FilterSmaller, filters.BaseDateTimeFilter):
+    pass
+
+
+# Base SQLA filter field converter
+class FilterConverter(filters.BaseFilterConverter):
+    strings = (FilterEqual, FilterNotEqual, FilterLike, FilterNotLike)
+    integers = (IntEqualFilter, IntNotEqualFilter, IntGreaterFilter,
+                IntSmallerFilter)
+    floats = (FloatEqualFilter, FloatNotEqualFilter, FloatGreaterFilter,
+              FloatSmallerFilter)
+    dates = (DateEqualFilter, DateNotEqualFilter, DateGreaterFilter,
+             DateSmallerFilter)
+    datetimes = (DateTimeEqualFilter, DateTimeNotEqualFilter,
+                 DateTimeGreaterFilter, DateTimeSmallerFilter)
+
+    @filters.convert('String', 'Unicode', 'Text', 'UnicodeText', 'Enum')
     def conv_string(self, column, name):
         return [f(column, name) for f in self.strings]
 
@@ -106,14 +172,19 @@ class FilterConverter(filters.BaseFilterConverter):
         return [BooleanEqualFilter(column, name),
                 BooleanNotEqualFilter(column, name)]
 
-    @filters.convert('Integer', 'SmallInteger', 'Numeric', 'Float')
+    @filters.convert('Integer', 'SmallInteger', 'BigInteger')
     def conv_int(self, column, name):
-        return [f(column, name) for f in self.numeric]
+        return [f(column, name) for f in self.integers]
+
+    @filters.convert('Numeric', 'Float')
+    def conv_float(self, column, name):
+        return [f(column, name) for f in self.floats]
 
     @filters.convert('Date')
     def conv_date(self, column, name):
-        return [f(column, name, data_type='datepicker') for f in self.numeric]
+        return [f(column, name, data_type='datepicker') for f in self.dates]
 
     @filters.convert('DateTime')
     def conv_datetime(self, column, name):
-        return [f(column, name, data_type='datetimepicker') for f in self.numeric]
+        return [f(column, name, data_type='datetimepicker')
+                for f in self.datetimes]
@@ -2,21 +2,25 @@
 Tools for generating forms based on SQLAlchemy Model schemas.
 """
 
-from sqlalchemy import Column
-from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy import Column, UniqueConstraint, and_, or_
 
 from wtforms import Form, ValidationError, fields, validators
+from wtforms.fields.core import UnboundField
 from wtforms.ext.sqlalchemy.orm import converts, ModelConverter, model_form as original_model_form
 from wtforms.ext.sqlalchemy.fields import QuerySelectField, QuerySelectMultipleField
 
 from flask.ext.superadmin import form
+from flask_superadmin.babel import gettext
 
 
 class Unique(object):
     """Checks field value unicity against specified table field.
 
-    :param get_session:
-        A function that return a SQAlchemy Session.
+    The generated forms check all the unique columns at once with
+    `UniqueChecker`, this validator is kept for forms declaring it.
+
+    :param db_session:
+        The SQLAlchemy session.
     :param model:
         The model to check unicity against.
     :param column:
@@ -33,16 +37,130 @@ class Unique(object):
         self.message = message
 
     def __call__(self, form, field):
-        try:
-            obj = (self.db_session.query(self.model)
-                       .filter(self.column == field.data).one())
+        obj = (self.db_session.query(self.model)
+                   .filter(self.column == field.data).first())
+
+        if obj is not None and getattr(form, '_obj', None) != obj:
+            if self.message is None:
+                self.message = field.gettext(u'Already exists.')
+            raise ValidationError(self.message)
+
+
+class UniqueChecker(object):
+    """Checks all the unique columns and constraints of a form at once,
+    with a single query matching any of them.
 
-            if not hasattr(form, '_obj') or not form._obj == obj:
-                if self.message is None:
-                    self.message = field.gettext(u'Already exists.')
-                raise ValidationError(self.message)
-        except NoResultFound:
-            pass
+    :param db_session:
+        The SQLAlchemy session.
+    :param model:
+        The model to check unicity against.
+    :param constraints:
+        Tuples of the property names that are unique together.
+    """
+    def __init__(self, db_session, model, constraints):
+        self.db_session = db_session
+        self.model = model
+        self.constraints = constraints
+
+    def get_value(self, form, name):
+        if name in form:
+            return form[name].data
+        return getattr(getattr(form, '_obj', None), name, None)
+
+    def __call__(self, form):
+        """ Returns the names of the fields conflicting with another
+        object. None stands for a conflicting object that none of the form's
+        values matches in Python (e.g. found by a case insensitive
+        collation of the database).
+        """
+        checks = []
+        for names in self.constraints:
+            values = [self.get_value(form, name) for name in names]
+            # NULLs never conflict
+            if None not in values:
+                checks.append((names, values))
+
+        if not checks:
+            return set()
+
+        clauses = [and_(*[getattr(self.model, name) == value
+                          for name, value in zip(names, values)])
+                   for names, values in checks]
+        obj = getattr(form, '_obj', None)
+
+        conflicts = set()
+        for other in self.db_session.query(self.model).filter(or_(*clauses)):
+            if obj is not None and other == obj:
+                continue
+            found = set()
+            for names, values in checks:
+                if all(getattr(other, name) == value
+                       for name, value in zip(names, values)):
+                    found.update(name for name in names if name in form)
+            conflicts.update(found or [None])
+        return conflicts
+
+
+class UniqueForm(object):
+    """Form mixin running the `UniqueChecker` of the form after the
+    field validators. Conflicts that can't be told apart by field are
+    listed in `form_errors`.
+    """
+    _unique_checker = None
+
+    form_errors = ()
+
+    def validate(self):
+        valid = super(UniqueForm, self).validate()
+        self.form_errors = []
+        if self._unique_checker is None:
+            return valid
+
+        for name in self._unique_checker(self):
+            if name is None:
+                self.form_errors.append(
+                    gettext(u'Conflicts with an existing object.'))
+                valid = False
+                continue
+            field = self[name]
+            field.errors = list(field.errors)
+            field.errors.append(field.gettext(u'Already exists.'))
+            valid = False
+        return valid
+
+
+def unique_constraints(model, field_names):
+    """Returns the unique columns, unique constraints and unique indexes
+    of the model's table as tuples of property names, keeping the ones
+    with at least one field in the form.
+    """
+    mapper = model._sa_class_manager.mapper
+    table = mapper.local_table
+
+    column_sets = []
+    for column in table.columns:
+        if column.unique:
+            column_sets.append([column])
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            column_sets.append(list(constraint.columns))
+    for index in table.indexes:
+        if index.unique:
+            column_sets.append(list(index.columns))
+    # Primary keys are only checked when they are edited in the form
+    column_sets.append(list(table.primary_key.columns))
+
+    constraints = []
+    for columns in column_sets:
+        try:
+            names = tuple(mapper.get_property_by_column(c).key
+                          for c in columns)
+        except Exception:
+            continue
+        if (names and names not in constraints and
+                any(name in field_names for name in names)):
+            constraints.append(names)
+    return constraints
 
 
 class AdminModelConverter(ModelConverter):
@@ -95,6 +213,12 @@ class AdminModelConverter(ModelConverter):
             if override:
                 return override(**kwargs)
 
+            field = self.view.get_relation_field(
+                prop.key, multiple=prop.direction.name != 'MANYTOONE',
+                **kwargs)
+            if field is not None:
+                return field
+
             if prop.direction.name == 'MANYTOONE':
                 return QuerySelectField(widget=form.ChosenSelectWidget(),
                                         **kwargs)
@@ -124,8 +248,8 @@ class AdminModelConverter(ModelConverter):
                 if column.foreign_keys:
                     return None
 
-                unique = False
-
+                # Unique columns are checked together by the form (see
+                # `UniqueForm`)
                 if column.primary_key:
                     # By default, don't show primary keys either
                     if self.view.fields is None:
@@ -135,17 +259,6 @@ class AdminModelConverter(ModelConverter):
                     if prop.key not in self.view.fields:
                         return None
 
-                    kwargs['validators'].append(Unique(self.view.session,
-                                                       model,
-                                                       column))
-                    unique = True
-
-                # If field is unique, validate it
-                if column.unique and not unique:
-                    kwargs['validators'].append(Unique(self.view.session,
-                                                       model,
-                                                       column))
-
                 if column.nullable:
                     kwargs['validators'].append(validators.Optional())
                 else:
@@ -184,6 +297,17 @@ class AdminModelConverter(ModelConverter):
 def model_form(model, base_class=Form, fields=None, readonly_fields=None,
                exclude=None, field_args=None, converter=None):
     only = tuple(set(fields or []) - set(readonly_fields or []))
-    return original_model_form(model, base_class=base_class, only=only,
+    form = original_model_form(model, base_class=base_class, only=only,
                                exclude=exclude, field_args=field_args,
                                converter=converter)
+
+    view = getattr(converter, 'view', None)
+    if view is not None:
+        field_names = [name for name in dir(form)
+                       if isinstance(getattr(form, name), UnboundField)]
+        constraints = unique_constraints(model, field_names)
+        if constraints:
+            checker = UniqueChecker(view.session, model, constraints)
+            form = type(form.__name__, (UniqueForm, form),
+                        {'_unique_checker': checker})
+    return form
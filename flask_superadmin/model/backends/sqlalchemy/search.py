@@ -0,0 +1,82 @@
+from sqlalchemy import func, text
+from sqlalchemy.sql.expression import column, literal_column
+
+from flask_superadmin.model.search import SearchEngine, parse_query, tokenize
+
+
+class FullTextSearch(SearchEngine):
+    """ Searches the `search_fields` with the database's full-text indexes:
+
+    * SQLite: an FTS5 table whose rowids are the primary keys of the model,
+      e.g. ``CREATE VIRTUAL TABLE article_fts USING fts5(title, body,
+      content='article', content_rowid='id')`` kept in sync by triggers.
+    * PostgreSQL: ``to_tsvector(...) @@ to_tsquery(...)``, either on a
+      tsvector column or on the concatenated fields (which can be backed by
+      a GIN expression index).
+
+    Other databases fall back to the 'like' search. Plain and '^' words
+    match word prefixes, '=' words whole words; all the words must match.
+
+    `fts_table`
+        Name of the FTS5 table. Defaults to the model's table name followed
+        by '_fts'.
+    `config`
+        PostgreSQL text search configuration
+    `vector_column`
+        Name of a tsvector property of the model to search instead of the
+        concatenated fields.
+    """
+    def __init__(self, fts_table=None, config='simple', vector_column=None):
+        self.fts_table = fts_table
+        self.config = config
+        self.vector_column = vector_column
+
+    def get_terms(self, search_query):
+        terms = []
+        for op, word in parse_query(search_query):
+            for token in tokenize(word):
+                terms.append((op, token))
+        return terms
+
+    def apply(self, view, qs, search_query):
+        terms = self.get_terms(search_query)
+        if not terms:
+            return qs
+
+        mapper = view.model._sa_class_manager.mapper
+        dialect = view.session.get_bind(mapper).dialect
+        if dialect.name == 'sqlite':
+            return self.apply_fts5(view, qs, terms, dialect)
+        elif dialect.name == 'postgresql':
+            return self.apply_tsvector(view, qs, terms)
+        return view.apply_search(qs, search_query)
+
+    def apply_fts5(self, view, qs, terms, dialect):
+        table = view.model._sa_class_manager.mapper.local_table
+        name = dialect.identifier_preparer.quote(
+            self.fts_table or '%s_fts' % table.name)
+
+        match = u' '.join(u'"%s"%s' % (token, u'' if op == '=' else u'*')
+                          for op, token in terms)
+        rowids = (text('SELECT rowid FROM %s WHERE %s MATCH :match' %
+                       (name, name))
+                  .bindparams(match=match)
+                  .columns(column('rowid')))
+
+        pk = getattr(view.model, view.pk_key)
+        return qs.filter(pk.in_(rowids))
+
+    def apply_tsvector(self, view, qs, terms):
+        if self.vector_column:
+            vector = getattr(view.model, self.vector_column)
+        else:
+            columns = []
+            for name in view.search_fields:
+                attr = getattr(view.model, name, None)
+                columns.append(literal_column(name) if attr is None else attr)
+            vector = func.to_tsvector(self.config,
+                                      func.concat_ws(' ', *columns))
+
+        query = u' & '.join(u'%s%s' % (token, u'' if op == '=' else u':*')
+                            for op, token in terms)
+        return qs.filter(vector.op('@@')(func.to_tsquery(self.config, query)))
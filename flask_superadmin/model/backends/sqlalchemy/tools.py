@@ -7,3 +7,25 @@ def parse_like_term(term):
         stmt = '%%%s%%' % term
 
     return stmt
+
+
+def coerce_value(column, value):
+    """
+        Converts a value taken from the request (e.g. a primary key) to the
+        Python type of the column. Raises ValueError if it isn't valid for
+        the column. Values of types that can't be built from a string are
+        returned unchanged.
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if isinstance(value, python_type):
+        return value
+    try:
+        return python_type(value)
+    except TypeError:
+        return value
+    except Exception:
+        raise ValueError('%r is not a valid %s' % (value,
+                                                   python_type.__name__))
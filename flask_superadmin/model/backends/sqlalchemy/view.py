@@ -1,14 +1,56 @@
-from sqlalchemy.sql.expression import desc, literal_column, or_
+import operator
 
+from sqlalchemy.sql.expression import (and_, desc, extract, literal_column,
+                                       or_)
+
+from ajax import QueryAjaxModelLoader
+from filters import FilterConverter
 from orm import model_form, AdminModelConverter
+from search import FullTextSearch
+from tools import coerce_value
+
+from flask_superadmin.model.base import BaseModelAdmin, DATE_LEVELS, chunked
+from sqlalchemy import func, orm, schema, text
+from sqlalchemy.orm.properties import ColumnProperty, RelationshipProperty
+
+
+# Loader options for the `list_select_related` strategies. `selectinload`
+# only exists in newer SQLAlchemy versions, `subqueryload` is used instead
+EAGER_LOADERS = {
+    'joined': 'joinedload',
+    'selectin': ('selectinload' if hasattr(orm, 'selectinload')
+                 else 'subqueryload'),
+    'subquery': 'subqueryload',
+    'immediate': 'immediateload',
+    'select': 'lazyload',
+}
+
+# Column types (matched by class, then by their base classes) of the columns
+# exported with a type in the columnar formats
+EXPORT_TYPES = {
+    'String': 'string',
+    'Integer': 'int',
+    'Numeric': 'float',
+    'Boolean': 'bool',
+    'DateTime': 'datetime',
+    'Date': 'date',
+}
 
-from flask_superadmin.model.base import BaseModelAdmin
-from sqlalchemy import schema
+
+def like_escape(value):
+    """ Escapes the LIKE wildcards of the value (with a backslash). """
+    return (value.replace(u'\\', u'\\\\').replace(u'%', u'\\%')
+            .replace(u'_', u'\\_'))
 
 
 class ModelAdmin(BaseModelAdmin):
     hide_backrefs = False
 
+    search_engines = dict(BaseModelAdmin.search_engines,
+                          fulltext=FullTextSearch)
+
+    filter_converter = FilterConverter()
+
     def __init__(self, model, session=None,
                  *args, **kwargs):
         super(ModelAdmin, self).__init__(model, *args, **kwargs)
@@ -46,6 +88,27 @@ class ModelAdmin(BaseModelAdmin):
     def get_converter(self):
         return AdminModelConverter(self)
 
+    def create_ajax_loader(self, name, options):
+        return QueryAjaxModelLoader(self, name, options)
+
+    def scaffold_filters(self, name):
+        mapper = self.model._sa_class_manager.mapper
+        if not mapper.has_property(name):
+            return None
+        prop = mapper.get_property(name)
+        if not isinstance(prop, ColumnProperty):
+            return None
+
+        # Column types are matched by class, then by their base classes
+        column = getattr(self.model, name)
+        for type_class in type(prop.columns[0].type).__mro__:
+            filters = self.filter_converter.convert(type_class.__name__,
+                                                    column,
+                                                    self.field_name(name))
+            if filters:
+                return filters
+        return None
+
     @property
     def query(self):
         return self.get_queryset()  # TODO remove eventually (kept for backwards compatibility)
@@ -53,6 +116,65 @@ class ModelAdmin(BaseModelAdmin):
     def get_queryset(self):
         return self.session.query(self.model)
 
+    def count_queryset(self, qs):
+        return qs.count()
+
+    def count_facets(self, qs, fields):
+        # One GROUP BY over all the facet columns, the count of every
+        # column's values is summed up from the combinations
+        columns = [getattr(self.model, name) for name in fields]
+        rows = (qs.with_entities(*(columns + [func.count()]))
+                .group_by(*columns).order_by(None))
+
+        counts = dict((name, {}) for name in fields)
+        for row in rows:
+            for name, value in zip(fields, row[:-1]):
+                counts[name][value] = counts[name].get(value, 0) + row[-1]
+        return counts
+
+    def apply_date_range(self, qs, start, end):
+        column = getattr(self.model, self.date_hierarchy)
+        return qs.filter(column >= start, column < end)
+
+    def count_date_buckets(self, qs, level):
+        column = getattr(self.model, self.date_hierarchy)
+        parts = [extract(name, column)
+                 for name in DATE_LEVELS[:DATE_LEVELS.index(level) + 1]]
+        rows = (qs.with_entities(*(parts + [func.count()]))
+                .group_by(*parts).order_by(*parts))
+        return [(tuple(int(part) for part in row[:-1]), row[-1])
+                for row in rows if row[0] is not None]
+
+    def estimate_count(self):
+        # The statistics cover the whole table, not a custom queryset
+        if (type(self).get_queryset.im_func is not
+                ModelAdmin.get_queryset.im_func):
+            return None
+
+        mapper = self.model._sa_class_manager.mapper
+        table = mapper.local_table
+        dialect = self.session.get_bind(mapper).dialect.name
+
+        if dialect == 'postgresql':
+            stmt = text('SELECT reltuples::bigint FROM pg_class '
+                        'WHERE oid = CAST(:name AS regclass)')
+            name = table.fullname
+        elif dialect == 'mysql':
+            stmt = text('SELECT table_rows FROM information_schema.tables '
+                        'WHERE table_schema = DATABASE() '
+                        'AND table_name = :name')
+            name = table.name
+        else:
+            return None
+
+        estimate = self.session.execute(stmt, {'name': name},
+                                        mapper=mapper).scalar()
+
+        # Tables that were never analyzed report a negative estimate
+        if estimate is None or estimate < 0:
+            return None
+        return int(estimate)
+
     def get_objects(self, *pks):
         id = self.get_pk(self.model)
         return self.get_queryset().filter(id.in_(pks))
@@ -68,21 +190,167 @@ class ModelAdmin(BaseModelAdmin):
         if adding:
             self.session.add(instance)
         self.session.commit()
+        self.get_choices_cache().invalidate(self.model)
         return instance
 
+    def save_models(self, instances, forms):
+        if type(self).save_model.im_func is not ModelAdmin.save_model.im_func:
+            return super(ModelAdmin, self).save_models(instances, forms)
+
+        # A single flush and commit for all the objects
+        try:
+            for instance, form in zip(instances, forms):
+                form.populate_obj(instance)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        self.get_choices_cache().invalidate(self.model)
+
+    def insert_models(self, instances):
+        # The unit of work batches the INSERTs of the objects (and sets up
+        # the relations populated by the forms, unlike
+        # `bulk_insert_mappings`)
+        try:
+            self.session.add_all(instances)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        self.get_choices_cache().invalidate(self.model)
+        return instances
+
+    def can_bulk_delete(self):
+        """ Returns whether rows can be removed with a bulk DELETE, i.e.
+        deleting them doesn't rely on the unit of work: no inheritance,
+        no delete listeners and no relations the ORM would have to cascade
+        to or clear.
+        """
+        mapper = self.model._sa_class_manager.mapper
+        if mapper.inherits is not None or mapper.polymorphic_on is not None:
+            return False
+        if mapper.dispatch.before_delete or mapper.dispatch.after_delete:
+            return False
+
+        for prop in mapper.iterate_properties:
+            if not isinstance(prop, RelationshipProperty):
+                continue
+            if prop.direction.name == 'MANYTOONE':
+                if prop.cascade.delete:
+                    return False
+            elif not prop.passive_deletes:
+                return False
+        return True
+
     def delete_models(self, *pks):
-        objs = self.get_objects(*pks)
-        [self.session.delete(x) for x in objs]
-        self.session.commit()
+        pk = getattr(self.model, self._primary_key)
+        bulk = self.can_bulk_delete()
+        count = 0
+
+        # Every batch is committed separately so large deletes don't build
+        # up a single huge unit of work
+        for batch in chunked(pks, self.delete_batch_size):
+            qs = self.get_queryset().filter(pk.in_(batch))
+            if bulk:
+                count += qs.delete(synchronize_session=False)
+            else:
+                for obj in qs:
+                    self.session.delete(obj)
+                    count += 1
+            self.session.commit()
+        self.get_choices_cache().invalidate(self.model)
+        return count
+
+    def can_bulk_insert(self):
+        """ Returns whether new rows can be added by `insert_models`, i.e.
+        `save_model` isn't overridden (the unit of work runs the mapper's
+        insert listeners either way).
+        """
+        return (type(self).save_model.im_func is
+                ModelAdmin.save_model.im_func)
+
+    def can_bulk_update(self, names):
+        """ Returns whether the fields can be changed with a bulk UPDATE:
+        `save_model` isn't overridden, there's no inheritance and no update
+        listeners, and the fields are columns or many-to-one relations over
+        a single column without `validates` hooks.
+        """
+        if not self.can_bulk_insert():
+            return False
+        mapper = self.model._sa_class_manager.mapper
+        if mapper.inherits is not None or mapper.polymorphic_on is not None:
+            return False
+        if mapper.dispatch.before_update or mapper.dispatch.after_update:
+            return False
+
+        for name in names:
+            if not mapper.has_property(name) or name in mapper.validators:
+                return False
+            prop = mapper.get_property(name)
+            if isinstance(prop, RelationshipProperty):
+                if (prop.direction.name != 'MANYTOONE' or
+                        len(prop.local_remote_pairs) != 1):
+                    return False
+            elif not isinstance(prop, ColumnProperty):
+                return False
         return True
 
+    def update_models(self, pks, values):
+        mapper = self.model._sa_class_manager.mapper
+        columns = {}
+        for name, value in values.iteritems():
+            prop = mapper.get_property(name)
+            if isinstance(prop, RelationshipProperty):
+                # Set the foreign key to the related object's key
+                (local, remote), = prop.local_remote_pairs
+                if value is not None:
+                    value = getattr(value, prop.mapper.get_property_by_column(
+                        remote).key)
+                name = mapper.get_property_by_column(local).key
+            columns[name] = value
+
+        pk = getattr(self.model, self._primary_key)
+        count = self.get_queryset().filter(pk.in_(pks)).update(
+            columns, synchronize_session=False)
+        self.session.commit()
+        self.get_choices_cache().invalidate(self.model)
+        return count
+
+    def get_pk_batch(self, qs, after=None, limit=None):
+        pk = getattr(self.model, self._primary_key)
+        if after is not None:
+            qs = qs.filter(pk > after)
+        qs = qs.with_entities(pk).order_by(pk).limit(limit)
+        return [row[0] for row in qs]
+
+    def get_sort_column(self, name):
+        """ Returns the model's column named `name`, or None if it isn't a
+        mapped column (the sort comes from the URL).
+        """
+        mapper = self.model._sa_class_manager.mapper
+        if (name and mapper.has_property(name) and
+                isinstance(mapper.get_property(name), ColumnProperty)):
+            return getattr(self.model, name)
+        return None
+
+    def get_search_column(self, field_name):
+        """ Returns the model's column named `field_name`, qualified with
+        its table so joined relations don't make it ambiguous, or a literal
+        column for other names (e.g. 'table.column').
+        """
+        mapper = self.model._sa_class_manager.mapper
+        if (mapper.has_property(field_name) and
+                isinstance(mapper.get_property(field_name), ColumnProperty)):
+            return getattr(self.model, field_name)
+        return literal_column(field_name)
+
     def construct_search(self, field_name, op=None):
         if op == '^':
-            return literal_column(field_name).startswith
+            return self.get_search_column(field_name).startswith
         elif op == '=':
-            return literal_column(field_name).op('=')
+            return self.get_search_column(field_name).op('=')
         else:
-            return literal_column(field_name).contains
+            return self.get_search_column(field_name).contains
 
     def apply_search(self, qs, search_query):
         or_queries = []
@@ -98,27 +366,217 @@ class ModelAdmin(BaseModelAdmin):
             qs = qs.filter(or_(*or_queries))
         return qs
 
-    def get_list(self, page=0, sort=None, sort_desc=None, execute=False, search_query=None):
-        qs = self.get_queryset()
+    def filter_pks(self, qs, pks):
+        return qs.filter(getattr(self.model, self._primary_key).in_(pks))
+
+    def get_search_indexes(self):
+        table = self.model._sa_class_manager.mapper.local_table
+        indexes = {}
+
+        def add(columns, description):
+            columns = list(columns)
+            if not columns:
+                return
+            # Only the leading column of an index can be searched with it
+            name = columns[0].name
+            for key in (name, '%s.%s' % (table.name, name)):
+                indexes.setdefault(key, description)
+
+        add(table.primary_key.columns, 'primary key')
+        for index in table.indexes:
+            add(index.columns, index.name or 'index')
+        for constraint in table.constraints:
+            if isinstance(constraint, schema.UniqueConstraint):
+                add(constraint.columns, constraint.name or 'unique')
+        for column in table.columns:
+            if column.unique:
+                add([column], 'unique')
+        return indexes
+
+    def construct_lookup(self, field_name, operator):
+        column = self.get_search_column(field_name)
+        if operator == 'exact':
+            return column.op('=')
+        elif operator == 'prefix':
+            # A constant pattern (rather than the concatenation built by
+            # `startswith`) lets the database use an index
+            return lambda word: column.like(
+                like_escape(word) + u'%', escape='\\')
+        else:
+            return column.contains
+
+    def apply_lookups(self, qs, terms):
+        for lookups in terms:
+            qs = qs.filter(or_(*[self.construct_lookup(field, operator)(word)
+                                 for field, operator, word in lookups]))
+        return qs
+
+    def apply_keyset(self, qs, sort=None, sort_desc=None, after=None,
+                     before=None):
+        """ Orders the queryset by the sort column and the primary key and
+        seeks past the row identified by the `after` or `before` cursor.
+        """
+        pk = getattr(self.model, self._primary_key)
+        column = self.get_sort_column(sort)
+
+        # Rows before the cursor are fetched in reverse order
+        descending = bool(sort_desc) != (before is not None)
+        op = operator.lt if descending else operator.gt
 
-        # Filter by search query
-        if search_query and self.search_fields:
-            qs = self.apply_search(qs, search_query)
+        cursor = after if after is not None else before
+        if cursor is not None:
+            # Malformed cursors start from the first page
+            mapper = self.model._sa_class_manager.mapper
+            try:
+                boundary = self.get_queryset().get(
+                    coerce_value(mapper.primary_key[0], cursor))
+            except ValueError:
+                boundary = None
+            if boundary is not None:
+                pk_value = self.get_pk(boundary)
+                if column is not None:
+                    value = getattr(boundary, sort)
+                    qs = qs.filter(or_(op(column, value),
+                                       and_(column == value,
+                                            op(pk, pk_value))))
+                else:
+                    qs = qs.filter(op(pk, pk_value))
+
+        order = [pk] if column is None else [column, pk]
+        if descending:
+            order = [desc(c) for c in order]
+        return qs.order_by(*order)
+
+    def is_loadable(self, name):
+        mapper = self.model._sa_class_manager.mapper
+        return (mapper.has_property(name) and
+                isinstance(mapper.get_property(name),
+                           (ColumnProperty, RelationshipProperty)))
+
+    def apply_projection(self, qs):
+        """ Restricts the columns loaded for the list view to the ones
+        returned by `get_list_load_fields`.
+        """
+        names = self.get_list_load_fields()
+        if names is None:
+            return qs
+
+        mapper = self.model._sa_class_manager.mapper
+        columns = set()
+        for name in names:
+            prop = mapper.get_property(name)
+            if isinstance(prop, RelationshipProperty):
+                # Relations are loaded through their local (foreign key)
+                # columns
+                for column in prop.local_columns:
+                    try:
+                        columns.add(mapper.get_property_by_column(column).key)
+                    except orm.exc.UnmappedColumnError:
+                        pass
+            else:
+                columns.add(name)
+
+        # The primary key is always loaded
+        return qs.options(orm.load_only(*sorted(columns)))
+
+    def apply_eager_loading(self, qs, collections=True):
+        """ Adds loader options for the relations used by the list view.
+        Many-to-one relations are joined, collections are loaded with a
+        separate IN query ('selectin'); 'subquery', 'immediate' and 'select'
+        (lazy) can be chosen through `list_select_related`. Without
+        `collections`, only many-to-one relations are joined (the others
+        are lazy loaded), as needed when rows are fetched in batches.
+        """
+        relations = self.get_list_relations()
+        options = []
+        for path in sorted(relations):
+            mapper = self.model._sa_class_manager.mapper
+            loader = None
+            for i, part in enumerate(path.split('.')):
+                if not mapper.has_property(part):
+                    loader = None
+                    break
+                prop = mapper.get_property(part)
+                if not isinstance(prop, RelationshipProperty):
+                    loader = None
+                    break
+
+                prefix = '.'.join(path.split('.')[:i + 1])
+                strategy = relations.get(prefix) or ('selectin' if prop.uselist
+                                                     else 'joined')
+                if not collections and (prop.uselist or
+                                        strategy not in ('joined', 'select')):
+                    loader = None
+                    break
+                attr = getattr(mapper.class_, part)
+                loader = getattr(loader or orm, EAGER_LOADERS[strategy])(attr)
+                mapper = prop.mapper
+
+            if loader is not None:
+                options.append(loader)
+
+        if options:
+            qs = qs.options(*options)
+        return qs
+
+    def get_export_queryset(self, search_query=None, filters=None,
+                            date_bucket=None, sort=None, sort_desc=None):
+        qs = self.get_filtered_queryset(search_query, filters, date_bucket)
+        column = self.get_sort_column(sort)
+        if column is not None:
+            qs = qs.order_by(desc(column) if sort_desc else column)
+        qs = self.apply_projection(qs)
+        qs = self.apply_eager_loading(qs, collections=False)
+        return qs.yield_per(self.export_batch_size)
+
+    def get_export_type(self, name):
+        mapper = self.model._sa_class_manager.mapper
+        parts = name.split('.')
+        for part in parts:
+            if hasattr(self, part) and callable(getattr(self, part)):
+                return None
+        for part in parts[:-1]:
+            if not mapper.has_property(part):
+                return None
+            prop = mapper.get_property(part)
+            if not isinstance(prop, RelationshipProperty) or prop.uselist:
+                return None
+            mapper = prop.mapper
+
+        if not mapper.has_property(parts[-1]):
+            return None
+        prop = mapper.get_property(parts[-1])
+        if not isinstance(prop, ColumnProperty):
+            return None
+        for type_class in type(prop.columns[0].type).__mro__:
+            if type_class.__name__ in EXPORT_TYPES:
+                return EXPORT_TYPES[type_class.__name__]
+        return None
+
+    def get_list(self, page=0, sort=None, sort_desc=None, execute=False,
+                 search_query=None, filters=None, date_bucket=None,
+                 after=None, before=None):
+        qs = self.get_filtered_queryset(search_query, filters, date_bucket)
 
         #Calculate number of rows
-        count = qs.count()
+        count = self.get_count(qs, search_query, filters, date_bucket)
 
-        #Order queryset
-        if sort:
-            if sort_desc:
-                sort = desc(sort)
-            qs = qs.order_by(sort)
+        if self.pagination == 'keyset':
+            qs = self.apply_keyset(qs, sort, sort_desc, after, before)
+        else:
+            #Order queryset
+            if sort:
+                if sort_desc:
+                    sort = desc(sort)
+                qs = qs.order_by(sort)
 
-        # Pagination
-        if page is not None:
-            qs = qs.offset(page * self.list_per_page)
+            # Pagination
+            if page is not None:
+                qs = qs.offset(page * self.list_per_page)
 
-        qs = qs.limit(self.list_per_page)
+        qs = qs.limit(self.list_fetch_size)
+        qs = self.apply_projection(qs)
+        qs = self.apply_eager_loading(qs)
 
         if execute:
             qs = qs.all()
@@ -1,13 +1,30 @@
+import datetime
 import math
+import os
+import os.path as op
 import re
+import tempfile
+import time
 
 from wtforms import fields, widgets
-from flask import request, url_for, redirect, flash, abort
+from werkzeug import url_quote
+from flask import (request, url_for, redirect, flash, abort, jsonify,
+                   current_app, send_file, Response, stream_with_context)
 
 from flask_superadmin.babel import gettext
 from flask_superadmin.base import BaseView, expose
 from flask_superadmin.form import (BaseForm, ChosenSelectWidget, FileField,
-                                   DatePickerWidget, DateTimePickerWidget)
+                                   DatePickerWidget, DateTimePickerWidget,
+                                   AjaxSelectWidget, AjaxSelectField,
+                                   AjaxSelectMultipleField, CachedSelectField,
+                                   CachedSelectMultipleField)
+from flask_superadmin.model.cache import default_choices_cache
+from flask_superadmin.model.export import EXPORT_FORMATS, gzip_chunks
+from flask_superadmin.model.filters import BaseFilter
+from flask_superadmin.model.imports import (IMPORT_FORMATS, ImportReport,
+                                            get_field_names, get_formdata)
+from flask_superadmin.model.search import (LikeSearch, LocalIndexSearch,
+                                           PlannedSearch, plan_search)
 
 import traceback
 
@@ -17,7 +34,9 @@ class AdminModelConverter(object):
         field = super(AdminModelConverter, self).convert(*args, **kwargs)
         if field:
             widget = field.kwargs.get('widget', field.field_class.widget)
-            if isinstance(widget, widgets.Select):
+            if isinstance(widget, AjaxSelectWidget):
+                pass
+            elif isinstance(widget, widgets.Select):
                 field.kwargs['widget'] = ChosenSelectWidget(
                     multiple=widget.multiple)
             elif issubclass(field.field_class, fields.DateTimeField):
@@ -30,6 +49,10 @@ class AdminModelConverter(object):
 
 
 first_cap_re = re.compile('(.)([A-Z][a-z]+)')
+filter_arg_re = re.compile(r'^flt(\d+)_(\d+)$')
+
+# Stands in for the primary key in the precomputed edit URL
+PK_PLACEHOLDER = '__pk__'
 
 
 def camelcase_to_space(name):
@@ -40,6 +63,67 @@ def prettify(str):
     return str.replace('_', ' ').title()
 
 
+def chunked(items, size):
+    """ Splits a sequence into lists of at most `size` items. """
+    items = list(items)
+    size = size or len(items) or 1
+    for i in xrange(0, len(items), size):
+        yield items[i:i + size]
+
+
+# Levels of the date hierarchy drill-down
+DATE_LEVELS = ('year', 'month', 'day')
+
+
+def parse_date_bucket(value):
+    """ Parses a 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' date hierarchy bucket
+    into a tuple of ints, or returns None if it isn't valid.
+    """
+    try:
+        parts = tuple(int(part) for part in value.split('-'))
+        if not 1 <= len(parts) <= len(DATE_LEVELS):
+            return None
+        date_bucket_range(parts)
+    except (ValueError, OverflowError):
+        return None
+    return parts
+
+
+def format_date_bucket(parts):
+    return '-'.join(['%04d' % parts[0]] + ['%02d' % part
+                                           for part in parts[1:]])
+
+
+def date_bucket_range(parts):
+    """ Returns the (start, end) datetimes of a date hierarchy bucket, the
+    end being excluded.
+    """
+    start = datetime.datetime(*(parts + (1,) * (3 - len(parts))))
+    if len(parts) == 1:
+        end = start.replace(year=start.year + 1)
+    elif len(parts) == 2:
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+    else:
+        end = start + datetime.timedelta(days=1)
+    return start, end
+
+
+def date_bucket_label(parts):
+    date = datetime.date(*(parts + (1,) * (3 - len(parts))))
+    if len(parts) == 1:
+        return unicode(date.year)
+    elif len(parts) == 2:
+        return date.strftime('%B %Y').decode('utf-8')
+    return date.strftime('%B %d').decode('utf-8')
+
+
+class ApproximateCount(int):
+    """ Row count estimated from the database statistics rather than
+    counted.
+    """
+    approximate = True
+
+
 class BaseModelAdmin(BaseView):
     """ BaseModelAdmin provides create/edit/delete functionality for an
     abstract Model. The abstraction is further customized by the
@@ -50,11 +134,49 @@ class BaseModelAdmin(BaseView):
     # Number of objects to display per page in the list view
     list_per_page = 20
 
+    # How the list view is paginated: 'offset' skips `page * list_per_page`
+    # rows, 'keyset' seeks past the first/last row of the current page using
+    # the sort column and the primary key (`after`/`before` URL arguments),
+    # which keeps deep pages fast on large tables. Rows with a NULL value in
+    # the sort column are not reachable in keyset mode.
+    pagination = 'offset'
+
+    # How the list view gets its total count: 'exact' counts the matching
+    # rows on every request, 'cached' reuses exact counts for
+    # `count_cache_timeout` seconds, 'estimated' reads the table statistics
+    # for unsearched lists when `get_queryset` isn't overridden (falling
+    # back to an exact count) and None skips
+    # counting altogether, in which case the pager only links to the
+    # previous and the next page.
+    count_strategy = 'exact'
+    count_cache_timeout = 60
+
     # Columns to display in the list index - can be field names or callables.
     # Admin's methods have higher priority than the fields/methods on
     # the model or document.
     list_display = tuple()
 
+    # `list_display` columns edited directly in the list. The changed rows
+    # of a page are validated and saved together (in one transaction where
+    # the backend supports it).
+    list_editable = ()
+
+    # Relations referenced by `list_display` (e.g. 'author' for
+    # 'author.name') are loaded together with the list page rather than
+    # lazily for every row. A dictionary of relation path: loading strategy
+    # overrides this per column - None disables eager loading of that
+    # relation and paths missing from `list_display` can be added. The
+    # strategy names depend on the backend (see `apply_eager_loading`).
+    # Set it to False to disable eager loading altogether.
+    list_select_related = {}
+
+    # Fields loaded for the rows of the list view. By default these are the
+    # fields `list_display` needs (plus the primary key), unless one of the
+    # columns is rendered by a method that may need the whole object, in
+    # which case whole objects are loaded. Set it to a tuple of field names
+    # to choose them explicitly.
+    list_load_fields = None
+
     # Only fields with names specified in `fields` will be displayed in the
     # form (minus the ones mentioned in `exclude`). The order is preserved,
     # too. You can also include methods that are on the model admin, or on the
@@ -68,17 +190,118 @@ class BaseModelAdmin(BaseView):
     # A base class for form rendering. If `None`, `BaseForm` would be used.
     form = None
 
+    # The form class generated by `get_form` is cached on the view and only
+    # rebuilt when one of its inputs (`fields`, `exclude`, `readonly_fields`,
+    # `field_args`, `field_overrides`, `ajax_refs`, `cache_choices`, `form`
+    # or the converter) is replaced. Call `invalidate_form_cache` after
+    # changing one of them in place, or set this to False for views that
+    # build their forms dynamically.
+    cache_form = True
+
     can_edit = True
     can_create = True
     can_delete = True
+    can_export = True
+
+    # Formats the list can be exported to with the `export` endpoint, see
+    # `flask_superadmin.model.export.EXPORT_FORMATS`. The columnar 'arrow'
+    # and 'parquet' formats are only offered when pyarrow is installed.
+    export_formats = ('csv', 'ndjson', 'arrow', 'parquet')
+    # Rows fetched from the database at a time while exporting
+    export_batch_size = 1000
+    # Whether exports are gzipped on the fly for clients accepting it
+    export_gzip = True
+
+    # Whether rows can be imported from uploaded files (needs `can_create`)
+    can_import = True
+    # Formats of the uploaded files, see
+    # `flask_superadmin.model.imports.IMPORT_FORMATS`
+    import_formats = ('csv', 'ndjson')
+    # Valid rows inserted per statement (and per transaction) by imports
+    import_batch_size = 500
+    # Uploads larger than this (in bytes) are imported in the background
+    # when `jobs` is set
+    import_background_size = 1024 * 1024
+    # Directory keeping the reports of the rows that failed to import.
+    # Defaults to the temporary directory.
+    import_report_dir = None
+
+    # Number of objects removed per statement (and per transaction) by
+    # `delete_models`. Backends delete with a single set-based statement per
+    # batch unless the model declares cascades or delete hooks that need
+    # the objects to be loaded, in which case they are deleted one by one.
+    delete_batch_size = 1000
+
+    # Fields of the model form the 'edit' action of the list changes on all
+    # the selected rows at once, e.g. ('status',)
+    bulk_edit_fields = ()
+    # Number of objects changed per statement (and per transaction) by bulk
+    # edits. Backends update with a single set-based statement per batch
+    # unless `save_model` is overridden or the model has save hooks, in
+    # which case the objects are saved one by one.
+    update_batch_size = 1000
+
+    # Number of objects listed on the confirmation page of actions applied
+    # to all the rows matching the list's search ("select all matching")
+    action_sample_size = 10
+
+    # A `flask_superadmin.jobs.JobRunner`. When set, deletes of all the rows
+    # matching the list's search run in the background and report their
+    # progress in the runner's jobs view instead of blocking the request.
+    jobs = None
 
     list_template = 'admin/model/list.html'
     edit_template = 'admin/model/edit.html'
     add_template = 'admin/model/add.html'
     delete_template = 'admin/model/delete.html'
+    search_plan_template = 'admin/model/search_plan.html'
+    import_template = 'admin/model/import.html'
+    bulk_edit_template = 'admin/model/bulk_edit.html'
 
     search_fields = tuple()
 
+    # How the list view searches the `search_fields`: 'like' matches every
+    # word with LIKE/regex lookups, 'index' uses an in-process inverted index
+    # kept up to date by the changes made through this view, 'planned' picks
+    # prefix, exact or contains lookups per field from the model's indexes
+    # (see `search_contains_fields`), and backends add engines using
+    # database indexes (see `search_engines`). Can also be
+    # a `flask_superadmin.model.search.SearchEngine` instance. In every mode
+    # '^word' matches the beginning and '=word' a whole value or word.
+    search_engine = 'like'
+    search_engines = {
+        'like': LikeSearch,
+        'index': LocalIndexSearch,
+        'planned': PlannedSearch,
+    }
+
+    # Search fields the 'planned' search engine may match with unanchored
+    # contains lookups although they aren't indexed (a full scan). Other
+    # unindexed fields are only matched exactly.
+    search_contains_fields = ()
+
+    # Whether the `search_plan` debug page is available outside of the
+    # application's debug mode
+    search_plan_debug = False
+
+    # Fields the list view can be filtered on, e.g. ('name', 'age'), or
+    # `flask_superadmin.model.filters.BaseFilter` instances. Active filters
+    # are passed in the `flt<position>_<filter index>` URL arguments.
+    list_filters = ()
+
+    # Low-cardinality fields (status, type, booleans, ...) whose values are
+    # listed with their number of rows under the current search and
+    # filters, all counted with a single aggregation query. Clicking a value
+    # adds its 'equals' filter.
+    list_facets = ()
+    facet_cache_timeout = 10
+
+    # Date or datetime field whose years, months and days are listed above
+    # the list with their number of rows, e.g. 'created_at'. The selected
+    # bucket (the 'dh' URL argument, 'YYYY[-MM[-DD]]') restricts the list to
+    # a range of the field, so an index on the field can be used.
+    date_hierarchy = None
+
     field_overrides = {}
 
     # A dictionary of field_name: overridden_params_dict, e.g.
@@ -87,12 +310,32 @@ class BaseModelAdmin(BaseView):
     # filters, default
     field_args = None
 
+    # Relations whose form fields look up their choices with AJAX requests
+    # to the `lookup` endpoint instead of listing the whole related table.
+    # A dictionary of field name: options, e.g.
+    #   { 'author': { 'fields': ('name', 'email'), 'page_size': 10 } }
+    # where `fields` are the fields of the related model searched for the
+    # typed text.
+    ajax_refs = {}
+
+    # Relations (e.g. to small lookup tables) whose form fields list their
+    # choices from `choices_cache` rather than querying the related table on
+    # every form render. The `save_model`, `save_models`, `insert_models`,
+    # `update_models` and `delete_models` of the related model's admin
+    # invalidate its cached choices.
+    cache_choices = ()
+
+    # The `flask_superadmin.model.cache.ChoicesCache` used for
+    # `cache_choices` and invalidated by this view's changes. Defaults to a
+    # cache shared by the whole process.
+    choices_cache = None
+
     @staticmethod
     def model_detect(model):
         return False
 
     def __init__(self, model=None, name=None, category=None, endpoint=None,
-                 url=None):
+                 url=None, jobs=None):
         if name is None:
             name = '%s' % camelcase_to_space(model.__name__)
 
@@ -104,37 +347,229 @@ class BaseModelAdmin(BaseView):
         if model:
             self.model = model
 
+        if jobs is not None:
+            self.jobs = jobs
+
+        self._form_cache = None
+        self._count_cache = {}
+        self._column_accessors = {}
+        self._edit_url_templates = {}
+        self._ajax_loaders = None
+        self._search_engine = None
+        self._filters = None
+        self._field_filters = {}
+        self._facet_cache = {}
+
     def get_display_name(self):
         return self.model.__name__
 
     def allow_pk(self):
         return not self.model._meta.auto_increment
 
-    def get_column(self, instance, name):
-        parts = name.split('.')
-        value = instance
-        for p in parts:
-
-            # admin's methods have higher priority than the fields/methods on
-            # the model or document. If a callable is found on the admin
-            # level, it's also passed an instance object
+    def compile_column(self, name):
+        """ Compiles a `list_display` column into a function that takes an
+        instance and returns the column value. Every part of a dotted name is
+        resolved once: admin's methods have higher priority than the
+        fields/methods on the model or document and are passed the instance.
+        """
+        steps = []
+        for p in name.split('.'):
             if hasattr(self, p) and callable(getattr(self, p)):
-                value = getattr(self, p)(instance)
+                steps.append((getattr(self, p), None))
             else:
-                value = getattr(value, p, None)
-                if callable(value):
-                    value = value()
+                steps.append((None, p))
 
-            if not value:
-                break
+        def accessor(instance):
+            value = instance
+            for method, attribute in steps:
+                if method is not None:
+                    value = method(instance)
+                else:
+                    value = getattr(value, attribute, None)
+                    if callable(value):
+                        value = value()
+
+                if not value:
+                    break
+
+            return value
+
+        return accessor
+
+    def get_column_accessor(self, name):
+        accessor = self._column_accessors.get(name)
+        if accessor is None:
+            accessor = self._column_accessors[name] = self.compile_column(name)
+        return accessor
 
-        return value
+    def get_column(self, instance, name):
+        return self.get_column_accessor(name)(instance)
+
+    def get_list_rows(self, data, forms=None):
+        """ Evaluates the `list_display` columns once per row and returns a
+        list of rows for the list template, each a dictionary with the `pk`,
+        the edit `url`, the `instance`, the `form` of the `list_editable`
+        columns and its `cells` (`value`, reference `url` and form `field`).
+        """
+        if forms is None:
+            forms = self.get_list_forms(data)
+        accessors = [self.get_column_accessor(c) for c in self.list_display]
+        rows = []
+        for instance in data:
+            pk = self.get_pk(instance)
+            form = forms.get(unicode(pk))
+            cells = []
+            for i, accessor in enumerate(accessors):
+                value = accessor(instance)
+                name = self.list_display[i]
+                # The first column links to the edit page instead
+                cells.append({
+                    'value': value,
+                    'url': self.get_reference(value) if i else None,
+                    'field': form[name] if form is not None and
+                    name in self.list_editable else None
+                })
+            rows.append({
+                'pk': pk,
+                'url': self.get_edit_url(pk),
+                'instance': instance,
+                'form': form,
+                'cells': cells
+            })
+        return rows
+
+    def get_list_form(self):
+        """ Returns the form class of the `list_editable` columns. """
+        return self.get_bulk_edit_form(self.list_editable)
+
+    def get_list_forms(self, instances, formdata=None):
+        """ Returns the forms of the `list_editable` columns of the rows,
+        by primary key. The fields of every row are prefixed with its
+        primary key.
+        """
+        if not (self.can_edit and self.list_editable):
+            return {}
+        Form = self.get_list_form()
+        forms = {}
+        for instance in instances:
+            pk = unicode(self.get_pk(instance))
+            forms[pk] = Form(formdata, obj=instance, prefix='row-%s-' % pk,
+                             csrf_enabled=False)
+        return forms
+
+    def save_list_forms(self):
+        """ Saves the `list_editable` columns of the rows changed on the
+        list page. Returns the number of saved objects (or None if some of
+        the changed rows aren't valid, nothing is saved then) and the forms
+        of the posted rows.
+        """
+        if not (self.can_edit and self.list_editable):
+            abort(403)
+
+        pks = request.form.getlist('_list_pk')
+        instances = list(self.get_objects(*pks)) if pks else []
+        forms = self.get_list_forms(instances, request.form)
+
+        changed = []
+        for instance in instances:
+            form = forms[unicode(self.get_pk(instance))]
+            if any(field.data != field.object_data for field in form
+                   if field.name != 'csrf_token'):
+                changed.append((instance, form))
+
+        if not all([form.validate() for instance, form in changed]):
+            return None, forms
+
+        if changed:
+            self.save_models([instance for instance, form in changed],
+                             [form for instance, form in changed])
+            self.after_model_change(saved=[instance
+                                           for instance, form in changed])
+        return len(changed), forms
+
+    def get_list_relations(self):
+        """ Returns a dictionary of the dotted paths referenced by
+        `list_display` that the list view may load eagerly, mapped to the
+        loading strategy from `list_select_related` (None means the backend
+        default). The backend decides which of them are relations.
+        """
+        if self.list_select_related is False:
+            return {}
+
+        relations = {}
+        for column in self.list_display:
+            parts = column.split('.')
+
+            # Columns rendered by admin's methods can't be introspected
+            if hasattr(self, parts[0]) and callable(getattr(self, parts[0])):
+                continue
+
+            for i in range(1, len(parts) + 1):
+                relations['.'.join(parts[:i])] = None
+
+        disabled = set()
+        for path, strategy in (self.list_select_related or {}).iteritems():
+            if strategy is None:
+                disabled.add(path)
+            else:
+                relations[path] = strategy
+
+        # Disabling a relation disables the paths going through it, too
+        for path in relations.keys():
+            parts = path.split('.')
+            if any('.'.join(parts[:i]) in disabled
+                   for i in range(1, len(parts) + 1)):
+                del relations[path]
+        return relations
+
+    def is_loadable(self, name):
+        """ Returns True if `name` is a field of the model the backend can
+        load on its own, i.e. not a method or a property.
+        """
+        return False
+
+    def get_list_load_fields(self):
+        """ Returns the names of the fields the list view has to load, or
+        None to load whole objects.
+        """
+        if self.list_load_fields is not None:
+            return list(self.list_load_fields)
+
+        # Without list_display, rows are rendered with __unicode__
+        if not self.list_display:
+            return None
+
+        names = []
+        for column in self.list_display:
+            parts = column.split('.')
+            if any(hasattr(self, p) and callable(getattr(self, p))
+                   for p in parts):
+                return None
+            if not self.is_loadable(parts[0]):
+                return None
+            if parts[0] not in names:
+                names.append(parts[0])
+        return names
+
+    def get_edit_url(self, pk):
+        """ Returns the URL of the edit page for the primary key. The URL is
+        generated once (per script root) and the key is substituted into it.
+        """
+        template = self._edit_url_templates.get(request.script_root)
+        if template is None:
+            template = url_for('%s.%s' % (self.endpoint,
+                                          self.get_url_name('edit')[1:]),
+                               pk=PK_PLACEHOLDER)
+            self._edit_url_templates[request.script_root] = template
+        return template.replace(PK_PLACEHOLDER, url_quote(pk))
 
     def get_reference(self, column_value):
-        for model, model_view in self.admin._models:
-            if type(column_value) == model:
-                return '/admin/%s/%s/' % (model_view.endpoint,
-                                          model_view.get_pk(column_value))
+        """ Returns the edit URL of the value if it's an instance of a model
+        registered in the admin.
+        """
+        model_view = self.admin.get_model_view(type(column_value))
+        if model_view is not None:
+            return model_view.get_edit_url(model_view.get_pk(column_value))
 
     def get_readonly_fields(self, instance):
         ret_vals = {}
@@ -163,6 +598,65 @@ class BaseModelAdmin(BaseView):
     def get_converter(self):
         raise NotImplemented()
 
+    def create_ajax_loader(self, name, options):
+        """ Returns the backend's `AjaxModelLoader` for the relation. """
+        raise NotImplemented()
+
+    def get_ajax_loader(self, name):
+        """ Returns the AJAX loader of the field, or None if the field is
+        not in `ajax_refs`.
+        """
+        if self._ajax_loaders is None:
+            loaders = {}
+            for field, options in self.ajax_refs.iteritems():
+                if not options.get('fields'):
+                    raise Exception('AJAX lookup of %r needs the "fields" to '
+                                    'search' % field)
+                loaders[field] = self.create_ajax_loader(field, options)
+            self._ajax_loaders = loaders
+        return self._ajax_loaders.get(name)
+
+    def get_choices_cache(self):
+        return self.choices_cache or default_choices_cache
+
+    def get_relation_field(self, name, multiple=False, **kwargs):
+        """ Returns the AJAX or cached choices field of the relation if it
+        is listed in `ajax_refs` or `cache_choices`, or None otherwise.
+        Called by the backend converters.
+        """
+        kwargs.pop('query_factory', None)
+        if multiple:
+            kwargs.pop('allow_blank', None)
+
+        loader = self.get_ajax_loader(name)
+        if loader is not None:
+            if multiple:
+                return AjaxSelectMultipleField(loader, **kwargs)
+            return AjaxSelectField(loader, **kwargs)
+
+        if name in self.cache_choices:
+            loader = self.create_ajax_loader(name, {})
+            cache = self.get_choices_cache()
+            if multiple:
+                return CachedSelectMultipleField(loader, cache, **kwargs)
+            return CachedSelectField(loader, cache, **kwargs)
+        return None
+
+    def after_model_change(self, saved=(), deleted=()):
+        """ Called after objects of the model were saved or deleted
+        through this view. Updates the search index and invalidates the
+        cached choices of the model (which the methods writing to the
+        database do as well, for overrides that don't call this).
+
+        `saved`
+            Saved instances
+        `deleted`
+            Primary keys of the deleted objects
+        """
+        self.get_search_engine().update(self, saved, deleted)
+        self.get_choices_cache().invalidate(self.model)
+        self._facet_cache.clear()
+
     def get_model_form(self):
         """ Returns the model form, should get overridden in backend-specific
         view.
@@ -170,8 +664,36 @@ class BaseModelAdmin(BaseView):
         raise NotImplemented()
 
     def get_form(self):
-        model_form = self.get_model_form()
         converter = self.get_converter()
+        if not self.cache_form:
+            self._ajax_loaders = None
+            return self.build_form(converter)
+
+        # The inputs are compared by identity, so replacing any of the
+        # attributes on the view (or using another converter class) builds
+        # a new form class.
+        converter_class = (converter if isinstance(converter, type)
+                           else type(converter))
+        inputs = (self.model, self.form, self.fields, self.readonly_fields,
+                  self.exclude, self.field_args, self.field_overrides,
+                  self.ajax_refs, self.cache_choices, converter_class)
+
+        if self._form_cache is not None:
+            cached_inputs, form = self._form_cache
+            if all(a is b for a, b in zip(cached_inputs, inputs)):
+                return form
+
+        # The loaders are created for the fields of the new form
+        self._ajax_loaders = None
+        form = self.build_form(converter)
+        self._form_cache = (inputs, form)
+        return form
+
+    def build_form(self, converter):
+        """ Generates a new form class for the model with the given converter
+        (either a converter class or instance).
+        """
+        model_form = self.get_model_form()
         if isinstance(converter, type):
             converter = converter()
         base_class = self.form or BaseForm
@@ -182,9 +704,29 @@ class BaseModelAdmin(BaseView):
                           converter=converter)
         return form
 
+    def invalidate_form_cache(self):
+        """ Drops the cached form class, so that the next `get_form` call
+        builds a new one.
+        """
+        self._form_cache = None
+        self._ajax_loaders = None
+
     def get_add_form(self):
         return self.get_form()
 
+    def get_bulk_edit_form(self, names=None):
+        """ Returns the model form reduced to the given fields (by default
+        the `bulk_edit_fields`).
+        """
+        if names is None:
+            names = self.bulk_edit_fields
+        Form = self.get_form()
+        removed = dict((name, None) for name in dir(Form)
+                       if not name.startswith('_') and name not in names and
+                       name != 'csrf_token' and
+                       hasattr(getattr(Form, name), '_formfield'))
+        return type('BulkEdit%s' % Form.__name__, (Form,), removed)
+
     def get_objects(self, *pks):
         raise NotImplemented()
 
@@ -197,9 +739,191 @@ class BaseModelAdmin(BaseView):
     def save_model(self, instance, form, adding=False):
         raise NotImplemented()
 
+    def save_models(self, instances, forms):
+        """ Saves the objects changed by the forms (in the same order).
+        Backends save all of them in one transaction when `save_model` isn't
+        overridden, by default every object is saved by `save_model`.
+        """
+        for instance, form in zip(instances, forms):
+            self.save_model(instance, form, adding=False)
+
     def delete_models(self, *pks):
+        """ Deletes the objects with the given primary keys and returns
+        the number of deleted objects.
+        """
+        raise NotImplemented()
+
+    def insert_models(self, instances):
+        """ Inserts new objects with as few statements as possible, all
+        or none of them. Returns the inserted objects whose primary keys are
+        known, which may not be all of them if the database doesn't report
+        generated keys.
+        """
         raise NotImplemented()
 
+    def can_bulk_insert(self):
+        """ Returns whether new objects can be saved by `insert_models`,
+        i.e. `save_model` and the model's save hooks don't need to run for
+        every object.
+        """
+        return False
+
+    def can_bulk_update(self, names):
+        """ Returns whether the fields can be changed by `update_models`
+        without loading and saving every object.
+        """
+        return False
+
+    def update_models(self, pks, values):
+        """ Sets the fields (a dictionary of field name: form data) of the
+        objects with the given primary keys with a single statement and
+        returns the number of updated objects.
+        """
+        raise NotImplemented()
+
+    def bulk_edit_models(self, names, form, pks=None, search_query=None,
+                         filters=None, date_bucket=None, job=None):
+        """ Applies the given fields of a validated bulk edit form to the
+        objects with the primary keys (or, without them, to every row
+        matching the search), batch by batch. Returns the number of changed
+        objects.
+        """
+        if pks is None:
+            batches = self.iter_pk_batches(search_query,
+                                           self.update_batch_size, filters,
+                                           date_bucket)
+        else:
+            batches = chunked(pks, self.update_batch_size)
+
+        total = None
+        if job is not None:
+            if pks is None:
+                total = self.count_queryset(
+                    self.get_filtered_queryset(search_query, filters,
+                                               date_bucket))
+            else:
+                total = len(pks)
+            job.progress(0, total)
+
+        bulk = self.can_bulk_update(names)
+        values = dict((name, form[name].data) for name in names)
+        count = 0
+        for batch in batches:
+            if bulk:
+                count += self.update_models(batch, values)
+            else:
+                instances = list(self.get_objects(*batch))
+                for instance in instances:
+                    self.save_model(instance, form, adding=False)
+                self.after_model_change(saved=instances)
+                count += len(instances)
+            if job is not None:
+                job.progress(count, max(total, count))
+
+        if bulk:
+            # The changed objects weren't loaded
+            self.after_model_change()
+            self.get_search_engine().invalidate(self)
+        return count
+
+    def _run_bulk_edit(self, job, names, form, pks, search_query, filters,
+                       date_bucket):
+        count = self.bulk_edit_models(names, form, pks, search_query,
+                                      filters, date_bucket, job=job)
+        return 'Updated %s %ss' % (count, self.get_display_name())
+
+    def import_models(self, stream, import_type, job=None, report=None):
+        """ Imports the rows of a file in one of the `import_formats`.
+        Every row is validated by the add form (a single form instance is
+        reused for all the rows) and the valid ones are inserted
+        `import_batch_size` at a time, or saved one by one by `save_model`
+        if `can_bulk_insert` is False. Returns the number of imported
+        objects and the `ImportReport` of the rows that failed.
+        """
+        report = report or ImportReport(self.import_report_dir)
+        form = self.get_add_form()(csrf_enabled=False)
+        names = get_field_names(form, self)
+        bulk = self.can_bulk_insert()
+
+        count = 0
+        batch = []
+        try:
+            for line_num, row in IMPORT_FORMATS[import_type](stream):
+                if not isinstance(row, dict):
+                    report.add(line_num, None,
+                               unicode(row) if isinstance(row, Exception)
+                               else u'Not an object')
+                    continue
+
+                form.process(get_formdata(form, names, row))
+                if not form.validate():
+                    report.add(line_num, row, form.errors)
+                    continue
+
+                instance = self.model()
+                if not bulk:
+                    # `save_model` reads the form, so the row is saved
+                    # before the form is reused
+                    try:
+                        self.save_model(instance, form, adding=True)
+                    except Exception, ex:
+                        report.add(line_num, row, unicode(ex))
+                        continue
+                else:
+                    form.populate_obj(instance)
+                batch.append((line_num, row, instance))
+                if len(batch) >= self.import_batch_size:
+                    count += self._import_batch(batch, report, bulk)
+                    batch = []
+                    if job is not None:
+                        job.progress(count + report.count)
+
+            if batch:
+                count += self._import_batch(batch, report, bulk)
+        finally:
+            report.close()
+        return count, report
+
+    def _import_batch(self, batch, report, bulk=True):
+        instances = [instance for line_num, row, instance in batch]
+        if not bulk:
+            # Already saved by `save_model`
+            self.after_model_change(saved=instances)
+            return len(instances)
+
+        try:
+            saved = self.insert_models(instances)
+        except Exception:
+            # Insert the rows one by one to report only the failing ones
+            instances = []
+            saved = []
+            for line_num, row, instance in batch:
+                try:
+                    saved.extend(self.insert_models([instance]))
+                except Exception, ex:
+                    report.add(line_num, row, unicode(ex))
+                else:
+                    instances.append(instance)
+
+        self.after_model_change(saved=saved)
+        if len(saved) < len(instances):
+            self.get_search_engine().invalidate(self)
+        return len(instances)
+
+    def _run_import(self, job, path, import_type, report_id, report_url):
+        try:
+            with open(path, 'rb') as stream:
+                count, report = self.import_models(
+                    stream, import_type, job=job,
+                    report=ImportReport(self.import_report_dir, report_id))
+        finally:
+            os.remove(path)
+
+        message = 'Imported %s %ss' % (count, self.get_display_name())
+        if report.count:
+            message += ', %s rows failed (%s)' % (report.count, report_url)
+        return message
+
     def is_sortable(self, column):
         return False
 
@@ -209,10 +933,353 @@ class BaseModelAdmin(BaseView):
     def construct_search(self, field_name):
         raise NotImplemented()
 
+    def apply_search(self, qs, search_query):
+        """ Filters the queryset with LIKE/regex lookups of the words of
+        the search query (the 'like' search engine).
+        """
+        raise NotImplemented()
+
+    def filter_pks(self, qs, pks):
+        """ Restricts the queryset to the given primary keys. """
+        raise NotImplemented()
+
+    def get_search_indexes(self):
+        """ Returns a dictionary of search field name: description of the
+        index whose leading column is the field.
+        """
+        return {}
+
+    def apply_lookups(self, qs, terms):
+        """ Filters the queryset with a list of terms, each a list of
+        (field name, operator, word) lookups of which one must match. The
+        operators are 'exact', 'prefix' and 'contains'.
+        """
+        raise NotImplemented()
+
+    def get_query_text(self, qs):
+        """ Returns the query run for the queryset, for debugging. """
+        return unicode(qs)
+
+    def get_search_engine(self):
+        if self._search_engine is None:
+            engine = self.search_engine
+            if isinstance(engine, basestring):
+                engine = self.search_engines[engine]()
+            self._search_engine = engine
+        return self._search_engine
+
+    def scaffold_filters(self, name):
+        """ Returns the filters of a model field, or None if the field
+        can't be filtered on.
+        """
+        return None
+
+    def get_filters(self):
+        """ Returns the filters of `list_filters` and `list_facets`,
+        several per field (one per operation).
+        """
+        if self._filters is None:
+            filters = []
+            names = list(self.list_filters)
+            names.extend(name for name in self.list_facets
+                         if name not in names)
+            for name in names:
+                if isinstance(name, BaseFilter):
+                    filters.append(name)
+                    continue
+
+                field_filters = self.scaffold_filters(name)
+                if not field_filters:
+                    raise Exception("Can't filter the list on %r" % name)
+                self._field_filters[name] = len(filters)
+                filters.extend(field_filters)
+            self._filters = filters
+        return self._filters
+
+    def get_filter_index(self, name):
+        """ Returns the index of the first ('equals') filter of the field.
+        """
+        self.get_filters()
+        return self._field_filters[name]
+
+    def apply_filters(self, qs, filters):
+        """ Applies the (filter index, value) tuples to the queryset. """
+        all_filters = self.get_filters()
+        for index, value in filters:
+            flt = all_filters[index]
+            qs = flt.apply(qs, flt.clean(value))
+        return qs
+
+    def count_facets(self, qs, fields):
+        """ Returns a dictionary of field name: {value: number of rows} for
+        the queryset, computed with a single aggregation query.
+        """
+        raise NotImplemented()
+
+    def get_facet_counts(self, search_query=None, filters=None,
+                         date_bucket=None):
+        """ Returns the counts of the `list_facets` values under the search
+        and filters, cached for `facet_cache_timeout` seconds.
+        """
+        if not self.list_facets:
+            return {}
+
+        key = (search_query, tuple(filters or ()), date_bucket)
+        now = time.time()
+        cached = self._facet_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        qs = self.get_filtered_queryset(search_query, filters, date_bucket)
+        counts = self.count_facets(qs, self.list_facets)
+
+        for k, (expires, _) in self._facet_cache.items():
+            if expires <= now:
+                del self._facet_cache[k]
+        self._facet_cache[key] = (now + self.facet_cache_timeout, counts)
+        return counts
+
+    def get_facets(self, search_query=None, filters=None, date_bucket=None):
+        """ Returns the facets shown by the list view as (field label,
+        values) tuples, where values are (label, count, url) tuples sorted
+        by decreasing count. The url adds the value's 'equals' filter.
+        """
+        counts = self.get_facet_counts(search_query, filters, date_bucket)
+        all_filters = self.get_filters()
+        sort, desc = self.sort
+
+        facets = []
+        for name in self.list_facets:
+            index = self.get_filter_index(name)
+            flt = all_filters[index]
+            options = flt.get_options(self) or ()
+
+            values = []
+            field_counts = counts.get(name, {})
+            for value, count in sorted(field_counts.iteritems(),
+                                       key=lambda item: -item[1]):
+                label, arg = unicode(value), unicode(value)
+                for option, option_label in options:
+                    if flt.validate(option) and flt.clean(option) == value:
+                        label, arg = unicode(option_label), option
+                        break
+
+                url = None
+                if value is not None and flt.validate(arg):
+                    position = 'flt%d_%d' % (len(filters or ()), index)
+                    url = self._list_url(sort, desc, **{position: arg})
+                values.append((label, count, url))
+            facets.append((self.field_name(name), values))
+        return facets
+
+    def apply_date_range(self, qs, start, end):
+        """ Restricts the queryset to the rows whose `date_hierarchy` field
+        is in [start, end).
+        """
+        raise NotImplemented()
+
+    def count_date_buckets(self, qs, level):
+        """ Returns the (bucket, number of rows) tuples of the queryset,
+        sorted by bucket, where a bucket is a (year,), (year, month) or
+        (year, month, day) tuple depending on the level. Computed with a
+        single grouped query.
+        """
+        raise NotImplemented()
+
+    def get_date_hierarchy(self, search_query=None, filters=None,
+                           date_bucket=None):
+        """ Returns the date hierarchy drill-down as a (crumbs, buckets)
+        tuple. Crumbs are (label, url) tuples leading up to the listed
+        level, buckets are (label, count, url, active) tuples of the years,
+        the months of the selected year or the days of the selected month.
+        """
+        parts = parse_date_bucket(date_bucket) if date_bucket else None
+        parts = parts or ()
+        # A selected day is listed among the days of its month
+        parent = parts[:2] if len(parts) == len(DATE_LEVELS) else parts
+
+        qs = self.get_filtered_queryset(search_query, filters)
+        if parent:
+            qs = self.apply_date_range(qs, *date_bucket_range(parent))
+
+        sort, desc = self.sort
+
+        def bucket_url(bucket):
+            return self._list_url(sort, desc,
+                                  dh=format_date_bucket(bucket) if bucket
+                                  else None)
+
+        crumbs = [(gettext('All dates'), bucket_url(()))]
+        for i in range(1, len(parent) + 1):
+            crumbs.append((date_bucket_label(parent[:i]),
+                           bucket_url(parent[:i])))
+
+        buckets = []
+        for bucket, count in self.count_date_buckets(
+                qs, DATE_LEVELS[len(parent)]):
+            buckets.append((date_bucket_label(bucket), count,
+                            bucket_url(bucket), bucket == parts))
+        return crumbs, buckets
+
+    def get_export_queryset(self, search_query=None, filters=None,
+                            date_bucket=None, sort=None, sort_desc=None):
+        """ Returns the rows of the list, ordered but not paginated, in an
+        iterable fetching them from the database `export_batch_size` at a
+        time.
+        """
+        raise NotImplemented()
+
+    def get_export_formats(self):
+        """ Returns the `export_formats` that can be written here. """
+        return [export_type for export_type in self.export_formats
+                if export_type in EXPORT_FORMATS]
+
+    def get_export_type(self, name):
+        """ Returns the type of an exported column in the columnar formats:
+        'string', 'int', 'float', 'bool', 'date', 'datetime' or None for
+        values exported as strings.
+        """
+        return None
+
+    def get_export_columns(self):
+        """ Returns the (header, accessor, type) tuples of the exported
+        columns, the `list_display` columns.
+        """
+        if not self.list_display:
+            return [(self.get_display_name(), unicode, None)]
+        return [(self.field_name(c), self.get_column_accessor(c),
+                 self.get_export_type(c))
+                for c in self.list_display]
+
     def get_queryset(self):
         raise NotImplemented()
 
-    def get_list(self):
+    def get_filtered_queryset(self, search_query=None, filters=None,
+                              date_bucket=None):
+        """ Returns the queryset of the rows matching the list's search,
+        filters and date hierarchy bucket, unordered and unpaginated.
+        """
+        qs = self.get_queryset()
+        if date_bucket and self.date_hierarchy:
+            parts = parse_date_bucket(date_bucket)
+            if parts is not None:
+                qs = self.apply_date_range(qs, *date_bucket_range(parts))
+        if filters:
+            qs = self.apply_filters(qs, filters)
+        if search_query and self.search_fields:
+            qs = self.get_search_engine().apply(self, qs, search_query)
+        return qs
+
+    def get_pk_batch(self, qs, after=None, limit=None):
+        """ Returns up to `limit` primary keys of the queryset greater
+        than `after`, in primary key order.
+        """
+        raise NotImplemented()
+
+    def iter_pk_batches(self, search_query=None, size=None, filters=None,
+                        date_bucket=None):
+        """ Yields the primary keys of all the rows matching the search in
+        lists of `size` (`delete_batch_size` by default). Batches are
+        fetched by seeking past the last primary key, so rows removed by
+        the caller in the meantime don't shift the following batches.
+        """
+        size = size or self.delete_batch_size
+        after = None
+        while True:
+            qs = self.get_filtered_queryset(search_query, filters,
+                                            date_bucket)
+            pks = list(self.get_pk_batch(qs, after, size))
+            if pks:
+                yield pks
+            if len(pks) < size:
+                break
+            after = pks[-1]
+
+    def delete_matching_models(self, search_query=None, job=None,
+                               filters=None, date_bucket=None):
+        """ Deletes all the rows matching the search, batch by batch, and
+        returns the number of deleted objects. Progress is reported to the
+        background `job`, if given.
+        """
+        total = None
+        if job is not None:
+            total = self.count_queryset(
+                self.get_filtered_queryset(search_query, filters,
+                                           date_bucket))
+            job.progress(0, total)
+
+        count = 0
+        for pks in self.iter_pk_batches(search_query, filters=filters,
+                                        date_bucket=date_bucket):
+            deleted = self.delete_models(*pks)
+            self.after_model_change(deleted=pks)
+            if deleted is None or isinstance(deleted, bool):
+                deleted = len(pks)
+            count += deleted
+            if job is not None:
+                job.progress(count, max(total, count))
+        return count
+
+    def _run_delete_matching(self, job, search_query, filters=None,
+                             date_bucket=None):
+        count = self.delete_matching_models(search_query, job=job,
+                                            filters=filters,
+                                            date_bucket=date_bucket)
+        return 'Deleted %s %ss' % (count, self.get_display_name())
+
+    def count_queryset(self, qs):
+        """ Returns the exact number of rows in the queryset. """
+        raise NotImplemented()
+
+    def estimate_count(self):
+        """ Returns the approximate number of rows of the whole model from
+        the database statistics, or None if it can't be estimated (e.g.
+        because `get_queryset` is overridden).
+        """
+        return None
+
+    def get_count(self, qs, search_query=None, filters=None,
+                  date_bucket=None):
+        """ Returns the total count shown in the list view for the (already
+        searched and filtered) queryset, following `count_strategy`.
+        """
+        strategy = self.count_strategy
+        if strategy is None:
+            return None
+
+        if strategy == 'estimated':
+            if not search_query and not filters and not date_bucket:
+                estimate = self.estimate_count()
+                if estimate is not None:
+                    return ApproximateCount(estimate)
+        elif strategy == 'cached':
+            key = (self.model, search_query, tuple(filters or ()),
+                   date_bucket)
+            now = time.time()
+            cached = self._count_cache.get(key)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+
+            count = self.count_queryset(qs)
+
+            # Drop expired counts so rarely repeated searches don't pile up
+            for k, (expires, _) in self._count_cache.items():
+                if expires <= now:
+                    del self._count_cache[k]
+            self._count_cache[key] = (now + self.count_cache_timeout, count)
+            return count
+
+        return self.count_queryset(qs)
+
+    def get_list(self, page=0, sort=None, sort_desc=None, execute=False,
+                 search_query=None, filters=None, date_bucket=None,
+                 after=None, before=None):
+        """ Returns the total count and the rows of a page of the list.
+        `filters`, `date_bucket`, `after` and `before` are only passed by
+        the list view when they are set: overrides written for the original
+        `(page, sort, sort_desc, execute, search_query)` signature work as
+        long as these features aren't used.
+        """
         raise NotImplemented()
 
     def get_url_name(self, name):
@@ -245,6 +1312,7 @@ class BaseModelAdmin(BaseView):
             if form.validate_on_submit():
                 try:
                     instance = self.save_model(self.model(), form, adding=True)
+                    self.after_model_change(saved=(instance,))
                     flash(gettext('New %(model)s saved successfully',
                           model=self.get_display_name()), 'success')
                     return self.dispatch_save_redirect(instance)
@@ -270,8 +1338,19 @@ class BaseModelAdmin(BaseView):
         return request.args.get('page', 0, type=int)
 
     def total_pages(self, count):
+        if count is None:
+            return None
         return int(math.ceil(float(count) / self.list_per_page))
 
+    @property
+    def list_fetch_size(self):
+        """ Number of rows the backends fetch for a list page. One extra row
+        is fetched when the pager has to tell whether another page follows.
+        """
+        if self.pagination == 'keyset' or self.count_strategy is None:
+            return self.list_per_page + 1
+        return self.list_per_page
+
     @property
     def sort(self):
         sort = request.args.get('sort', None)
@@ -286,44 +1365,323 @@ class BaseModelAdmin(BaseView):
     def search(self):
         return request.args.get('q', None)
 
-    def page_url(self, page):
-        search_query = self.search
-        sort, desc = self.sort
+    @property
+    def active_filters(self):
+        """ Returns the valid filters of the `flt<position>_<filter index>`
+        URL arguments as (filter index, value) tuples, in position order.
+        """
+        filters = self.get_filters()
+        active = []
+        for arg, value in request.args.iteritems():
+            match = filter_arg_re.match(arg)
+            if match is None or not value:
+                continue
+            position, index = int(match.group(1)), int(match.group(2))
+            if index < len(filters) and filters[index].validate(value):
+                active.append((position, index, value))
+        return [(index, value) for position, index, value in sorted(active)]
+
+    def get_filter_args(self, filters):
+        return dict(('flt%d_%d' % (position, index), value)
+                    for position, (index, value) in enumerate(filters))
+
+    def get_filter_ui(self):
+        """ Returns the operations, options and data types of the filters
+        for the filter bar of the list view.
+        """
+        operations = {}
+        options = {}
+        types = {}
+        for index, flt in enumerate(self.get_filters()):
+            name = unicode(flt.name)
+            operations.setdefault(name, []).append(
+                (index, unicode(flt.operation())))
+            flt_options = flt.get_options(self)
+            if flt_options:
+                options[index] = [(unicode(value), unicode(label))
+                                  for value, label in flt_options]
+            if flt.data_type:
+                types[index] = flt.data_type
+        return operations, options, types
+
+    @property
+    def date_bucket(self):
+        """ Returns the selected date hierarchy bucket, if valid. """
+        value = request.args.get('dh', None)
+        if value and parse_date_bucket(value) is not None:
+            return value
+        return None
+
+    @property
+    def cursor(self):
+        """ Returns the keyset pagination cursor as a (direction, pk) tuple,
+        where direction is either 'after' or 'before'.
+        """
+        for direction in ('after', 'before'):
+            pk = request.args.get(direction, None)
+            if pk:
+                return direction, pk
+        return None, None
+
+    def get_list_args(self, sort=None, desc=None):
+        """ Returns the URL arguments of the list's search, filters and date
+        hierarchy bucket, with the given order.
+        """
         if sort and desc:
             sort = '-' + sort
+        args = self.get_filter_args(self.active_filters)
+        args.update(sort=sort, q=self.search, dh=self.date_bucket)
+        return args
+
+    def _list_url(self, sort=None, desc=None, **kwargs):
+        args = self.get_list_args(sort, desc)
+        args.update(kwargs)
+        return url_for(self.get_url_name('index'), **args)
+
+    def export_url(self, export_type):
+        sort, desc = self.sort
+        return url_for('.export', export_type=export_type,
+                       **self.get_list_args(sort, desc))
+
+    def page_url(self, page):
+        sort, desc = self.sort
         if page == 0:
             page = None
-        return url_for(self.get_url_name('index'), page=page, sort=sort,
-                       q=search_query)
+        return self._list_url(sort, desc, page=page)
+
+    def cursor_url(self, after=None, before=None):
+        sort, desc = self.sort
+        return self._list_url(sort, desc, after=after, before=before)
 
     def sort_url(self, sort, desc=None):
-        if sort and desc:
-            sort = '-' + sort
-        search_query = self.search
-        return url_for(self.get_url_name('index'), sort=sort, q=search_query)
+        # Changing the order invalidates both the page and the cursor
+        return self._list_url(sort, desc)
+
+    def trim_page(self, rows, direction=None):
+        """ Trims the extra row fetched to detect a next page and returns a
+        (rows, has_prev, has_next) tuple. Rows fetched `before` a keyset
+        cursor come in reverse order and are flipped back.
+        """
+        rows = list(rows)
+        has_more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if direction == 'before':
+            rows.reverse()
+            return rows, has_more, True
+        return rows, direction == 'after', has_more
 
     @expose('/', methods=('GET', 'POST',))
     def list(self):
         """
             List view
         """
+        list_forms = None
         # Grab parameters from URL
         if request.method == 'POST':
             id_list = request.form.getlist('_selected_action')
-            if id_list and (request.form.get('action-delete') or
-                            request.form.get('action', None) == 'delete'):
-                return self.delete(*id_list)
+            if (request.form.get('action-delete') or
+                    request.form.get('action', None) == 'delete'):
+                if request.form.get('_select_across') == '1':
+                    return self.delete_matching()
+                if id_list:
+                    return self.delete(*id_list)
+            elif request.form.get('action', None) == 'edit':
+                if request.form.get('_select_across') == '1':
+                    return self.bulk_edit(select_across=True)
+                if id_list:
+                    return self.bulk_edit(id_list)
+            elif '_save_list' in request.form:
+                count, list_forms = self.save_list_forms()
+                if count is not None:
+                    flash(
+                        'Changes to %s %ss saved successfully' % (
+                            count, self.get_display_name()),
+                        'success'
+                    )
+                    return redirect(request.url)
+                flash(gettext('Failed to save the changes, see the errors '
+                              'below.'), 'error')
 
         sort, sort_desc = self.sort
         page = self.page
         search_query = self.search
-        count, data = self.get_list(page=page, sort=sort, sort_desc=sort_desc,
-                                    search_query=search_query)
-
-        return self.render(self.list_template, data=data, page=page,
-                           total_pages=self.total_pages(count), sort=sort,
+        filters = self.active_filters
+        date_bucket = self.date_bucket
+        prev_url = next_url = None
+
+        # The newer arguments are only passed when they are set, so that
+        # `get_list` overrides with the original signature keep working
+        list_kwargs = {'sort': sort, 'sort_desc': sort_desc,
+                       'search_query': search_query}
+        if filters:
+            list_kwargs['filters'] = filters
+        if date_bucket:
+            list_kwargs['date_bucket'] = date_bucket
+
+        if self.pagination == 'keyset':
+            direction, cursor = self.cursor
+            if cursor is not None:
+                list_kwargs[direction] = cursor
+            count, data = self.get_list(page=None, **list_kwargs)
+            data, has_prev, has_next = self.trim_page(data, direction)
+            if data and has_prev:
+                prev_url = self.cursor_url(before=self.get_pk(data[0]))
+            if data and has_next:
+                next_url = self.cursor_url(after=self.get_pk(data[-1]))
+            total_pages = None
+        else:
+            count, data = self.get_list(page=page, **list_kwargs)
+            total_pages = self.total_pages(count)
+            if total_pages is None:
+                data, has_prev, has_next = self.trim_page(data)
+                if page > 0:
+                    prev_url = self.page_url(page - 1)
+                if has_next:
+                    next_url = self.page_url(page + 1)
+
+        data = list(data)
+        forms = self.get_list_forms(data)
+        if list_forms:
+            # Show the posted values and their errors
+            forms.update(list_forms)
+        operations, options, types = self.get_filter_ui()
+        facets = self.get_facets(search_query, filters, date_bucket)
+        date_hierarchy = None
+        if self.date_hierarchy:
+            date_hierarchy = self.get_date_hierarchy(search_query, filters,
+                                                     date_bucket)
+        return self.render(self.list_template, data=data,
+                           rows=self.get_list_rows(data, forms), page=page,
+                           total_pages=total_pages, sort=sort,
                            sort_desc=sort_desc, count=count, modeladmin=self,
-                           search_query=search_query)
+                           search_query=search_query, prev_url=prev_url,
+                           next_url=next_url, filters=self.get_filters(),
+                           active_filters=filters,
+                           filter_operations=operations,
+                           filter_options=options, filter_types=types,
+                           facets=facets, date_hierarchy=date_hierarchy)
+
+    @expose('/export/<export_type>/')
+    def export(self, export_type):
+        """ Streams the rows of the list, with its search, filters, date
+        hierarchy bucket and order but without pagination, as a file.
+        """
+        if (not self.can_export or
+                export_type not in self.get_export_formats()):
+            abort(404)
+
+        sort, sort_desc = self.sort
+        qs = self.get_export_queryset(self.search, self.active_filters,
+                                      self.date_bucket, sort, sort_desc)
+        mimetype, write = EXPORT_FORMATS[export_type]
+        chunks = write(self.get_export_columns(), qs,
+                       batch_size=self.export_batch_size)
+
+        headers = {
+            'Content-Disposition': 'attachment; filename=%s.%s' % (
+                self.endpoint, export_type),
+            'Vary': 'Accept-Encoding',
+        }
+        if (self.export_gzip and
+                'gzip' in request.headers.get('Accept-Encoding', '')):
+            chunks = gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+
+        # The request context (and the database session) stays around
+        # until the last row is sent
+        return Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers=headers)
+
+    @expose('/import/', methods=('GET', 'POST'))
+    def import_file(self):
+        """ Imports the rows of an uploaded CSV or NDJSON file. Large files
+        are imported in the background if `jobs` is set.
+        """
+        if not (self.can_import and self.can_create):
+            abort(403)
+
+        result = None
+        if request.method == 'POST':
+            upload = request.files.get('file')
+            import_type = request.form.get('format')
+            if upload and not import_type:
+                import_type = op.splitext(upload.filename)[1][1:].lower()
+
+            if not upload or not upload.filename:
+                flash(gettext('Choose a file to import.'), 'error')
+            elif import_type not in self.import_formats:
+                flash(gettext('Unsupported file format.'), 'error')
+            elif (self.jobs is not None and
+                    request.content_length > self.import_background_size):
+                # The upload only lives as long as the request
+                fd, path = tempfile.mkstemp(suffix='.%s' % import_type)
+                os.close(fd)
+                upload.save(path)
+
+                report = ImportReport(self.import_report_dir)
+                job_id = self.jobs.submit(
+                    'Import %ss from "%s"' % (self.get_display_name(),
+                                              upload.filename),
+                    self._run_import, path, import_type, report.id,
+                    url_for('.import_report', report_id=report.id))
+                return self.jobs.redirect(
+                    job_id, url_for(self.get_url_name('index')))
+            else:
+                count, report = self.import_models(upload.stream,
+                                                   import_type)
+                result = {'count': count, 'failed': report.count,
+                          'report_id': report.id}
+
+        return self.render(self.import_template, result=result)
+
+    @expose('/import/<report_id>/')
+    def import_report(self, report_id):
+        """ Downloads the report of the rows that failed to import. """
+        path = ImportReport.get_path(report_id, self.import_report_dir)
+        if path is None or not op.exists(path):
+            abort(404)
+        return send_file(path, mimetype='text/csv', as_attachment=True,
+                         attachment_filename='%s-errors.csv' % self.endpoint)
+
+    @expose('/_lookup/')
+    def lookup(self):
+        """ Returns a page of the objects matching the typed text for an
+        AJAX relation picker, as JSON.
+        """
+        loader = self.get_ajax_loader(request.args.get('name'))
+        if loader is None:
+            abort(404)
+
+        term = request.args.get('q', u'')
+        page = request.args.get('page', 0, type=int)
+        size = loader.page_size
+
+        # One extra object tells whether there are more results
+        objs = list(loader.get_list(term, page * size, size + 1))
+        results = []
+        for obj in objs[:size]:
+            pk, label = loader.format(obj)
+            results.append({'id': pk, 'text': label})
+
+        return jsonify(results=results, more=len(objs) > size)
+
+    @expose('/_search_plan/')
+    def search_plan(self):
+        """ Shows the lookup chosen for every search field by the 'planned'
+        search engine and the query run for the `q` search.
+        """
+        if not (self.search_plan_debug or current_app.debug):
+            abort(404)
+
+        search_query = self.search
+        query = None
+        if search_query:
+            query = self.get_query_text(
+                self.get_filtered_queryset(search_query))
+
+        return self.render(self.search_plan_template, plan=plan_search(self),
+                           search_query=search_query, query=query,
+                           engine=self.get_search_engine())
 
     @expose('/<pk>/', methods=('GET', 'POST'))
     def edit(self, pk):
@@ -339,6 +1697,7 @@ class BaseModelAdmin(BaseView):
             if form.validate_on_submit():
                 try:
                     self.save_model(instance, form, adding=False)
+                    self.after_model_change(saved=(instance,))
                     flash(
                         'Changes to %s saved successfully' % self.get_display_name(),
                         'success'
@@ -363,8 +1722,11 @@ class BaseModelAdmin(BaseView):
             pks += pk,
 
         if request.method == 'POST' and 'confirm_delete' in request.form:
-            count = len(pks)
-            self.delete_models(*pks)
+            count = self.delete_models(*pks)
+            self.after_model_change(deleted=pks)
+            # Custom backends may still return True
+            if count is None or isinstance(count, bool):
+                count = len(pks)
 
             flash(
                 'Successfully deleted %s %ss' % (count, self.get_display_name()),
@@ -376,6 +1738,96 @@ class BaseModelAdmin(BaseView):
 
         return self.render(self.delete_template, instances=instances)
 
+    def delete_matching(self):
+        """ Deletes every row matching the list's search rather than the
+        selected primary keys. The confirmation page shows the number of
+        matching rows and a sample of them.
+        """
+        if not self.can_delete:
+            abort(403)
+
+        search_query = self.search
+        filters = self.active_filters
+        date_bucket = self.date_bucket
+        if 'confirm_delete' in request.form:
+            if self.jobs is not None:
+                job_id = self.jobs.submit(
+                    'Delete %ss matching "%s"' % (self.get_display_name(),
+                                                  search_query or ''),
+                    self._run_delete_matching, search_query, filters,
+                    date_bucket)
+                return self.jobs.redirect(
+                    job_id, url_for(self.get_url_name('index')))
+
+            count = self.delete_matching_models(search_query,
+                                                filters=filters,
+                                                date_bucket=date_bucket)
+            flash(
+                'Successfully deleted %s %ss' % (count, self.get_display_name()),
+                'success'
+            )
+            return redirect(url_for(self.get_url_name('index')))
+
+        qs = self.get_filtered_queryset(search_query, filters, date_bucket)
+        count = self.count_queryset(qs)
+        pks = self.get_pk_batch(qs, limit=self.action_sample_size)
+        instances = list(self.get_objects(*pks)) if pks else []
+
+        return self.render(self.delete_template, instances=instances,
+                           count=count, select_across=True)
+
+    def bulk_edit(self, pks=(), select_across=False):
+        """ Sets the chosen `bulk_edit_fields` of the selected rows (or of
+        every row matching the list's search) to the same values. The form
+        is validated once for all the rows.
+        """
+        if not (self.can_edit and self.bulk_edit_fields):
+            abort(403)
+
+        search_query = self.search
+        filters = self.active_filters
+        date_bucket = self.date_bucket
+        names = [name for name in request.form.getlist('_bulk_field')
+                 if name in self.bulk_edit_fields]
+        form = self.get_bulk_edit_form()()
+        errors = {}
+
+        if 'confirm_edit' in request.form:
+            edit_form = self.get_bulk_edit_form(names)()
+            if not names:
+                flash(gettext('Choose the fields to change.'), 'error')
+            elif edit_form.validate():
+                args = (names, edit_form, None if select_across else pks,
+                        search_query, filters, date_bucket)
+                if select_across and self.jobs is not None:
+                    job_id = self.jobs.submit(
+                        'Update %ss matching "%s"' % (self.get_display_name(),
+                                                      search_query or ''),
+                        self._run_bulk_edit, *args)
+                    return self.jobs.redirect(
+                        job_id, url_for(self.get_url_name('index')))
+
+                count = self.bulk_edit_models(*args)
+                flash(
+                    'Successfully updated %s %ss' % (count,
+                                                     self.get_display_name()),
+                    'success'
+                )
+                return redirect(url_for(self.get_url_name('index')))
+            else:
+                errors = edit_form.errors
+
+        if select_across:
+            qs = self.get_filtered_queryset(search_query, filters,
+                                            date_bucket)
+            count = self.count_queryset(qs)
+        else:
+            count = len(pks)
+
+        return self.render(self.bulk_edit_template, form=form, names=names,
+                           errors=errors, pks=pks, count=count,
+                           select_across=select_across)
+
 
 class ModelAdmin(BaseModelAdmin):
     pass
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class ChoicesCache(object):
+    """ Process-wide cache of the (primary key, label) choices of related
+    models, bounded by age and by number of entries (least recently used
+    entries are dropped first). Entries are keyed by the related model and
+    a query key, and are invalidated when the model admin of the related
+    model saves or deletes objects.
+
+    `timeout`
+        Seconds an entry stays valid
+    `max_size`
+        Maximum number of cached choice lists
+    """
+    def __init__(self, timeout=300, max_size=128):
+        self.timeout = timeout
+        self.max_size = max_size
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, model, key, load):
+        """ Returns the cached choices for `(model, key)`, calling `load` to
+        fetch them on a miss.
+        """
+        cache_key = (model, key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(cache_key, None)
+            if entry is not None and entry[0] > now:
+                # Move the entry to the most recently used end
+                self._entries[cache_key] = entry
+                return entry[1]
+            generation = self._generation
+
+        value = load()
+
+        with self._lock:
+            # Don't store choices loaded before an invalidation
+            if generation == self._generation:
+                self._entries[cache_key] = (now + self.timeout, value)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, model=None):
+        """ Drops the entries of the model (and of its base classes and
+        subclasses), or all entries if no model is given.
+        """
+        with self._lock:
+            self._generation += 1
+            if model is None:
+                self._entries.clear()
+                return
+
+            for cache_key in self._entries.keys():
+                cached = cache_key[0]
+                if issubclass(cached, model) or issubclass(model, cached):
+                    del self._entries[cache_key]
+
+
+# Shared by all the model admins that don't set their own `choices_cache`
+default_choices_cache = ChoicesCache()
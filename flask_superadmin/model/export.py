@@ -0,0 +1,190 @@
+import csv
+import json
+import zlib
+
+from collections import OrderedDict
+from cStringIO import StringIO
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return unicode(value)
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    return unicode(value).encode('utf-8')
+
+
+def iter_batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_csv(columns, rows, batch_size=1000):
+    """ Yields the lines of a CSV file with a header row, `batch_size` rows
+    at a time. `columns` are (header, accessor, type) tuples.
+    """
+    buf = StringIO()
+    writer = csv.writer(buf)
+
+    def flush():
+        data = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return data
+
+    writer.writerow([csv_value(header) for header, accessor, type in columns])
+    yield flush()
+    for batch in iter_batches(rows, batch_size):
+        for row in batch:
+            writer.writerow([csv_value(accessor(row))
+                             for header, accessor, type in columns])
+        yield flush()
+
+
+def write_ndjson(columns, rows, batch_size=1000):
+    """ Yields one JSON object per row and line, keyed by the headers. """
+    headers = [unicode(header) for header, accessor, type in columns]
+    for batch in iter_batches(rows, batch_size):
+        lines = []
+        for row in batch:
+            values = OrderedDict(zip(headers, [accessor(row) for header,
+                                               accessor, type in columns]))
+            lines.append(json.dumps(values, default=json_default) + '\n')
+        yield ''.join(lines)
+
+
+class ChunkSink(object):
+    """ File-like object collecting what pyarrow writes, so that it can be
+    streamed after every batch.
+    """
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = ''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def get_arrow_schema(columns):
+    types = {
+        'string': pyarrow.string(),
+        'int': pyarrow.int64(),
+        'float': pyarrow.float64(),
+        'bool': pyarrow.bool_(),
+        'date': pyarrow.date32(),
+        'datetime': pyarrow.timestamp('us'),
+    }
+    return pyarrow.schema([
+        pyarrow.field(unicode(header), types.get(type, pyarrow.string()))
+        for header, accessor, type in columns])
+
+
+def iter_record_batches(columns, rows, batch_size):
+    """ Yields the rows as Arrow record batches of `batch_size` rows. Values
+    of typed columns are handed to Arrow as they are, the others are
+    converted to strings.
+    """
+    schema = get_arrow_schema(columns)
+    converters = []
+    for header, accessor, type in columns:
+        if type == 'float':
+            # Numeric columns may hold Decimals
+            converters.append(float)
+        elif type is None:
+            converters.append(unicode)
+        else:
+            converters.append(None)
+
+    for batch in iter_batches(rows, batch_size):
+        arrays = []
+        for (header, accessor, type), convert, field in zip(columns,
+                                                            converters,
+                                                            schema):
+            values = [accessor(row) for row in batch]
+            if convert is not None:
+                values = [None if value is None else convert(value)
+                          for value in values]
+            arrays.append(pyarrow.array(values, type=field.type))
+        yield pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_arrow(columns, rows, batch_size=1000):
+    """ Yields an Arrow IPC stream, one record batch per `batch_size` rows.
+    """
+    sink = ChunkSink()
+    writer = pyarrow.ipc.new_stream(sink, get_arrow_schema(columns))
+    for batch in iter_record_batches(columns, rows, batch_size):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def write_parquet(columns, rows, batch_size=1000):
+    """ Yields a Parquet file, one row group per `batch_size` rows. """
+    sink = ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, get_arrow_schema(columns))
+    for batch in iter_record_batches(columns, rows, batch_size):
+        writer.write_table(pyarrow.Table.from_batches([batch]))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# Export format: (mimetype, writer)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', write_csv),
+    'ndjson': ('application/x-ndjson', write_ndjson),
+}
+
+# Columnar formats need pyarrow
+if pyarrow is not None:
+    EXPORT_FORMATS.update({
+        'arrow': ('application/vnd.apache.arrow.stream', write_arrow),
+        'parquet': ('application/vnd.apache.parquet', write_parquet),
+    })
+
+
+def gzip_chunks(chunks, level=6):
+    """ Compresses a stream of chunks into the gzip format on the fly. """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,201 @@
+import datetime
+
+from flask_superadmin.babel import gettext
+
+
+class BaseFilter(object):
+    """
+        Base filter class.
+    """
+    def __init__(self, name, options=None, data_type=None):
+        """
+            Constructor.
+
+            `name`
+                Displayed name
+            `options`
+                List of fixed options. If provided, will use drop down
+                instead of textbox.
+            `data_type`
+                Client-side widget type to use.
+        """
+        self.name = name
+        self.options = options
+        self.data_type = data_type
+
+    def get_options(self, view):
+        """
+            Return list of predefined options.
+
+            Override to customize behavior.
+
+            `view`
+                Associated administrative view class.
+        """
+        return self.options
+
+    def validate(self, value):
+        """
+            Validate value.
+
+            If value is valid, returns `True` and `False` otherwise.
+
+            `value`
+                Value to validate
+        """
+        return True
+
+    def clean(self, value):
+        """
+            Parse value into python format.
+
+            `value`
+                Value to parse
+        """
+        return value
+
+    def apply(self, query, value):
+        """
+            Apply search criteria to the query and return new query.
+
+            `query`
+                Query
+            `value`
+                Search criteria
+        """
+        raise NotImplemented()
+
+    def operation(self):
+        """
+            Return readable operation name.
+
+            For example: u'equals'
+        """
+        raise NotImplemented()
+
+    def __unicode__(self):
+        return self.name
+
+
+# Customized filters
+class BaseBooleanFilter(BaseFilter):
+    """
+        Base boolean filter, uses fixed list of options.
+    """
+    def __init__(self, name, options=None, data_type=None):
+        super(BaseBooleanFilter, self).__init__(name,
+                                                (('1', gettext('Yes')),
+                                                 ('0', gettext('No'))),
+                                                data_type)
+
+    def validate(self, value):
+        return value in ('0', '1')
+
+    def clean(self, value):
+        return value == '1'
+
+
+class BaseIntFilter(BaseFilter):
+    """
+        Base integer filter.
+    """
+    def validate(self, value):
+        try:
+            int(value)
+            return True
+        except ValueError:
+            return False
+
+    def clean(self, value):
+        return int(value)
+
+
+class BaseFloatFilter(BaseFilter):
+    """
+        Base float filter.
+    """
+    def validate(self, value):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+
+    def clean(self, value):
+        return float(value)
+
+
+class BaseDateFilter(BaseFilter):
+    """
+        Base date filter, parses the format of the date picker.
+    """
+    format = '%Y-%m-%d'
+
+    def validate(self, value):
+        try:
+            self.clean(value)
+            return True
+        except ValueError:
+            return False
+
+    def clean(self, value):
+        return datetime.datetime.strptime(value, self.format).date()
+
+
+class BaseDateTimeFilter(BaseDateFilter):
+    """
+        Base date and time filter, also accepts plain dates.
+    """
+    format = '%Y-%m-%d %H:%M:%S'
+
+    def clean(self, value):
+        try:
+            return datetime.datetime.strptime(value, self.format)
+        except ValueError:
+            return datetime.datetime.strptime(value, BaseDateFilter.format)
+
+
+class BaseFilterConverter(object):
+    """
+        Base filter converter.
+
+        Derive from this class to implement custom field to filter conversion
+        logic.
+    """
+    def __init__(self):
+        self.converters = dict()
+
+        for name in dir(self):
+            method = getattr(self, name)
+            for type_name in getattr(method, '_converter_for', ()):
+                self.converters[type_name] = method
+
+    def convert(self, type_name, column, name):
+        """
+            Return the filters of a field (or None if it can't be
+            filtered).
+
+            `type_name`
+                Name of the field type
+            `column`
+                Field (or field name) to filter on
+            `name`
+                Display name
+        """
+        if type_name in self.converters:
+            return self.converters[type_name](column, name)
+
+        return None
+
+
+def convert(*args):
+    """
+        Decorator for field to filter conversion routine.
+
+        See :mod:`flask_superadmin.model.backends.sqlalchemy.filters` for
+        usage example.
+    """
+    def _inner(func):
+        func._converter_for = args
+        return func
+    return _inner
@@ -0,0 +1,142 @@
+import csv
+import json
+import os.path as op
+import re
+import tempfile
+import uuid
+
+from werkzeug.datastructures import MultiDict
+from wtforms import fields
+
+from flask_superadmin.model.export import csv_value
+
+
+report_id_re = re.compile(r'^[0-9a-f]{32}$')
+
+# Boolean cell values read as unchecked
+FALSE_VALUES = ('', '0', 'false', 'no', 'off', 'n')
+
+
+def read_csv(stream):
+    """ Yields the (line number, row) tuples of a CSV file with a header
+    row, the rows being dictionaries of header: value.
+    """
+    reader = csv.reader(stream)
+    headers = None
+    for row in reader:
+        if headers is None:
+            headers = [header.decode('utf-8-sig').strip() for header in row]
+            continue
+        if not any(row):
+            continue
+        yield reader.line_num, dict(zip(headers, [value.decode('utf-8')
+                                                  for value in row]))
+
+
+def read_ndjson(stream):
+    """ Yields the (line number, row) tuples of a file with a JSON object
+    per line.
+    """
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError, ex:
+            row = ex
+        yield line_num, row
+
+
+# Import format: reader
+IMPORT_FORMATS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+def get_field_names(form, view):
+    """ Maps the column headers accepted for the fields of the form (the
+    field names, their labels and the exported headers) to the field names.
+    """
+    names = {}
+    for field in form:
+        if field.name == 'csrf_token':
+            continue
+        names[field.name] = field.name
+        names[unicode(field.label.text)] = field.name
+        names[view.field_name(field.name)] = field.name
+    return names
+
+
+def get_formdata(form, names, row):
+    """ Returns the form data of an imported row. Unknown columns and empty
+    values are left out, lists are passed as multiple values.
+    """
+    data = MultiDict()
+    for header, value in row.iteritems():
+        name = names.get(header)
+        if name is None:
+            continue
+        is_boolean = isinstance(form[name], fields.BooleanField)
+        for value in (value if isinstance(value, list) else [value]):
+            if value is None or value is False or value == u'':
+                continue
+            if is_boolean and unicode(value).lower() in FALSE_VALUES:
+                continue
+            if value is True:
+                value = u'y'
+            data.add(name, unicode(value))
+    return data
+
+
+class ImportReport(object):
+    """ CSV file listing the rows of an import that failed, with their line
+    number, the errors and the original values.
+
+    `directory`
+        Where the reports are kept, the temporary directory by default
+    """
+    def __init__(self, directory=None, report_id=None):
+        self.directory = directory or tempfile.gettempdir()
+        self.id = report_id or uuid.uuid4().hex
+        self.count = 0
+
+        self._file = None
+        self._writer = None
+        self._headers = None
+
+    @staticmethod
+    def get_path(report_id, directory=None):
+        if not report_id_re.match(report_id):
+            return None
+        return op.join(directory or tempfile.gettempdir(),
+                       'flask-superadmin-import-%s.csv' % report_id)
+
+    @property
+    def path(self):
+        return self.get_path(self.id, self.directory)
+
+    def add(self, line_num, row, errors):
+        """ Records a failed row. `errors` is a message or a dictionary of
+        field name: messages.
+        """
+        if isinstance(errors, dict):
+            errors = u'; '.join(u'%s: %s' % (name, u' '.join(messages))
+                                for name, messages in sorted(errors.items()))
+        if not isinstance(row, dict):
+            row = {}
+
+        if self._writer is None:
+            self._headers = sorted(row)
+            self._file = open(self.path, 'wb')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(['Line', 'Errors'] + [
+                csv_value(header) for header in self._headers])
+
+        self._writer.writerow([line_num, csv_value(errors)] + [
+            csv_value(row.get(header)) for header in self._headers])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
@@ -0,0 +1,268 @@
+import bisect
+import re
+import threading
+import time
+
+
+word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def parse_query(search_query):
+    """ Splits a search query into (operator, word) tuples, where the
+    operator is '^' (starts with), '=' (exact) or None (contains).
+    """
+    terms = []
+    for word in search_query.split():
+        op = word[:1]
+        if op in ('^', '='):
+            word = word[1:]
+        else:
+            op = None
+        if word:
+            terms.append((op, word))
+    return terms
+
+
+def tokenize(text):
+    return [token.lower() for token in word_re.findall(text)]
+
+
+class SearchEngine(object):
+    """ Applies the search query of the list view to the queryset of a
+    model admin (see `BaseModelAdmin.search_engine`).
+    """
+    def apply(self, view, qs, search_query):
+        raise NotImplemented()
+
+    def update(self, view, saved=(), deleted=()):
+        """ Called after objects were saved or deleted through the view.
+
+        `saved`
+            Saved instances
+        `deleted`
+            Primary keys of the deleted objects
+        """
+        pass
+
+    def invalidate(self, view):
+        """ Called after objects were saved without their primary keys
+        being known (e.g. by a bulk insert).
+        """
+        pass
+
+
+class LikeSearch(SearchEngine):
+    """ Matches every word with LIKE/regex lookups on the `search_fields`
+    (the backend's `apply_search`). Doesn't need any index, but scans the
+    whole table.
+    """
+    def apply(self, view, qs, search_query):
+        return view.apply_search(qs, search_query)
+
+
+class LocalIndexSearch(SearchEngine):
+    """ Searches an in-process inverted index of the words of the
+    `search_fields`, built on the first search and updated incrementally
+    when objects are saved or deleted through the view. The matching
+    primary keys are then selected with an IN lookup.
+
+    Words match the beginning of indexed words (plain and '^' terms) or
+    whole words ('=' terms), and all the words must match.
+
+    `max_age`
+        Seconds after which the index is rebuilt from the database, to pick
+        up changes made outside of the admin. None never rebuilds it.
+    `max_pks`
+        Largest number of matches selected with an IN lookup (databases
+        limit the number of bound parameters). Searches matching more rows
+        fall back to the LIKE lookups of `LikeSearch`.
+    `batch_size`
+        Number of rows loaded at a time while building the index
+    """
+    def __init__(self, max_age=None, max_pks=500, batch_size=500):
+        self.max_age = max_age
+        self.max_pks = max_pks
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._built = None
+        self._postings = {}
+        self._documents = {}
+        self._words = []
+
+    def get_text(self, view, instance):
+        values = []
+        for name in view.search_fields:
+            # Related fields are followed part by part
+            value = instance
+            for part in name.lstrip('^=').split('.'):
+                value = getattr(value, part, None)
+                if value is None:
+                    break
+            if value is not None:
+                values.append(unicode(value))
+        return u' '.join(values)
+
+    def _add(self, view, instance):
+        pk = view.get_pk(instance)
+        key = unicode(pk)
+        self._remove(key)
+
+        tokens = set(tokenize(self.get_text(view, instance)))
+        self._documents[key] = (pk, tokens)
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                bisect.insort(self._words, token)
+            postings.add(key)
+
+    def _remove(self, key):
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        for token in document[1]:
+            postings = self._postings[token]
+            postings.discard(key)
+            if not postings:
+                del self._postings[token]
+                del self._words[bisect.bisect_left(self._words, token)]
+
+    def build(self, view):
+        with self._lock:
+            self._postings = {}
+            self._documents = {}
+            self._words = []
+            # Loaded a batch at a time, in primary key order
+            after = None
+            while True:
+                pks = list(view.get_pk_batch(view.get_queryset(), after,
+                                             self.batch_size))
+                if not pks:
+                    break
+                for instance in view.get_objects(*pks):
+                    self._add(view, instance)
+                if len(pks) < self.batch_size:
+                    break
+                after = pks[-1]
+            self._built = time.time()
+
+    def _match(self, op, word):
+        word = word.lower()
+        if op == '=':
+            return set(self._postings.get(word, ()))
+
+        keys = set()
+        i = bisect.bisect_left(self._words, word)
+        while i < len(self._words) and self._words[i].startswith(word):
+            keys.update(self._postings[self._words[i]])
+            i += 1
+        return keys
+
+    def apply(self, view, qs, search_query):
+        if self._built is None or (self.max_age is not None and
+                                   time.time() - self._built > self.max_age):
+            self.build(view)
+
+        keys = None
+        with self._lock:
+            for op, word in parse_query(search_query):
+                for token in tokenize(word) or [word]:
+                    matches = self._match(op, token)
+                    keys = matches if keys is None else keys & matches
+            if keys is None:
+                return qs
+            if self.max_pks is not None and len(keys) > self.max_pks:
+                pks = None
+            else:
+                pks = [self._documents[key][0] for key in keys]
+        if pks is None:
+            return view.apply_search(qs, search_query)
+        return view.filter_pks(qs, pks)
+
+    def invalidate(self, view):
+        # Rebuilt on the next search
+        self._built = None
+
+    def update(self, view, saved=(), deleted=()):
+        if self._built is None:
+            return
+        with self._lock:
+            for pk in deleted:
+                self._remove(unicode(pk))
+            for instance in saved:
+                self._add(view, instance)
+
+
+# Lookup operators chosen by the search planner
+EXACT = 'exact'
+PREFIX = 'prefix'
+CONTAINS = 'contains'
+
+
+class FieldPlan(object):
+    """ How the 'planned' search engine matches one of the `search_fields`.
+
+    `index`
+        Description of the index whose leading column is the field, or None
+    `operator`
+        Operator used for plain words
+    """
+    def __init__(self, field, index, operator, reason):
+        self.field = field
+        self.index = index
+        self.operator = operator
+        self.reason = reason
+
+    def get_operator(self, op=None):
+        """ Returns the operator used for a word with the given prefix. """
+        if op == '=':
+            return EXACT
+        elif op == '^':
+            return PREFIX
+        return self.operator
+
+
+def plan_search(view):
+    """ Chooses the cheapest lookup for each of the view's `search_fields`:
+    prefix lookups (which can use a b-tree index) for indexed fields,
+    contains lookups for the `search_contains_fields` and exact lookups for
+    the other ones.
+    """
+    indexes = view.get_search_indexes()
+    plans = []
+    for field in view.search_fields:
+        field = str(field)
+        index = indexes.get(field)
+        if index is not None:
+            plans.append(FieldPlan(field, index, PREFIX,
+                                   'indexed, prefix lookups use the index'))
+        elif field in view.search_contains_fields:
+            plans.append(FieldPlan(field, None, CONTAINS,
+                                   'not indexed, contains lookups allowed'))
+        else:
+            plans.append(FieldPlan(field, None, EXACT,
+                                   'not indexed, contains lookups not allowed'))
+    return plans
+
+
+class PlannedSearch(SearchEngine):
+    """ Matches every word against the `search_fields` with the lookups
+    chosen by `plan_search` from the model's indexes. All the words must
+    match one of the fields. Prefix and exact lookups are case sensitive,
+    so that the database can use its indexes for them.
+    """
+    def __init__(self):
+        self._plan = None
+
+    def get_plan(self, view):
+        if self._plan is None:
+            self._plan = plan_search(view)
+        return self._plan
+
+    def apply(self, view, qs, search_query):
+        plan = self.get_plan(view)
+        terms = [[(field.field, field.get_operator(op), word)
+                  for field in plan]
+                 for op, word in parse_query(search_query)]
+        return view.apply_lookups(qs, terms)
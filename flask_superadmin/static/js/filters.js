@@ -86,6 +86,26 @@ var AdminFilters = function(element, filters_element, adminForm, operations, opt
     });
     $('.remove-filter', $root).click(removeFilter);
 
+    $('.filter-val[data-role]', $root).each(function() {
+        adminForm.applyStyle(this, $(this).attr('data-role'));
+    });
+
+    // Filters are passed in the URL, together with the search and the
+    // rest of the list state (see `list_params` in form.js)
+    $('button', $root).click(function(e) {
+        e.preventDefault();
+        var params = list_params(false);
+        var q = $('.search-input').val();
+        if (q)
+            params.unshift('q=' + encodeURIComponent(q));
+        $('.filter-val', $root).each(function() {
+            if ($(this).val())
+                params.push($(this).attr('name') + '=' + encodeURIComponent($(this).val()));
+        });
+        window.location.href = window.location.pathname +
+            (params.length ? '?' + params.join('&') : '');
+    });
+
     $('.filter-val', $root).each(function() {
         var count = getCount($(this).attr('name'));
         if (count > lastCount)
@@ -109,7 +129,17 @@ var AdminFilters = function(element, filters_element, adminForm, operations, opt
         opacity = (all_selected || checked.length === 0) ? 1 : 0.5;
         checker.attr('checked',checked.length > 0).css('opacity', opacity);
         actions.toggleClass('hidden', checked.length === 0);
+        $('.select-across').toggleClass('hide', !all_selected);
+        if (!all_selected) {
+            $(':input[name="_select_across"]').val('0');
+            $('.select-across').removeClass('selected');
+        }
         // $('.action_delete').stop().animate({'opacity':checked.length>0?1:0},200)
         if (_this.is(':checked')) _this.parent().parent().addClass('checked');
         else _this.parent().parent().removeClass('checked');
     }).click(function(e) {e.stopPropagation();});
+    $('[data-role="select-across"]').click(function(e) {
+        e.preventDefault();
+        $(':input[name="_select_across"]').val('1');
+        $('.select-across').addClass('selected');
+    });
@@ -13,6 +13,9 @@ var AdminForm = function() {
             case 'datetimepicker':
                 $(el).datepicker({displayTime: true});
                 break;
+            case 'ajax-select':
+                ajax_select(el);
+                break;
         }
     };
 };
@@ -55,10 +58,29 @@ $(document).on('click', 'legend > .delete',function() {
     $(this).parent().parent().remove();  
 });
 
+// Parameters of the list URL (sort, date hierarchy, ...) without the
+// search and the pagination, and without the filters unless `keep_filters`
+function list_params(keep_filters) {
+    return $.grep(window.location.search.substr(1).split('&'), function(param) {
+        var name = param.split('=')[0];
+        if (!param || $.inArray(name, ['q', 'page', 'after', 'before']) !== -1)
+            return false;
+        return keep_filters || name.indexOf('flt') !== 0;
+    });
+}
+
+// List URL searching `q`, keeping the active filters and the list state
+function search_url(q) {
+    var params = list_params(true);
+    if (q)
+        params.unshift('q=' + encodeURIComponent(q));
+    return window.location.pathname + (params.length ? '?' + params.join('&') : '');
+}
+
 $('.search-input').keydown(function(ev) {
     if (ev.keyCode === 13) {
         ev.preventDefault();
-        window.location.href = window.location.pathname + '?q=' + encodeURIComponent($(this).val());
+        window.location.href = search_url($(this).val());
     }
 });
 
@@ -73,15 +95,65 @@ $('.search-input').on('input', function() {
 $('.search .clear-btn').click(function() {
     $('.search .search-input').val('').focus();
     $(this).hide();
-    window.location.href = window.location.pathname;
+    window.location.href = search_url('');
 });
 
+// Relation pickers that search the related objects through the lookup
+// endpoint of the model admin; only the selected options are rendered
+function ajax_select(el) {
+    var select = $(el);
+    if (select.data('ajax-select')) return;
+    select.data('ajax-select', true);
+
+    var search = $('<input type="text" class="ajax-search">')
+        .attr('placeholder', select.data('placeholder'));
+    var more = $('<a href="#" class="ajax-more hide">&hellip;</a>');
+    select.before(search).after(more);
+
+    var term = '', page = 0, timer = null;
+
+    function load(append) {
+        $.getJSON(select.data('url'), {q: term, page: page}, function(data) {
+            if (!append) {
+                select.find('option').filter(function() {
+                    return !this.selected && this.value !== '__None';
+                }).remove();
+            }
+            $.each(data.results, function(i, item) {
+                var exists = select.find('option').filter(function() {
+                    return this.value === item.id;
+                }).length;
+                if (!exists) {
+                    select.append($('<option>').val(item.id).text(item.text));
+                }
+            });
+            more.toggleClass('hide', !data.more);
+        });
+    }
+
+    search.on('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(function() {
+            term = search.val();
+            page = 0;
+            load(false);
+        }, 250);
+    });
+
+    more.click(function(e) {
+        e.preventDefault();
+        page += 1;
+        load(true);
+    });
+}
+
 // Apply automatic styles
 function auto_apply(el) {
     el.find('[data-role=chosen]:visible').chosen();
     el.find('[data-role=chosenblank]:visible').chosen({allow_single_deselect: true});
     el.find('[data-role=datepicker]:visible').datepicker();
     el.find('[data-role=datetimepicker]:visible').datepicker({displayTime: true});
+    el.find('[data-role=ajax-select]:visible').each(function() { ajax_select(this); });
 }
 
 auto_apply($(document));
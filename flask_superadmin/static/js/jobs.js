@@ -0,0 +1,41 @@
+// Follows the progress of a background job, over server-sent events when
+// the browser supports them and by polling the JSON status otherwise.
+$('.job').each(function() {
+    var el = $(this);
+
+    function render(job) {
+        el.find('.job-state').text(job.state);
+        el.find('.job-message').text(job.message || '');
+        var progress = job.done;
+        if (job.total !== null) {
+            progress += ' / ' + job.total;
+        }
+        el.find('.job-progress').text(progress);
+
+        var width = 0;
+        if (job.total) {
+            width = Math.floor(100 * job.done / job.total);
+        } else if (job.state === 'done') {
+            width = 100;
+        }
+        el.find('.job-bar').css('width', width + '%');
+        return job.state === 'done' || job.state === 'failed';
+    }
+
+    if (window.EventSource) {
+        var source = new EventSource(el.data('events-url'));
+        source.onmessage = function(e) {
+            if (render(JSON.parse(e.data))) {
+                source.close();
+            }
+        };
+    } else {
+        (function poll() {
+            $.getJSON(el.data('status-url'), function(job) {
+                if (!render(job)) {
+                    setTimeout(poll, 1000);
+                }
+            });
+        })();
+    }
+});
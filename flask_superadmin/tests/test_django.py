@@ -1,3 +1,6 @@
+from cStringIO import StringIO
+from datetime import datetime
+
 from nose.tools import eq_, ok_, raises
 
 import wtforms
@@ -108,3 +111,245 @@ def test_list():
     eq_(resp.status_code, 302)
     eq_(Person.objects.count(), 0)
 
+
+def test_list_select_related():
+    class Owner(models.Model):
+        name = models.CharField(max_length=255)
+
+        def __unicode__(self):
+            return self.name
+
+    class Pet(models.Model):
+        name = models.CharField(max_length=255)
+        owner = models.ForeignKey(Owner)
+
+    try:
+        install_models(Owner, Pet)
+    except DatabaseError, e:
+        if 'already exists' not in e.message:
+            raise
+
+    Pet.objects.all().delete()
+    Owner.objects.all().delete()
+    Pet.objects.create(name='Rex', owner=Owner.objects.create(name='Stan'))
+
+    view = CustomModelView(Pet, list_display=('name', 'owner.name'))
+    admin.add_view(view)
+
+    qs = view.apply_eager_loading(Pet.objects.all())
+    eq_(qs.query.select_related, {'owner': {}})
+
+    view.list_select_related = {'owner': None}
+    qs = view.apply_eager_loading(Pet.objects.all())
+    eq_(qs.query.select_related, False)
+
+    client = app.test_client()
+    resp = client.get('/admin/pet/')
+    eq_(resp.status_code, 200)
+    ok_('Stan' in resp.data)
+
+
+def test_search_planner():
+    class Book(models.Model):
+        title = models.CharField(max_length=255, db_index=True)
+        isbn = models.CharField(max_length=20, unique=True)
+        publisher = models.CharField(max_length=255)
+
+        class Meta:
+            unique_together = (('publisher', 'title'),)
+
+    try:
+        install_models(Book)
+    except DatabaseError, e:
+        if 'already exists' not in e.message:
+            raise
+
+    Book.objects.all().delete()
+    Book.objects.create(title='Dune', isbn='0441013597', publisher='Ace')
+    Book.objects.create(title='Dubliners', isbn='0140186476',
+                        publisher='Penguin')
+
+    view = CustomModelView(Book, search_engine='planned',
+                           search_fields=('title', 'isbn', 'publisher'))
+    admin.add_view(view)
+
+    indexes = view.get_search_indexes()
+    eq_(indexes['id'], 'primary key')
+    eq_(indexes['title'], 'index')
+    eq_(indexes['isbn'], 'unique')
+    eq_(indexes['publisher'], 'unique together')
+
+    def search(query):
+        return sorted(b.title for b in view.get_filtered_queryset(query))
+
+    eq_(search('Du'), ['Dubliners', 'Dune'])
+    eq_(search('Du Pen'), ['Dubliners'])
+    eq_(search('=Du'), [])
+    eq_(search('0441'), ['Dune'])
+
+
+def test_list_filters():
+    class Movie(models.Model):
+        title = models.CharField(max_length=255)
+        year = models.IntegerField()
+        seen = models.BooleanField()
+
+        def __unicode__(self):
+            return self.title
+
+    try:
+        install_models(Movie)
+    except DatabaseError, e:
+        if 'already exists' not in e.message:
+            raise
+
+    Movie.objects.all().delete()
+    Movie.objects.create(title='Alien', year=1979, seen=True)
+    Movie.objects.create(title='Aliens', year=1986, seen=False)
+    Movie.objects.create(title='Heat', year=1995, seen=True)
+
+    view = CustomModelView(Movie, list_filters=('title', 'year', 'seen'))
+    admin.add_view(view)
+
+    eq_(len(view.get_filters()), 10)
+
+    def titles(filters):
+        return sorted(m.title for m in view.get_filtered_queryset(None,
+                                                                   filters))
+
+    eq_(titles([(2, 'alien')]), ['Alien', 'Aliens'])
+    eq_(titles([(2, 'alien'), (9, '0')]), ['Alien'])
+    eq_(titles([(6, '1980')]), ['Aliens', 'Heat'])
+
+    client = app.test_client()
+    resp = client.get('/admin/movie/?flt0_3=alien')
+    ok_('Heat' in resp.data)
+    ok_('Aliens' not in resp.data)
+
+    view.list_facets = ('seen', 'year')
+    eq_(view.count_facets(Movie.objects.all(), view.list_facets),
+        {'seen': {True: 2, False: 1},
+         'year': {1979: 1, 1986: 1, 1995: 1}})
+
+
+def test_date_hierarchy():
+    class Visit(models.Model):
+        page = models.CharField(max_length=255)
+        visited_at = models.DateTimeField(db_index=True)
+
+    try:
+        install_models(Visit)
+    except DatabaseError, e:
+        if 'already exists' not in e.message:
+            raise
+
+    Visit.objects.all().delete()
+    for page, visited_at in (('home', datetime(2012, 3, 1, 10)),
+                             ('about', datetime(2012, 3, 15, 12)),
+                             ('home', datetime(2013, 1, 2, 9))):
+        Visit.objects.create(page=page, visited_at=visited_at)
+
+    view = CustomModelView(Visit, date_hierarchy='visited_at')
+    admin.add_view(view)
+
+    qs = Visit.objects.all()
+    eq_(view.count_date_buckets(qs, 'year'), [((2012,), 2), ((2013,), 1)])
+    eq_(view.count_date_buckets(qs, 'day'),
+        [((2012, 3, 1), 1), ((2012, 3, 15), 1), ((2013, 1, 2), 1)])
+    eq_(view.get_filtered_queryset(date_bucket='2012-03').count(), 2)
+
+
+def test_import():
+    class Novel(models.Model):
+        title = models.CharField(max_length=255)
+        pages = models.IntegerField()
+
+        def __unicode__(self):
+            return self.title
+
+    try:
+        install_models(Novel)
+    except DatabaseError, e:
+        if 'already exists' not in e.message:
+            raise
+
+    Novel.objects.all().delete()
+
+    view = CustomModelView(Novel, import_batch_size=2)
+    admin.add_view(view)
+
+    client = app.test_client()
+    data = 'title,pages\r\nDune,412\r\nEmma,many\r\nIvanhoe,\r\nUlysses,730\r\n'
+    resp = client.post('/admin/novel/import/',
+                       data={'file': (StringIO(data), 'books.csv')})
+    ok_('Imported 2 rows.' in resp.data)
+    ok_('2 rows failed.' in resp.data)
+    eq_(sorted(Novel.objects.values_list('title', 'pages')),
+        [(u'Dune', 412), (u'Ulysses', 730)])
+
+
+def test_bulk_edit():
+    class Ticket(models.Model):
+        title = models.CharField(max_length=255)
+        status = models.CharField(max_length=20)
+
+        def __unicode__(self):
+            return self.title
+
+    try:
+        install_models(Ticket)
+    except DatabaseError, e:
+        if 'already exists' not in e.message:
+            raise
+
+    Ticket.objects.all().delete()
+    for title in ['Crash', 'Typo', 'Slow']:
+        Ticket.objects.create(title=title, status='open')
+
+    view = CustomModelView(Ticket, search_fields=('title',),
+                           bulk_edit_fields=('status',))
+    admin.add_view(view)
+    eq_(view.can_bulk_update(['status']), True)
+
+    client = app.test_client()
+    resp = client.post('/admin/ticket/?q=s', data={'action': 'edit',
+                                                   '_select_across': '1',
+                                                   '_bulk_field': 'status',
+                                                   'status': 'closed',
+                                                   'confirm_edit': '1'})
+    eq_(resp.status_code, 302)
+    eq_(sorted(Ticket.objects.values_list('title', 'status')),
+        [(u'Crash', u'closed'), (u'Slow', u'closed'), (u'Typo', u'open')])
+
+
+def test_list_editable():
+    class Plant(models.Model):
+        name = models.CharField(max_length=255)
+        height = models.IntegerField()
+
+        def __unicode__(self):
+            return self.name
+
+    try:
+        install_models(Plant)
+    except DatabaseError, e:
+        if 'already exists' not in e.message:
+            raise
+
+    Plant.objects.all().delete()
+    fern = Plant.objects.create(name='Fern', height=30)
+    palm = Plant.objects.create(name='Palm', height=200)
+
+    view = CustomModelView(Plant, list_display=('name', 'height'),
+                           list_editable=('height',))
+    admin.add_view(view)
+
+    client = app.test_client()
+    ok_('name="row-%s-height"' % fern.pk in client.get('/admin/plant/').data)
+
+    resp = client.post('/admin/plant/', data={
+        '_list_pk': [str(fern.pk), str(palm.pk)], '_save_list': '1',
+        'row-%s-height' % fern.pk: '35', 'row-%s-height' % palm.pk: '200'})
+    eq_(resp.status_code, 302)
+    eq_(sorted(Plant.objects.values_list('name', 'height')),
+        [(u'Fern', 35), (u'Palm', 200)])
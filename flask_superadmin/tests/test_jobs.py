@@ -0,0 +1,113 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+
+from nose.tools import eq_, ok_
+
+from flask import Flask
+
+from flask_superadmin import Admin
+from flask_superadmin.jobs import JobRunner, JobStore, JobsView
+
+
+def count_to(job, total):
+    for i in range(total):
+        job.progress(i + 1, total)
+    return 'Counted to %s' % total
+
+
+def fail(job):
+    raise ValueError('Broken')
+
+
+def test_runner():
+    runner = JobRunner(JobStore(':memory:'))
+
+    ok_id = runner.submit('Count', count_to, 3)
+    failed_id = runner.submit('Fail', fail)
+    runner.join()
+
+    job = runner.store.get(ok_id)
+    eq_(job['state'], 'done')
+    eq_(job['done'], 3)
+    eq_(job['total'], 3)
+    eq_(job['message'], 'Counted to 3')
+
+    job = runner.store.get(failed_id)
+    eq_(job['state'], 'failed')
+    eq_(job['message'], 'Broken')
+
+    eq_([j['name'] for j in runner.store.list()], ['Fail', 'Count'])
+    eq_(runner.store.get('missing'), None)
+
+
+def test_jobs_view():
+    app = Flask(__name__)
+    admin = Admin(app)
+    runner = JobRunner(JobStore(':memory:'))
+    admin.add_view(JobsView(runner))
+
+    with app.test_request_context():
+        job_id = runner.submit('Count', count_to, 2)
+        eq_(runner.get_url(job_id), '/admin/jobs/%s/' % job_id)
+    runner.join()
+
+    client = app.test_client()
+    resp = client.get('/admin/jobs/')
+    eq_(resp.status_code, 200)
+    ok_('Count' in resp.data)
+
+    resp = client.get('/admin/jobs/%s/' % job_id)
+    eq_(resp.status_code, 200)
+
+    resp = client.get('/admin/jobs/%s/status/' % job_id)
+    eq_(json.loads(resp.data)['state'], 'done')
+
+    resp = client.get('/admin/jobs/%s/events/' % job_id)
+    eq_(resp.mimetype, 'text/event-stream')
+    event = json.loads(resp.data[len('data: '):])
+    eq_(event['done'], 2)
+
+    eq_(client.get('/admin/jobs/missing/').status_code, 404)
+    eq_(client.get('/admin/jobs/missing/events/').status_code, 404)
+
+
+def test_interrupted_jobs():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        store = JobStore(path)
+        queued_id = store.create('Queued')
+        running_id = store.create('Running')
+        store.update(running_id, state='running')
+        done_id = store.create('Done')
+        store.update(done_id, state='done')
+        remote_id = store.create('Remote')
+
+        # A process that has exited and one of another host
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        host = socket.gethostname()
+        for job_id in (queued_id, running_id, done_id):
+            store._conn.execute('UPDATE jobs SET owner = ? WHERE id = ?',
+                                ('%s:%s' % (host, process.pid), job_id))
+        store._conn.execute('UPDATE jobs SET owner = ? WHERE id = ?',
+                            ('elsewhere:1', remote_id))
+        store._conn.commit()
+
+        # Another process of the application opening the store doesn't fail
+        # the running jobs of this one
+        live_id = store.create('Live')
+        store.update(live_id, state='running')
+
+        store = JobStore(path)
+        eq_(store.get(queued_id)['state'], 'failed')
+        eq_(store.get(running_id)['state'], 'failed')
+        eq_(store.get(done_id)['state'], 'done')
+        eq_(store.get(remote_id)['state'], 'queued')
+        eq_(store.get(live_id)['state'], 'running')
+    finally:
+        os.remove(path)
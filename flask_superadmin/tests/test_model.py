@@ -6,6 +6,7 @@ from flask import Flask
 
 from flask_superadmin import Admin
 from flask_superadmin.model import base
+from flask_superadmin.model.cache import ChoicesCache
 
 from flask.ext import wtf
 
@@ -295,3 +296,104 @@ def test_search_fields():
     rv = client.get('/admin/model/')
     ok_('<div class="search">' in rv.data)
 
+
+def test_form_cache():
+    app, admin = setup()
+
+    view = MockModelView(Model)
+    admin.add_view(view)
+
+    calls = []
+
+    def counting_model_form(*args, **kwargs):
+        calls.append(kwargs)
+        return Form
+    view.get_model_form = lambda: counting_model_form
+
+    client = app.test_client()
+
+    client.get('/admin/model/add/')
+    client.get('/admin/model/1/')
+    client.post('/admin/model/1/', data=dict(col1='a', col2='b', col3='c'))
+    eq_(len(calls), 1)
+
+    # Replacing one of the form inputs builds a new form class
+    view.fields = ('col1', 'col2')
+    client.get('/admin/model/1/')
+    eq_(len(calls), 2)
+    eq_(calls[-1]['fields'], ('col1', 'col2'))
+
+    view.invalidate_form_cache()
+    client.get('/admin/model/1/')
+    eq_(len(calls), 3)
+
+    view.cache_form = False
+    client.get('/admin/model/1/')
+    client.get('/admin/model/1/')
+    eq_(len(calls), 5)
+
+
+def test_list_columns_evaluated_once():
+    app, admin = setup()
+
+    calls = []
+
+    def doubled(instance):
+        calls.append(instance.id)
+        return instance.col1 * 2
+
+    view = MockModelView(Model, list_display=('col1', 'doubled'),
+                         doubled=doubled)
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model/')
+    eq_(rv.status_code, 200)
+    ok_('<td>2</td>' in rv.data)
+    eq_(sorted(calls), [1, 2])
+
+    with app.test_request_context():
+        eq_(view.get_column(Model(c1=5), 'doubled'), 10)
+        ok_(view.get_column_accessor('doubled') is
+            view.get_column_accessor('doubled'))
+
+
+def test_choices_cache():
+    class Base(object):
+        pass
+
+    class Child(Base):
+        pass
+
+    class Other(object):
+        pass
+
+    loads = []
+
+    def load(value):
+        def loader():
+            loads.append(value)
+            return value
+        return loader
+
+    cache = ChoicesCache(timeout=60, max_size=2)
+    eq_(cache.get(Base, 'all', load(1)), 1)
+    eq_(cache.get(Base, 'all', load(2)), 1)
+    eq_(loads, [1])
+
+    # The least recently used entry is dropped
+    cache.get(Other, 'all', load(3))
+    cache.get(Base, 'all', load(4))
+    cache.get(Child, 'all', load(5))
+    eq_(cache.get(Base, 'all', load(6)), 1)
+    eq_(cache.get(Other, 'all', load(7)), 7)
+
+    # Related classes are invalidated together
+    cache.invalidate(Child)
+    eq_(cache.get(Base, 'all', load(8)), 8)
+    eq_(cache.get(Other, 'all', load(9)), 7)
+
+    cache = ChoicesCache(timeout=0)
+    cache.get(Base, 'all', load(10))
+    eq_(cache.get(Base, 'all', load(11)), 11)
@@ -1,11 +1,19 @@
+import json
+
+from cStringIO import StringIO
+
 from nose.tools import eq_, ok_, raises
 
 import wtforms
 
+from bson.dbref import DBRef
+from bson.objectid import ObjectId
 from flask import Flask
 from mongoengine import *
+from mongoengine.connection import get_db
 
 from flask_superadmin import Admin
+from flask_superadmin.model.backends.mongoengine.orm import data_to_document
 from flask_superadmin.model.backends.mongoengine.view import ModelAdmin
 
 
@@ -237,6 +245,50 @@ def test_pagination():
     ok_('Steve' in resp.data)
     ok_('Ron' in resp.data)
 
+def test_keyset_pagination():
+    app, admin = setup()
+
+    class Person(Document):
+        name = StringField()
+        age = IntField()
+
+    Person.drop_collection()
+    john = Person.objects.create(name='John', age=18)
+    michael = Person.objects.create(name='Michael', age=21)
+    steve = Person.objects.create(name='Steve', age=15)
+    Person.objects.create(name='Ron', age=59)
+
+    view = CustomModelView(Person, list_per_page=2, pagination='keyset',
+                           list_display=['name', 'age'])
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    resp = client.get('/admin/person/?sort=age')
+    ok_('Steve' in resp.data)
+    ok_('John' in resp.data)
+    ok_('Michael' not in resp.data)
+    ok_('after=%s' % john.pk in resp.data)
+    ok_('before=' not in resp.data)
+
+    resp = client.get('/admin/person/?sort=age&after=%s' % john.pk)
+    ok_('Michael' in resp.data)
+    ok_('Ron' in resp.data)
+    ok_('John' not in resp.data)
+    ok_('before=%s' % michael.pk in resp.data)
+    ok_('after=' not in resp.data)
+
+    resp = client.get('/admin/person/?sort=age&before=%s' % michael.pk)
+    ok_('Steve' in resp.data)
+    ok_('John' in resp.data)
+    ok_('Michael' not in resp.data)
+
+    resp = client.get('/admin/person/?sort=-age&after=%s' % michael.pk)
+    ok_('John' in resp.data)
+    ok_('Steve' in resp.data)
+    ok_('Ron' not in resp.data)
+    ok_('after=%s' % steve.pk not in resp.data)
+
 def test_sort():
     app, admin = setup()
 
@@ -362,3 +414,130 @@ def test_requred_int_field():
     ok_('This field is required.' not in resp.data)
     ok_('error.' not in resp.data)
 
+
+def test_ajax_refs():
+    app, admin = setup()
+
+    class Owner(Document):
+        name = StringField()
+
+        def __unicode__(self):
+            return self.name
+
+    class Pet(Document):
+        name = StringField()
+        owner = ReferenceField(Owner)
+
+    Owner.drop_collection()
+    Pet.drop_collection()
+
+    owners = [Owner(name='owner%s' % i).save() for i in range(3)]
+
+    view = CustomModelView(Pet, ajax_refs={'owner': {'fields': ('name',),
+                                                     'page_size': 2}})
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    resp = client.get('/admin/pet/add/')
+    eq_(resp.status_code, 200)
+    ok_('data-role="ajax-select"' in resp.data)
+    ok_('owner1' not in resp.data)
+
+    resp = client.get('/admin/pet/_lookup/?name=owner&q=owner')
+    data = json.loads(resp.data)
+    eq_(len(data['results']), 2)
+    ok_(data['more'])
+
+    resp = client.post('/admin/pet/add/',
+                       data={'name': 'rex', 'owner': str(owners[2].pk)})
+    eq_(resp.status_code, 302)
+    eq_(Pet.objects.get().owner.name, 'owner2')
+
+
+def test_dirty_fields():
+    class Address(EmbeddedDocument):
+        street = StringField()
+        city = StringField()
+
+    class Owner(Document):
+        name = StringField()
+
+    class Customer(Document):
+        name = StringField()
+        tags = ListField(StringField())
+        address = EmbeddedDocumentField(Address)
+        owner = ReferenceField(Owner)
+        friends = ListField(ReferenceField(Owner))
+        notes = StringField()
+
+    owner = Owner(id=ObjectId(), name='Stan')
+    customer = Customer._from_son({
+        '_id': ObjectId(), 'name': 'Ann', 'tags': ['a', 'b'],
+        'address': {'street': 'Main St', 'city': 'Paris'},
+        'owner': DBRef('owner', owner.id),
+        'friends': [DBRef('owner', owner.id)], 'notes': 'vip'})
+
+    # Unchanged values aren't assigned, embedded documents are updated
+    # field by field and references are compared without dereferencing them
+    data_to_document(customer, {
+        'name': 'Ann', 'tags': ['a', 'b'],
+        'address': {'street': 'Main St', 'city': 'Lyon'},
+        'owner': owner, 'friends': [str(owner.id)], 'notes': None})
+    updates, removals = customer._delta()
+    eq_(updates, {'address.city': 'Lyon'})
+    eq_(removals, {'notes': 1})
+
+
+def test_gridfs_file():
+    app, admin = setup()
+
+    class Attachment(Document):
+        name = StringField()
+        data = FileField()
+
+    Attachment.drop_collection()
+    get_db()['fs.files'].drop()
+    get_db()['fs.chunks'].drop()
+
+    view = CustomModelView(Attachment, gridfs_chunk_size=4)
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    # The upload is written in chunks of the configured size
+    resp = client.post('/admin/attachment/add/',
+                       data=dict(name='a', data=(StringIO('abcdefghij'),
+                                                 'notes.txt')))
+    eq_(resp.status_code, 302)
+
+    attachment = Attachment.objects.first()
+    eq_(attachment.data.read(), 'abcdefghij')
+    eq_(attachment.data.filename, 'notes.txt')
+    eq_(get_db()['fs.chunks'].find(
+        {'files_id': attachment.data.grid_id}).count(), 3)
+
+    url = '/admin/attachment/%s/file/data/' % attachment.pk
+    resp = client.get('/admin/attachment/%s/' % attachment.pk)
+    ok_(url in resp.data)
+
+    resp = client.get(url)
+    eq_(resp.status_code, 200)
+    eq_(resp.data, 'abcdefghij')
+    eq_(resp.headers['Accept-Ranges'], 'bytes')
+    etag = resp.headers['ETag']
+
+    resp = client.get(url, headers={'Range': 'bytes=2-5'})
+    eq_(resp.status_code, 206)
+    eq_(resp.data, 'cdef')
+    eq_(resp.headers['Content-Range'], 'bytes 2-5/10')
+
+    resp = client.get(url, headers={'Range': 'bytes=20-30'})
+    eq_(resp.status_code, 416)
+
+    resp = client.get(url, headers={'If-None-Match': etag})
+    eq_(resp.status_code, 304)
+
+    # Only file fields are served
+    resp = client.get('/admin/attachment/%s/file/name/' % attachment.pk)
+    eq_(resp.status_code, 404)
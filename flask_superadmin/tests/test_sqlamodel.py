@@ -1,3 +1,10 @@
+import json
+import re
+import zlib
+
+from cStringIO import StringIO
+from datetime import datetime
+
 from nose.tools import eq_, ok_, raises
 
 import wtforms
@@ -5,8 +12,14 @@ import wtforms
 from flask import Flask
 
 from flask.ext.sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
 from flask_superadmin import Admin
+from flask_superadmin.jobs import JobRunner, JobStore
+from flask_superadmin.model.cache import ChoicesCache
+from flask_superadmin.model.export import EXPORT_FORMATS
+from flask_superadmin.model.search import LocalIndexSearch
 from flask_superadmin.model.backends.sqlalchemy.view import ModelAdmin
 
 
@@ -81,6 +94,9 @@ def test_model():
         ok_(isinstance(Form()._fields['test3'], wtforms.TextAreaField))
         ok_(isinstance(Form()._fields['test4'], wtforms.TextAreaField))
 
+        # The form class is generated once and reused
+        ok_(view.get_form() is Form)
+
     # Make some test clients
     client = app.test_client()
 
@@ -344,3 +360,1333 @@ def test_reference_linking():
     ok_('<input class="" id="name" name="name" type="text" value="Stan">' in resp.data)
     ok_(dog_link in resp.data)
 
+
+def test_keyset_pagination():
+    app, db, admin = setup()
+
+    Model1, Model2 = create_models(db)
+
+    view = CustomModelView(Model1, db.session, list_per_page=2,
+                           pagination='keyset', list_display=('test1',))
+    admin.add_view(view)
+
+    for name in ('d', 'b', 'e', 'a', 'c'):
+        db.session.add(Model1(name))
+    db.session.commit()
+
+    def pk(name):
+        return db.session.query(Model1).filter_by(test1=name).one().id
+
+    client = app.test_client()
+
+    resp = client.get('/admin/model1/?sort=test1')
+    ok_('>a<' in resp.data)
+    ok_('>b<' in resp.data)
+    ok_('>c<' not in resp.data)
+    ok_('/admin/model1/?sort=test1&amp;after=%s' % pk('b') in resp.data)
+    ok_('before=' not in resp.data)
+
+    resp = client.get('/admin/model1/?sort=test1&after=%s' % pk('b'))
+    ok_('>b<' not in resp.data)
+    ok_('>c<' in resp.data)
+    ok_('>d<' in resp.data)
+    ok_('/admin/model1/?sort=test1&amp;after=%s' % pk('d') in resp.data)
+    ok_('/admin/model1/?sort=test1&amp;before=%s' % pk('c') in resp.data)
+
+    resp = client.get('/admin/model1/?sort=test1&after=%s' % pk('d'))
+    ok_('>e<' in resp.data)
+    ok_('after=' not in resp.data)
+
+    resp = client.get('/admin/model1/?sort=test1&before=%s' % pk('c'))
+    ok_('>a<' in resp.data)
+    ok_('>b<' in resp.data)
+    ok_('>c<' not in resp.data)
+    ok_('before=' not in resp.data)
+
+    resp = client.get('/admin/model1/?sort=-test1&after=%s' % pk('d'))
+    ok_('>c<' in resp.data)
+    ok_('>b<' in resp.data)
+    ok_('>d<' not in resp.data)
+    ok_('>a<' not in resp.data)
+
+    # Malformed cursors show the first page
+    resp = client.get('/admin/model1/?sort=test1&after=spam')
+    eq_(resp.status_code, 200)
+    ok_('>a<' in resp.data)
+    ok_('>c<' not in resp.data)
+
+    # Sorts by anything but a column are ignored
+    for sort in ('query', 'metadata', 'spam'):
+        resp = client.get('/admin/model1/?sort=%s&after=%s' % (sort, pk('b')))
+        eq_(resp.status_code, 200)
+
+
+def test_get_list_override():
+    app, db, admin = setup()
+
+    Model1, Model2 = create_models(db)
+
+    class OldModelView(CustomModelView):
+        # Written for the original signature
+        def get_list(self, page=0, sort=None, sort_desc=None, execute=False,
+                     search_query=None):
+            return super(OldModelView, self).get_list(page, sort, sort_desc,
+                                                      execute, search_query)
+
+    view = OldModelView(Model1, db.session, list_display=('test1',))
+    admin.add_view(view)
+
+    db.session.add(Model1('spam'))
+    db.session.commit()
+
+    client = app.test_client()
+    resp = client.get('/admin/model1/?sort=test1&q=spam')
+    eq_(resp.status_code, 200)
+    ok_('>spam<' in resp.data)
+
+
+def test_count_strategy():
+    app, db, admin = setup()
+
+    Model1, Model2 = create_models(db)
+
+    view = CustomModelView(Model1, db.session, list_per_page=2,
+                           list_display=('test1',))
+    admin.add_view(view)
+
+    for name in ('a', 'b', 'c', 'd', 'e'):
+        db.session.add(Model1(name))
+    db.session.commit()
+
+    client = app.test_client()
+
+    # No count: the pager only links to the neighbouring pages
+    view.count_strategy = None
+    resp = client.get('/admin/model1/?sort=test1')
+    ok_('Total count' not in resp.data)
+    ok_('>a<' in resp.data and '>b<' in resp.data)
+    ok_('>c<' not in resp.data)
+    ok_('/admin/model1/?sort=test1&amp;page=1' in resp.data)
+
+    resp = client.get('/admin/model1/?sort=test1&page=2')
+    ok_('>e<' in resp.data)
+    ok_('page=3' not in resp.data)
+    ok_('/admin/model1/?sort=test1&amp;page=1' in resp.data)
+
+    # Cached counts are reused until they expire
+    view.count_strategy = 'cached'
+    view.count_cache_timeout = 0
+    resp = client.get('/admin/model1/')
+    ok_('Total count: 5' in resp.data)
+
+    db.session.add(Model1('f'))
+    db.session.commit()
+    resp = client.get('/admin/model1/')
+    ok_('Total count: 6' in resp.data)
+
+    view.count_cache_timeout = 60
+    resp = client.get('/admin/model1/')
+    ok_('Total count: 6' in resp.data)
+
+    db.session.add(Model1('g'))
+    db.session.commit()
+    resp = client.get('/admin/model1/')
+    ok_('Total count: 6' in resp.data)
+
+    # SQLite has no statistics, so the estimate falls back to an exact count
+    view.count_strategy = 'estimated'
+    resp = client.get('/admin/model1/')
+    ok_('Total count: 7' in resp.data)
+
+
+def test_list_eager_loading():
+    app, db, admin = setup()
+
+    class Owner(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+        owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+        owner = db.relationship(Owner, backref='pets')
+
+    db.create_all()
+
+    for i in range(10):
+        owner = Owner(name='owner%s' % i)
+        db.session.add(Pet(name='pet%s' % i, owner=owner))
+    db.session.commit()
+
+    view = CustomModelView(Pet, db.session,
+                           list_display=('name', 'owner.name'))
+    admin.add_view(view)
+
+    queries = []
+
+    def count_queries(conn, cursor, statement, *args):
+        queries.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count_queries)
+
+    client = app.test_client()
+
+    # One query for the count and one for the page with the owners joined
+    resp = client.get('/admin/pet/')
+    ok_('owner9' in resp.data)
+    eq_(len(queries), 2)
+
+    del queries[:]
+    view.list_select_related = {'owner': None}
+    resp = client.get('/admin/pet/')
+    ok_('owner9' in resp.data)
+    eq_(len(queries), 12)
+
+    # Collections are loaded with a separate query
+    owner_view = CustomModelView(Owner, db.session,
+                                 list_display=('name', 'pets'))
+    admin.add_view(owner_view)
+
+    del queries[:]
+    resp = client.get('/admin/owner/')
+    ok_('owner9' in resp.data)
+    eq_(len(queries), 3)
+
+
+def test_list_projection():
+    app, db, admin = setup()
+
+    Model1, Model2 = create_models(db)
+
+    db.session.add(Model1('first', 'second', 'third', 'fourth'))
+    db.session.commit()
+
+    view = CustomModelView(Model1, db.session, list_display=('test1', 'test2'))
+    admin.add_view(view)
+
+    queries = []
+
+    def log_queries(conn, cursor, statement, *args):
+        queries.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', log_queries)
+
+    client = app.test_client()
+
+    resp = client.get('/admin/model1/')
+    ok_('second' in resp.data)
+    page_query = queries[-1]
+    ok_('model1.test2' in page_query)
+    ok_('model1.test3' not in page_query)
+    ok_('model1.test4' not in page_query)
+
+    # Explicitly chosen fields
+    db.session.remove()
+    view.list_load_fields = ('test1', 'test2', 'test3')
+    client.get('/admin/model1/')
+    ok_('model1.test3' in queries[-1])
+    ok_('model1.test4' not in queries[-1])
+
+    # Columns rendered by admin's methods need the whole object
+    db.session.remove()
+    view.list_load_fields = None
+    view.list_display = ('test1', 'summary')
+    view.summary = lambda instance: instance.test4
+    resp = client.get('/admin/model1/')
+    ok_('fourth' in resp.data)
+    ok_('model1.test4' in queries[-1])
+
+
+def test_reference_registry():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///'
+
+    db = SQLAlchemy(app)
+    admin = Admin(app, url='/manage')
+
+    class Animal(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        kind = db.Column(db.String(20))
+        name = db.Column(db.String(20))
+        __mapper_args__ = {'polymorphic_on': kind,
+                           'polymorphic_identity': 'animal'}
+
+    class Cat(Animal):
+        __mapper_args__ = {'polymorphic_identity': 'cat'}
+
+    class Owner(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+    db.create_all()
+
+    class AnimalAdmin(ModelAdmin):
+        session = db.session
+
+    admin.register(Animal, AnimalAdmin)
+
+    cat = Cat(name='Tom')
+    db.session.add(cat)
+    db.session.commit()
+
+    animal_view = admin.get_model_view(Animal)
+    ok_(admin.get_model_view(Cat) is animal_view)
+    ok_(admin.get_model_view(Owner) is None)
+
+    with app.test_request_context():
+        eq_(animal_view.get_reference(cat), '/manage/animal/%s/' % cat.id)
+        eq_(animal_view.get_reference(u'Tom'), None)
+
+    # Registering a subclass takes precedence over its parent's view
+    class CatAdmin(ModelAdmin):
+        session = db.session
+
+    admin.register(Cat, CatAdmin, endpoint='cat')
+    with app.test_request_context():
+        eq_(animal_view.get_reference(cat), '/manage/cat/%s/' % cat.id)
+
+
+def test_bulk_delete():
+    app, db, admin = setup()
+
+    class Owner(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+        owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+        owner = db.relationship(Owner, backref='pets')
+
+    db.create_all()
+
+    for i in range(5):
+        owner = Owner(name='owner%s' % i)
+        db.session.add(Pet(name='pet%s' % i, owner=owner))
+    db.session.commit()
+
+    pet_view = CustomModelView(Pet, db.session, delete_batch_size=2)
+    owner_view = CustomModelView(Owner, db.session, delete_batch_size=2)
+    admin.add_view(pet_view)
+    admin.add_view(owner_view)
+
+    ok_(pet_view.can_bulk_delete())
+    # The ORM has to clear the pets' foreign keys
+    ok_(not owner_view.can_bulk_delete())
+
+    deletes = []
+
+    def count_deletes(conn, cursor, statement, *args):
+        if statement.startswith('DELETE'):
+            deletes.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count_deletes)
+
+    pks = [str(pet.id) for pet in Pet.query.limit(3)] + ['1000']
+    eq_(pet_view.delete_models(*pks), 3)
+    eq_(Pet.query.count(), 2)
+    # One statement per batch
+    eq_(len(deletes), 2)
+
+    eq_(owner_view.delete_models('1', '2'), 2)
+    eq_(Owner.query.count(), 3)
+    eq_(Pet.query.filter(Pet.owner_id.in_([1, 2])).count(), 0)
+
+    client = app.test_client()
+    resp = client.post('/admin/owner/3/delete/',
+                       data={'confirm_delete': True})
+    eq_(resp.status_code, 302)
+    eq_(Owner.query.count(), 2)
+
+
+def test_delete_matching():
+    app, db, admin = setup()
+
+    Model1, _ = create_models(db)
+    for i in range(7):
+        db.session.add(Model1('spam%s' % i))
+    db.session.add(Model1('eggs'))
+    db.session.commit()
+
+    view = CustomModelView(Model1, db.session, search_fields=('test1',),
+                           delete_batch_size=2, action_sample_size=3)
+    admin.add_view(view)
+
+    eq_([len(pks) for pks in view.iter_pk_batches('spam')], [2, 2, 2, 1])
+
+    client = app.test_client()
+    resp = client.post('/admin/model1/?q=spam',
+                       data={'action': 'delete', '_select_across': '1'})
+    eq_(resp.status_code, 200)
+    ok_('all 7 matching models' in resp.data)
+    ok_('and 4 more' in resp.data)
+    eq_(Model1.query.count(), 8)
+
+    resp = client.post('/admin/model1/?q=spam',
+                       data={'action': 'delete', '_select_across': '1',
+                             'confirm_delete': True})
+    eq_(resp.status_code, 302)
+    eq_([m.test1 for m in Model1.query], ['eggs'])
+
+    # Deletes run in the background when the view has a job runner
+    view.jobs = JobRunner(JobStore(':memory:'))
+    resp = client.post('/admin/model1/?q=eggs',
+                       data={'action': 'delete', '_select_across': '1',
+                             'confirm_delete': True})
+    eq_(resp.status_code, 302)
+    view.jobs.join()
+    eq_(Model1.query.count(), 0)
+    job = view.jobs.store.list()[0]
+    eq_(job['state'], 'done')
+    eq_((job['done'], job['total']), (1, 1))
+
+
+def test_register_jobs():
+    app, db, admin = setup()
+    Model1, Model2 = create_models(db)
+
+    runner = JobRunner(JobStore(':memory:'))
+    admin.register(Model1, session=db.session, jobs=runner)
+    eq_(admin.get_model_view(Model1).jobs, runner)
+
+
+def test_ajax_refs():
+    app, db, admin = setup()
+
+    class Owner(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+        def __unicode__(self):
+            return self.name
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+        owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+        owner = db.relationship(Owner, backref='pets')
+
+    db.create_all()
+
+    for i in range(5):
+        db.session.add(Owner(name='owner%s' % i))
+    db.session.add(Owner(name='nobody'))
+    db.session.commit()
+
+    view = CustomModelView(Pet, db.session,
+                           ajax_refs={'owner': {'fields': ('name',),
+                                                'page_size': 2}})
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    # The related table isn't listed in the form
+    resp = client.get('/admin/pet/add/')
+    eq_(resp.status_code, 200)
+    ok_('data-role="ajax-select"' in resp.data)
+    ok_('/admin/pet/_lookup/?name=owner' in resp.data)
+    ok_('owner1' not in resp.data)
+
+    resp = client.get('/admin/pet/_lookup/?name=owner&q=owner')
+    data = json.loads(resp.data)
+    eq_([r['text'] for r in data['results']], ['owner0', 'owner1'])
+    ok_(data['more'])
+
+    resp = client.get('/admin/pet/_lookup/?name=owner&q=owner&page=2')
+    data = json.loads(resp.data)
+    eq_([r['text'] for r in data['results']], ['owner4'])
+    ok_(not data['more'])
+
+    eq_(client.get('/admin/pet/_lookup/?name=pets').status_code, 404)
+
+    # Replacing the relations rebuilds the form and its loaders
+    view.ajax_refs = {'owner': {'fields': ('name',), 'page_size': 3}}
+    ok_('data-role="ajax-select"' in client.get('/admin/pet/add/').data)
+    resp = client.get('/admin/pet/_lookup/?name=owner&q=owner')
+    eq_(len(json.loads(resp.data)['results']), 3)
+
+    owner = Owner.query.filter_by(name='owner3').one()
+    resp = client.post('/admin/pet/add/',
+                       data={'name': 'rex', 'owner': str(owner.id)})
+    eq_(resp.status_code, 302)
+    pet = Pet.query.one()
+    eq_(pet.owner.name, 'owner3')
+
+    # Only the selected owner is rendered
+    resp = client.get('/admin/pet/%s/' % pet.id)
+    ok_('owner3' in resp.data)
+    ok_('owner2' not in resp.data)
+
+    resp = client.post('/admin/pet/add/',
+                       data={'name': 'rex', 'owner': '1000'})
+    eq_(resp.status_code, 200)
+    ok_('Not a valid choice' in resp.data)
+    eq_(Pet.query.count(), 1)
+
+    # Primary keys of the wrong type aren't queried
+    resp = client.post('/admin/pet/add/',
+                       data={'name': 'rex', 'owner': 'spam'})
+    eq_(resp.status_code, 200)
+    ok_('Not a valid choice' in resp.data)
+
+    # Collections use a multiple select validated with a single query
+    owner_view = CustomModelView(Owner, db.session,
+                                 ajax_refs={'pets': {'fields': ('name',)}})
+    admin.add_view(owner_view)
+    resp = client.post('/admin/owner/add/',
+                       data={'name': 'new', 'pets': [str(pet.id), 'spam']})
+    eq_(resp.status_code, 200)
+    ok_('Not a valid choice' in resp.data)
+    resp = client.post('/admin/owner/add/',
+                       data={'name': 'new', 'pets': [str(pet.id)]})
+    eq_(resp.status_code, 302)
+    eq_(Pet.query.one().owner.name, 'new')
+
+
+def test_cache_choices():
+    app, db, admin = setup()
+
+    class Owner(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+        def __unicode__(self):
+            return self.name
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+        owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+        owner = db.relationship(Owner)
+
+    db.create_all()
+
+    for i in range(3):
+        db.session.add(Owner(name='owner%s' % i))
+    db.session.commit()
+
+    cache = ChoicesCache()
+    pet_view = CustomModelView(Pet, db.session, cache_choices=('owner',),
+                               choices_cache=cache)
+    owner_view = CustomModelView(Owner, db.session, choices_cache=cache)
+    admin.add_view(pet_view)
+    admin.add_view(owner_view)
+
+    queries = []
+
+    def count_queries(conn, cursor, statement, *args):
+        queries.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count_queries)
+
+    client = app.test_client()
+
+    resp = client.get('/admin/pet/add/')
+    ok_('owner2' in resp.data)
+    eq_(len(queries), 1)
+
+    # The choices come from the cache
+    del queries[:]
+    resp = client.get('/admin/pet/add/')
+    ok_('owner2' in resp.data)
+    eq_(len(queries), 0)
+
+    # Changes made through the owner admin invalidate the choices
+    resp = client.post('/admin/owner/add/', data={'name': 'owner3'})
+    eq_(resp.status_code, 302)
+    resp = client.get('/admin/pet/add/')
+    ok_('owner3' in resp.data)
+
+    owner = Owner.query.filter_by(name='owner1').one()
+    resp = client.post('/admin/pet/add/',
+                       data={'name': 'rex', 'owner': str(owner.id)})
+    eq_(resp.status_code, 302)
+    pet = Pet.query.one()
+    eq_(pet.owner.name, 'owner1')
+
+    resp = client.get('/admin/pet/%s/' % pet.id)
+    ok_('selected' in resp.data)
+
+    # Deleting directly through the admin invalidates them too
+    owner = Owner.query.filter_by(name='owner0').one()
+    owner_view.delete_models(owner.id)
+    resp = client.get('/admin/pet/add/')
+    ok_('owner0' not in resp.data)
+
+    # And so do saves of save_model overrides not calling the backend's
+    class RenamingView(CustomModelView):
+        def save_model(self, instance, form, adding=False):
+            form.populate_obj(instance)
+            instance.name = instance.name.upper()
+            if adding:
+                self.session.add(instance)
+            self.session.commit()
+            return instance
+
+    renaming_view = RenamingView(Owner, db.session, endpoint='renaming',
+                                 choices_cache=cache)
+    admin.add_view(renaming_view)
+    resp = client.post('/admin/renaming/add/', data={'name': 'owner4'})
+    eq_(resp.status_code, 302)
+    resp = client.get('/admin/pet/add/')
+    ok_('OWNER4' in resp.data)
+
+    # Loaders with other queries are cached separately
+    keys = set(pet_view.create_ajax_loader('owner', options).get_cache_key()
+               for options in ({}, {'fields': ('name',)}))
+    eq_(len(keys), 2)
+
+
+def test_unique_validation():
+    app, db, admin = setup()
+
+    class Account(db.Model):
+        __table_args__ = (db.UniqueConstraint('team', 'login'),)
+
+        id = db.Column(db.Integer, primary_key=True)
+        email = db.Column(db.String(50), unique=True)
+        code = db.Column(db.String(10), unique=True)
+        team = db.Column(db.String(20))
+        login = db.Column(db.String(20))
+        handle = db.Column(db.String(20, collation='NOCASE'), unique=True)
+
+    db.create_all()
+
+    db.session.add(Account(email='a@b.c', code='A', team='x', login='bob',
+                           handle='Bob'))
+    db.session.commit()
+
+    view = CustomModelView(Account, db.session)
+    admin.add_view(view)
+
+    queries = []
+
+    def count_queries(conn, cursor, statement, *args):
+        if statement.startswith('SELECT'):
+            queries.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count_queries)
+
+    client = app.test_client()
+
+    # All the unique columns and constraints are checked by one query
+    resp = client.post('/admin/account/add/',
+                       data={'email': 'a@b.c', 'code': 'B', 'team': 'x',
+                             'login': 'bob'})
+    eq_(resp.status_code, 200)
+    eq_(len(queries), 1)
+    eq_(resp.data.count('Already exists.'), 3)
+    eq_(Account.query.count(), 1)
+
+    resp = client.post('/admin/account/add/',
+                       data={'email': 'd@e.f', 'code': 'B', 'team': 'y',
+                             'login': 'bob', 'handle': 'dan'})
+    eq_(resp.status_code, 302)
+    eq_(Account.query.count(), 2)
+
+    # The edited object doesn't conflict with itself
+    account = Account.query.filter_by(code='A').one()
+    resp = client.post('/admin/account/%s/' % account.id,
+                       data={'email': 'a@b.c', 'code': 'A', 'team': 'x',
+                             'login': 'alice', 'handle': 'Bob'})
+    eq_(resp.status_code, 302)
+    eq_(Account.query.filter_by(code='A').one().login, 'alice')
+
+    # Rows the database matches but Python doesn't fail the whole form
+    resp = client.post('/admin/account/add/',
+                       data={'email': 'g@h.i', 'code': 'C', 'team': 'z',
+                             'login': 'carol', 'handle': 'BOB'})
+    eq_(resp.status_code, 200)
+    ok_('Conflicts with an existing object.' in resp.data)
+    eq_(Account.query.count(), 2)
+
+
+def test_search_engines():
+    app, db, admin = setup()
+
+    Model1, _ = create_models(db)
+    db.engine.execute('CREATE VIRTUAL TABLE model1_fts USING '
+                      'fts5(test1, content=model1, content_rowid=id)')
+
+    for value in ('quick brown fox', 'lazy dog', 'quick dog'):
+        db.session.add(Model1(value))
+    db.session.commit()
+    db.engine.execute("INSERT INTO model1_fts(model1_fts) VALUES ('rebuild')")
+
+    view = CustomModelView(Model1, db.session, search_fields=('test1',),
+                           search_engine='fulltext')
+    admin.add_view(view)
+
+    def search(query):
+        qs = view.get_filtered_queryset(query)
+        return sorted(m.test1 for m in qs)
+
+    eq_(search('quick'), ['quick brown fox', 'quick dog'])
+    eq_(search('qui do'), ['quick dog'])
+    eq_(search('=qui'), [])
+
+    # The local index follows the changes made through the view
+    view.search_engine = 'index'
+    view._search_engine = None
+    eq_(search('quick dog'), ['quick dog'])
+    eq_(search('=laz'), [])
+    eq_(search('^laz'), ['lazy dog'])
+
+    client = app.test_client()
+    client.post('/admin/model1/add/', data={'test1': 'quick cat'})
+    eq_(search('quick'), ['quick brown fox', 'quick cat', 'quick dog'])
+
+    dog = Model1.query.filter_by(test1='quick dog').one()
+    client.post('/admin/model1/%s/delete/' % dog.id,
+                data={'confirm_delete': True})
+    eq_(search('quick'), ['quick brown fox', 'quick cat'])
+
+    resp = client.get('/admin/model1/?q=cat')
+    ok_('quick cat' in resp.data)
+    ok_('quick brown fox' not in resp.data)
+
+
+def test_local_index():
+    app, db, admin = setup()
+
+    class Owner(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+        owner_id = db.Column(db.Integer, db.ForeignKey(Owner.id))
+        owner = db.relationship(Owner)
+
+    db.create_all()
+    ann, bob = Owner(name='ann'), Owner(name='bob')
+    for name, owner in (('rex', ann), ('rio', bob), ('tom', ann),
+                        ('max', None), ('rob', bob)):
+        db.session.add(Pet(name=name, owner=owner))
+    db.session.commit()
+
+    class PetAdmin(CustomModelView):
+        # LIKE lookups on the owner's name need the join
+        def get_queryset(self):
+            return super(PetAdmin, self).get_queryset().outerjoin(Owner)
+
+    engine = LocalIndexSearch(max_pks=2, batch_size=2)
+    view = PetAdmin(Pet, db.session, search_engine=engine,
+                    search_fields=('name', 'owner.name'))
+    admin.add_view(view)
+
+    def search(query):
+        qs = view.get_filtered_queryset(query)
+        return sorted(p.name for p in qs)
+
+    # Related fields are indexed through the relation
+    eq_(search('ann'), ['rex', 'tom'])
+    eq_(search('bob'), ['rio', 'rob'])
+    eq_(search('=max'), ['max'])
+    eq_(len(engine._documents), 5)
+
+    # More matches than `max_pks` use LIKE lookups
+    eq_(search('r'), ['rex', 'rio', 'rob'])
+
+
+def test_search_planner():
+    app, db, admin = setup()
+
+    class Person(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20), index=True)
+        email = db.Column(db.String(50), unique=True)
+        city = db.Column(db.String(20))
+        bio = db.Column(db.Text)
+
+    db.create_all()
+    for name, email, city, bio in (
+            ('john', 'john@example.com', 'paris', 'likes 100% cotton'),
+            ('johanna', 'jo@example.com', 'rome', 'paints'),
+            ('bob', 'bob@example.com', 'johnstown', 'writes')):
+        db.session.add(Person(name=name, email=email, city=city, bio=bio))
+    db.session.commit()
+
+    view = CustomModelView(Person, db.session, search_engine='planned',
+                           search_fields=('name', 'email', 'city', 'bio'),
+                           search_contains_fields=('bio',))
+    admin.add_view(view)
+
+    indexes = view.get_search_indexes()
+    eq_(indexes['id'], 'primary key')
+    eq_(indexes['name'], 'ix_person_name')
+    ok_('email' in indexes)
+    ok_('city' not in indexes)
+
+    plan = dict((field.field, field.operator)
+                for field in view.get_search_engine().get_plan(view))
+    eq_(plan, {'name': 'prefix', 'email': 'prefix', 'city': 'exact',
+               'bio': 'contains'})
+
+    def search(query):
+        qs = view.get_filtered_queryset(query)
+        return sorted(p.name for p in qs)
+
+    # Indexed fields match on prefix, unindexed ones exactly
+    eq_(search('joh'), ['johanna', 'john'])
+    eq_(search('john'), ['john'])
+    eq_(search('johnstown'), ['bob'])
+    eq_(search('rome'), ['johanna'])
+    eq_(search('=joh'), [])
+    # Every word has to match
+    eq_(search('joh paris'), ['john'])
+    # Contains lookups and escaped wildcards
+    eq_(search('aint'), ['johanna'])
+    eq_(search('100%'), ['john'])
+    eq_(search('jo_'), [])
+
+    client = app.test_client()
+    resp = client.get('/admin/person/_search_plan/?q=joh')
+    eq_(resp.status_code, 404)
+
+    view.search_plan_debug = True
+    resp = client.get('/admin/person/_search_plan/?q=joh')
+    eq_(resp.status_code, 200)
+    ok_('ix_person_name' in resp.data)
+    ok_('LIKE' in resp.data)
+
+
+def test_list_filters():
+    app, db, admin = setup()
+
+    class Member(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+        age = db.Column(db.Integer)
+        active = db.Column(db.Boolean)
+
+        def __unicode__(self):
+            return self.name
+
+    db.create_all()
+    for name, age, active in (('anna', 25, True), ('bert', 30, False),
+                              ('carl', 35, True), ('dora', 40, True)):
+        db.session.add(Member(name=name, age=age, active=active))
+    db.session.commit()
+
+    view = CustomModelView(Member, db.session, search_fields=('name',),
+                           list_filters=('name', 'age', 'active'),
+                           list_per_page=2)
+    admin.add_view(view)
+
+    filters = view.get_filters()
+    eq_([(unicode(f.name), f.operation()) for f in filters[4:]],
+        [('Age', 'equals'), ('Age', 'not equal'), ('Age', 'greater than'),
+         ('Age', 'smaller than'), ('Active', 'equals'),
+         ('Active', 'not equal')])
+
+    def names(filters, search_query=None):
+        qs = view.get_filtered_queryset(search_query, filters)
+        return sorted(m.name for m in qs)
+
+    eq_(names([(6, '28'), (8, '1')]), ['carl', 'dora'])
+    eq_(names([(2, 'r')]), ['bert', 'carl', 'dora'])
+    eq_(names([(2, 'r')], 'ca'), ['carl'])
+
+    client = app.test_client()
+    resp = client.get('/admin/member/?flt0_6=28&flt1_8=1')
+    ok_('carl' in resp.data)
+    ok_('anna' not in resp.data)
+    ok_('bert' not in resp.data)
+    ok_('Total count: 2' in resp.data)
+
+    # Invalid values are ignored
+    resp = client.get('/admin/member/?flt0_6=old')
+    ok_('Total count: 4' in resp.data)
+
+    # Pages and sorting keep the filters
+    resp = client.get('/admin/member/?flt0_7=50')
+    ok_('flt0_7=50' in resp.data)
+    ok_('page=1' in resp.data)
+
+    # Selecting all matching rows follows the filters
+    resp = client.post('/admin/member/?flt0_9=1',
+                       data={'action': 'delete', '_select_across': '1',
+                             'confirm_delete': True})
+    eq_(resp.status_code, 302)
+    eq_(sorted(m.name for m in Member.query), ['anna', 'carl', 'dora'])
+
+
+def test_list_facets():
+    app, db, admin = setup()
+
+    class Ticket(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        title = db.Column(db.String(20))
+        status = db.Column(db.String(20))
+        urgent = db.Column(db.Boolean)
+
+        def __unicode__(self):
+            return self.title
+
+    db.create_all()
+    for title, status, urgent in (('crash', 'open', True),
+                                  ('typo', 'open', False),
+                                  ('slow', 'closed', True),
+                                  ('crash again', 'open', True)):
+        db.session.add(Ticket(title=title, status=status, urgent=urgent))
+    db.session.commit()
+
+    view = CustomModelView(Ticket, db.session, search_fields=('title',),
+                           list_facets=('status', 'urgent'))
+    admin.add_view(view)
+
+    queries = []
+
+    @event.listens_for(db.engine, 'before_cursor_execute')
+    def count_queries(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    eq_(view.get_facet_counts(),
+        {'status': {'open': 3, 'closed': 1},
+         'urgent': {True: 3, False: 1}})
+    eq_(len(queries), 1)
+
+    # Counts are cached
+    view.get_facet_counts()
+    eq_(len(queries), 1)
+
+    eq_(view.get_facet_counts('crash'),
+        {'status': {'open': 2}, 'urgent': {True: 2}})
+    urgent = view.get_filter_index('urgent')
+    eq_(view.get_facet_counts(None, [(urgent, '0')]),
+        {'status': {'open': 1}, 'urgent': {False: 1}})
+
+    client = app.test_client()
+    resp = client.get('/admin/ticket/')
+    ok_('>open</a>' in resp.data)
+    ok_('(3)' in resp.data)
+    # Boolean values are labelled with the filter options
+    ok_('>Yes</a>' in resp.data)
+    ok_(('flt0_%d=1' % urgent) in resp.data)
+
+    resp = client.get('/admin/ticket/?flt0_%d=0' % urgent)
+    ok_('typo' in resp.data)
+    ok_('slow' not in resp.data)
+
+
+def test_date_hierarchy():
+    app, db, admin = setup()
+
+    class Event(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+        created_at = db.Column(db.DateTime, index=True)
+
+        def __unicode__(self):
+            return self.name
+
+    db.create_all()
+    for name, created_at in (('launch', datetime(2012, 3, 1, 10)),
+                             ('review', datetime(2012, 3, 15, 12)),
+                             ('party', datetime(2012, 12, 31, 23)),
+                             ('retro', datetime(2013, 1, 2, 9)),
+                             ('undated', None)):
+        db.session.add(Event(name=name, created_at=created_at))
+    db.session.commit()
+
+    view = CustomModelView(Event, db.session, date_hierarchy='created_at')
+    admin.add_view(view)
+
+    qs = view.get_queryset()
+    eq_(view.count_date_buckets(qs, 'year'), [((2012,), 3), ((2013,), 1)])
+    eq_(view.count_date_buckets(qs, 'month'),
+        [((2012, 3), 2), ((2012, 12), 1), ((2013, 1), 1)])
+
+    def names(date_bucket):
+        qs = view.get_filtered_queryset(date_bucket=date_bucket)
+        return sorted(e.name for e in qs)
+
+    eq_(names('2012'), ['launch', 'party', 'review'])
+    eq_(names('2012-12'), ['party'])
+    eq_(names('2012-03-15'), ['review'])
+    eq_(names('2012-13'), ['launch', 'party', 'retro', 'review', 'undated'])
+
+    client = app.test_client()
+    resp = client.get('/admin/event/')
+    ok_('dh=2012' in resp.data)
+    ok_('(3)' in resp.data)
+
+    resp = client.get('/admin/event/?dh=2012')
+    ok_('March 2012' in resp.data)
+    ok_('dh=2012-12' in resp.data)
+    ok_('retro' not in resp.data)
+
+    # A selected day is shown among the days of its month
+    resp = client.get('/admin/event/?dh=2012-03-15')
+    ok_('March 01' in resp.data)
+    ok_('review' in resp.data)
+    ok_('launch</a>' not in resp.data)
+
+
+def test_export():
+    app, db, admin = setup()
+
+    class Owner(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.Unicode(20))
+        born = db.Column(db.Date)
+        owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+        owner = db.relationship(Owner, backref='pets')
+
+    db.create_all()
+    stan = Owner(name='Stan')
+    db.session.add(stan)
+    for i, name in enumerate([u'Rex', u'Tom, Jr.', u'L\xe9o']):
+        db.session.add(Pet(name=name, owner=stan,
+                           born=datetime(2010 + i, 1, 1).date()))
+    db.session.add(Pet(name=u'Stray'))
+    db.session.commit()
+
+    view = CustomModelView(Pet, db.session, search_fields=('name',),
+                           list_display=('name', 'born', 'owner.name'),
+                           list_filters=('name',), export_batch_size=2)
+    admin.add_view(view)
+
+    client = app.test_client()
+    resp = client.get('/admin/pet/')
+    ok_('/admin/pet/export/csv/' in resp.data)
+
+    resp = client.get('/admin/pet/export/csv/?sort=-name')
+    eq_(resp.status_code, 200)
+    eq_(resp.mimetype, 'text/csv')
+    ok_('attachment; filename=pet.csv' in resp.headers['Content-Disposition'])
+    eq_(resp.data.decode('utf-8').splitlines(),
+        [u'Name,Born,Owner.Name',
+         u'"Tom, Jr.",2011-01-01,Stan',
+         u'Stray,,',
+         u'Rex,2010-01-01,Stan',
+         u'L\xe9o,2012-01-01,Stan'])
+
+    # The search and filters of the list apply
+    resp = client.get('/admin/pet/export/ndjson/?q=r&flt0_3=x')
+    eq_(resp.mimetype, 'application/x-ndjson')
+    eq_([json.loads(line) for line in resp.data.splitlines()],
+        [{'Name': 'Tom, Jr.', 'Born': '2011-01-01', 'Owner.Name': 'Stan'},
+         {'Name': 'Stray', 'Born': None, 'Owner.Name': None}])
+
+    resp = client.get('/admin/pet/export/csv/',
+                      headers={'Accept-Encoding': 'gzip, deflate'})
+    eq_(resp.headers['Content-Encoding'], 'gzip')
+    eq_(len(zlib.decompress(resp.data, 16 + zlib.MAX_WBITS).splitlines()), 5)
+
+    # Sorts by anything but a column are ignored
+    for sort in ('owner', 'query', '(SELECT 1)'):
+        resp = client.get('/admin/pet/export/csv/', query_string={'sort': sort})
+        eq_(resp.status_code, 200)
+        eq_(len(resp.data.splitlines()), 5)
+
+    # Column types of the columnar formats
+    eq_([type for header, accessor, type in view.get_export_columns()],
+        ['string', 'date', 'string'])
+
+    if 'parquet' in EXPORT_FORMATS:
+        import pyarrow
+        import pyarrow.parquet
+        resp = client.get('/admin/pet/export/parquet/?sort=name')
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(resp.data))
+        eq_(table.num_rows, 4)
+        eq_(table.schema.field('Born').type, pyarrow.date32())
+        resp = client.get('/admin/pet/export/arrow/?sort=name')
+        table = pyarrow.ipc.open_stream(resp.data).read_all()
+        eq_(table.column('Name').to_pylist(),
+            [u'L\xe9o', u'Rex', u'Stray', u'Tom, Jr.'])
+    else:
+        # Without pyarrow
+        ok_('/admin/pet/export/parquet/' not in client.get('/admin/pet/').data)
+        eq_(client.get('/admin/pet/export/parquet/').status_code, 404)
+
+    eq_(client.get('/admin/pet/export/xml/').status_code, 404)
+    view.can_export = False
+    eq_(client.get('/admin/pet/export/csv/').status_code, 404)
+
+
+def test_import():
+    app, db, admin = setup()
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.Unicode(20), nullable=False, unique=True)
+        born = db.Column(db.Date)
+        vaccinated = db.Column(db.Boolean)
+
+        def __unicode__(self):
+            return self.name
+
+    db.create_all()
+    db.session.add(Pet(name=u'Rex'))
+    db.session.commit()
+
+    view = CustomModelView(Pet, db.session, import_batch_size=2,
+                           search_fields=('name',), search_engine='index')
+    admin.add_view(view)
+    client = app.test_client()
+    ok_('/admin/pet/import/' in client.get('/admin/pet/').data)
+    eq_(view.get_search_engine().apply(view, view.get_queryset(),
+                                       'rex').count(), 1)
+
+    # Headers can be field names or labels, failing rows are reported
+    data = ('Name,born,Vaccinated,color\r\n'
+            'Tom,2011-01-01,False,grey\r\n'
+            'L\xc3\xa9o,,yes,\r\n'
+            'Kit,not a date,,\r\n'
+            'Rex,,,\r\n'
+            'Max,2012-02-03,1,\r\n')
+    resp = client.post('/admin/pet/import/',
+                       data={'file': (StringIO(data), 'pets.csv')})
+    eq_(resp.status_code, 200)
+    ok_('Imported 3 rows.' in resp.data)
+    ok_('2 rows failed.' in resp.data)
+    eq_(sorted((p.name, p.born and p.born.day, p.vaccinated)
+               for p in Pet.query),
+        [(u'L\xe9o', None, True), (u'Max', 3, True), (u'Rex', None, None),
+         (u'Tom', 1, False)])
+    # The inserted rows are added to the search index
+    eq_(view.get_search_engine().apply(view, view.get_queryset(),
+                                       'max').count(), 1)
+
+    report_url = '/admin/pet/import/%s/' % re.search(
+        r'/admin/pet/import/([0-9a-f]{32})/', resp.data).group(1)
+    report = client.get(report_url).data.splitlines()
+    eq_(report[0], 'Line,Errors,Name,Vaccinated,born,color')
+    ok_(report[1].startswith('4,born: Not a valid date value,Kit'))
+    ok_(report[2].startswith('5,'))
+    ok_('Rex' in report[2])
+    eq_(client.get('/admin/pet/import/../').status_code, 404)
+
+    data = ('{"name": "Bob", "born": "2013-04-05", "vaccinated": true}\n'
+            '[1, 2]\n'
+            '{"name": "Zed"}\n')
+    resp = client.post('/admin/pet/import/',
+                       data={'file': (StringIO(data), 'pets.txt'),
+                             'format': 'ndjson'})
+    ok_('Imported 2 rows.' in resp.data)
+    ok_('1 rows failed.' in resp.data)
+    eq_(Pet.query.filter_by(name=u'Bob').one().vaccinated, True)
+
+    resp = client.post('/admin/pet/import/',
+                       data={'file': (StringIO(data), 'pets.xml')})
+    ok_('Unsupported file format.' in resp.data)
+
+    # Large files are imported in the background
+    view.jobs = JobRunner(JobStore(':memory:'))
+    view.import_background_size = 0
+    resp = client.post('/admin/pet/import/',
+                       data={'file': (StringIO('name\r\nAmy\r\n'),
+                                      'pets.csv')})
+    eq_(resp.status_code, 302)
+    view.jobs.join()
+    job = view.jobs.store.list()[0]
+    eq_(job['state'], 'done')
+    eq_(job['message'], 'Imported 1 Pets')
+    eq_(Pet.query.count(), 7)
+
+    view.can_create = False
+    eq_(client.get('/admin/pet/import/').status_code, 403)
+
+
+def test_import_save_model():
+    app, db, admin = setup()
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.Unicode(20), nullable=False)
+        slug = db.Column(db.Unicode(20))
+
+        def __unicode__(self):
+            return self.name
+
+    db.create_all()
+
+    class PetAdmin(CustomModelView):
+        fields = ('name',)
+
+        def save_model(self, instance, form, adding=False):
+            if form.data['name'] == u'Bad':
+                raise ValueError('Bad name')
+            instance.slug = form.data['name'].lower()
+            return super(PetAdmin, self).save_model(instance, form, adding)
+
+    view = PetAdmin(Pet, db.session, import_batch_size=2)
+    admin.add_view(view)
+    ok_(not view.can_bulk_insert())
+    client = app.test_client()
+
+    # An overridden save_model saves every row
+    data = 'name\r\nTom\r\nBad\r\nRex\r\nMax\r\n'
+    resp = client.post('/admin/pet/import/',
+                       data={'file': (StringIO(data), 'pets.csv')})
+    ok_('Imported 3 rows.' in resp.data)
+    ok_('1 rows failed.' in resp.data)
+    eq_(sorted((p.name, p.slug) for p in Pet.query),
+        [(u'Max', u'max'), (u'Rex', u'rex'), (u'Tom', u'tom')])
+
+
+def test_bulk_edit():
+    app, db, admin = setup()
+
+    class Owner(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+        def __unicode__(self):
+            return self.name
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20), nullable=False)
+        status = db.Column(db.String(20), nullable=False)
+        age = db.Column(db.Integer)
+        owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+        owner = db.relationship(Owner, backref='pets')
+
+        def __unicode__(self):
+            return self.name
+
+        @db.validates('age')
+        def validate_age(self, key, age):
+            return age
+
+    db.create_all()
+    db.session.add(Owner(name='Stan'))
+    for name in ['Rex', 'Tom', 'Leo', 'Max', 'Kit']:
+        db.session.add(Pet(name=name, status='new'))
+    db.session.commit()
+
+    view = CustomModelView(Pet, db.session, search_fields=('name',),
+                           bulk_edit_fields=('status', 'age', 'owner'),
+                           update_batch_size=2)
+    admin.add_view(view)
+    eq_(view.can_bulk_update(['status', 'owner']), True)
+    eq_(view.can_bulk_update(['status', 'pets']), False)
+    # The validates hooks only run on the objects
+    eq_(view.can_bulk_update(['status', 'age']), False)
+
+    client = app.test_client()
+    ok_('Edit selected' in client.get('/admin/pet/').data)
+
+    resp = client.post('/admin/pet/', data={'action': 'edit',
+                                            '_selected_action': ['1', '2']})
+    eq_(resp.status_code, 200)
+    ok_('all 2 Pets' in resp.data)
+    ok_('name="status"' in resp.data)
+    ok_('name="name"' not in resp.data)
+
+    # Only the checked fields are validated and changed
+    resp = client.post('/admin/pet/', data={'action': 'edit',
+                                            '_selected_action': ['1', '2'],
+                                            '_bulk_field': ['status', 'age'],
+                                            'status': 'sold', 'age': 'old',
+                                            'confirm_edit': '1'})
+    eq_(resp.status_code, 200)
+    ok_('Not a valid integer value' in resp.data)
+
+    resp = client.post('/admin/pet/', data={'action': 'edit',
+                                            '_selected_action': ['1', '2'],
+                                            '_bulk_field': ['status', 'owner'],
+                                            'status': 'sold', 'age': 'old',
+                                            'owner': '1',
+                                            'confirm_edit': '1'})
+    eq_(resp.status_code, 302)
+    db.session.expire_all()
+    eq_([(p.name, p.status, p.age, p.owner_id) for p in Pet.query],
+        [('Rex', 'sold', None, 1), ('Tom', 'sold', None, 1),
+         ('Leo', 'new', None, None), ('Max', 'new', None, None),
+         ('Kit', 'new', None, None)])
+
+    # All the rows matching the search
+    resp = client.post('/admin/pet/?q=e', data={'action': 'edit',
+                                                '_select_across': '1',
+                                                '_bulk_field': 'age',
+                                                'age': '3',
+                                                'confirm_edit': '1'})
+    eq_(resp.status_code, 302)
+    db.session.expire_all()
+    eq_(sorted(p.name for p in Pet.query.filter_by(age=3)), ['Leo', 'Rex'])
+
+    # An overridden save_model is called for every object
+    saved = []
+
+    class SavingView(CustomModelView):
+        def save_model(self, instance, form, adding=False):
+            saved.append(instance.name)
+            return super(SavingView, self).save_model(instance, form, adding)
+
+    view = SavingView(Pet, db.session, endpoint='savingpet',
+                      bulk_edit_fields=('status',))
+    admin.add_view(view)
+    eq_(view.can_bulk_update(['status']), False)
+    resp = client.post('/admin/savingpet/', data={'action': 'edit',
+                                                  '_selected_action': ['3',
+                                                                       '4'],
+                                                  '_bulk_field': 'status',
+                                                  'status': 'lost',
+                                                  'confirm_edit': '1'})
+    eq_(resp.status_code, 302)
+    eq_(sorted(saved), ['Leo', 'Max'])
+    db.session.expire_all()
+    eq_(sorted(p.name for p in Pet.query.filter_by(status='lost')),
+        ['Leo', 'Max'])
+
+
+def test_list_editable():
+    app, db, admin = setup()
+
+    class Pet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20), nullable=False)
+        age = db.Column(db.Integer)
+
+        def __unicode__(self):
+            return self.name
+
+    db.create_all()
+    for name, age in [('Rex', 3), ('Tom', 5), ('Leo', 1)]:
+        db.session.add(Pet(name=name, age=age))
+    db.session.commit()
+
+    flushes = []
+
+    def after_flush(session, context):
+        flushes.append(True)
+
+    view = CustomModelView(Pet, db.session, list_display=('name', 'age'),
+                           list_editable=('age',))
+    admin.add_view(view)
+
+    client = app.test_client()
+    resp = client.get('/admin/pet/')
+    ok_('name="row-1-age"' in resp.data)
+    ok_('name="row-1-name"' not in resp.data)
+    ok_('name="_save_list"' in resp.data)
+
+    # An invalid row keeps all of them from being saved
+    data = {'_list_pk': ['1', '2', '3'], '_save_list': '1',
+            'row-1-age': '4', 'row-2-age': 'five', 'row-3-age': '1'}
+    resp = client.post('/admin/pet/', data=data)
+    eq_(resp.status_code, 200)
+    ok_('Not a valid integer value' in resp.data)
+    ok_('value="five"' in resp.data)
+    eq_([p.age for p in Pet.query.order_by(Pet.id)], [3, 5, 1])
+
+    data['row-2-age'] = '6'
+    event.listen(Session, 'after_flush', after_flush)
+    resp = client.post('/admin/pet/?sort=name', data=data)
+    event.remove(Session, 'after_flush', after_flush)
+    eq_(resp.status_code, 302)
+    ok_(resp.location.endswith('/admin/pet/?sort=name'))
+    db.session.expire_all()
+    eq_([p.age for p in Pet.query.order_by(Pet.id)], [4, 6, 1])
+    # The changed rows were written together
+    eq_(len(flushes), 1)
+
+    view.can_edit = False
+    ok_('name="row-1-age"' not in client.get('/admin/pet/').data)
+    eq_(client.post('/admin/pet/', data=data).status_code, 403)